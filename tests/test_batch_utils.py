@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from whatsopt.batch_utils import _StateLock, load_jobs, run_jobs, OK, FAILED, SKIPPED
+
+JOBS = """
+workers = 2
+
+[[jobs]]
+name = "version"
+command = "wop --version"
+
+[[jobs]]
+name = "bad"
+command = ["bad_command"]
+
+[[jobs]]
+name = "after_version"
+command = "--version"
+after = ["version"]
+
+[[jobs]]
+name = "after_bad"
+command = "--version"
+after = ["bad"]
+"""
+
+
+class _FakeWhatsOpt(BaseHTTPRequestHandler):
+    # versioning and analysis export endpoints used by wop pull --json
+    routes = {
+        "/api/v1/versioning": {"whatsopt": "1.0.0", "wop": "2.0.0"},
+        "/api/v1/analyses/1.wopjson": {"name": "Sellar", "disciplines_attributes": []},
+    }
+
+    def do_GET(self):
+        data = self.routes.get(self.path)
+        body = json.dumps(data).encode()
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBatchUtils(unittest.TestCase):
+    def _write_jobs(self, tmpdir, content):
+        filename = os.path.join(tmpdir, "jobs.toml")
+        with open(filename, "w") as f:
+            f.write(content)
+        return filename
+
+    def test_load_jobs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            workers, jobs = load_jobs(self._write_jobs(tmpdir, JOBS))
+        self.assertEqual(2, workers)
+        self.assertEqual(["--version"], jobs[0]["args"])
+        self.assertEqual(["bad_command"], jobs[1]["args"])
+        self.assertEqual(["version"], jobs[2]["after"])
+
+    def test_load_bad_jobs(self):
+        bad_jobs = [
+            '[[jobs]]\ncommand = "login http://localhost"',
+            '[[jobs]]\ncommand = "list"\nremote = "unknown"',
+            '[[jobs]]\ncommand = "list"\nafter = ["unknown"]',
+            '[[jobs]]\nname = "list"\ncommand = "list"\n[[jobs]]\nname = "list"\ncommand = "list"',
+            "[[jobs]]\nname = 'no command'",
+            '[[jobs]]\ncommand = "push --watch problem.py"',
+            'workers = "4"\n[[jobs]]\ncommand = "list"',
+            'workers = 0\n[[jobs]]\ncommand = "list"',
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for content in bad_jobs:
+                with self.assertRaises(SystemExit):
+                    load_jobs(self._write_jobs(tmpdir, content))
+
+    def test_run_jobs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            workers, jobs = load_jobs(self._write_jobs(tmpdir, JOBS))
+        results = run_jobs(jobs, workers)
+        self.assertEqual(OK, results["version"][0])
+        self.assertEqual((FAILED, 2), results["bad"][:2])
+        self.assertEqual(OK, results["after_version"][0])
+        self.assertEqual(SKIPPED, results["after_bad"][0])
+
+    def test_run_batch_binary_output(self):
+        server = HTTPServer(("127.0.0.1", 0), _FakeWhatsOpt)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:{}".format(server.server_address[1])
+        try:
+            with tempfile.TemporaryDirectory() as home:
+                jobs = (
+                    f'[[jobs]]\ncommand = "--credentials key --url {url} pull --json 1"'
+                )
+                proc = subprocess.run(
+                    [sys.executable, "-m", "whatsopt.wop", "batch"]
+                    + [self._write_jobs(home, jobs)],
+                    env=dict(os.environ, HOME=home, WOP_NO_DAEMON="1"),
+                    cwd=home,
+                    stdin=subprocess.DEVNULL,
+                    capture_output=True,
+                    encoding="utf-8",
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(0, proc.returncode, proc.stdout + proc.stderr)
+        self.assertIn('{"name": "Sellar"', proc.stdout)  # json export captured
+
+    def test_state_lock_writes_cwd(self):
+        lock = _StateLock()
+        running = []
+        overlaps = []
+        guard = threading.Lock()
+
+        def job(writes_cwd):
+            with lock.shared(writes_cwd):
+                with guard:
+                    running.append(writes_cwd)
+                    overlaps.append(running.count(True) > 1)
+                time.sleep(0.05)
+                with guard:
+                    running.remove(writes_cwd)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(job, [True, True, False, True]))
+        self.assertEqual(4, len(overlaps))
+        self.assertFalse(any(overlaps))  # writers in cwd never run together
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+import unittest
+from whatsopt.cache_utils import (
+    attrs_cache_key,
+    load_cached_attrs,
+    local_module_files,
+    save_cached_attrs,
+)
+
+OPTIONS = {"--depth": 2, "--scalar": True, "--name": None, "--dry-run": True}
+
+
+class TestCacheUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.pyfile = self._write("problem.py", "import wop_cache_module\n")
+        self.module = self._write("wop_cache_module.py", "X = 1\n")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, filename, content):
+        path = os.path.join(self.tmpdir.name, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_attrs_cache_key(self):
+        key = attrs_cache_key(self.pyfile, OPTIONS)
+        self.assertEqual(key, attrs_cache_key(self.pyfile, dict(OPTIONS)))
+        # dry run does not change discovered attributes
+        self.assertEqual(
+            key, attrs_cache_key(self.pyfile, dict(OPTIONS, **{"--dry-run": False}))
+        )
+        self.assertNotEqual(
+            key, attrs_cache_key(self.pyfile, dict(OPTIONS, **{"--depth": 1}))
+        )
+        self._write("problem.py", "import wop_cache_module  # changed\n")
+        self.assertNotEqual(key, attrs_cache_key(self.pyfile, OPTIONS))
+
+    def test_load_cached_attrs(self):
+        mda_attrs = {"name": "Problem", "disciplines_attributes": []}
+        key = attrs_cache_key(self.pyfile, OPTIONS)
+        self.assertIsNone(load_cached_attrs(self.cache_dir, key))
+        save_cached_attrs(self.cache_dir, key, mda_attrs, [self.module])
+        self.assertEqual(mda_attrs, load_cached_attrs(self.cache_dir, key))
+
+        self._write("wop_cache_module.py", "X = 2\n")
+        self.assertIsNone(load_cached_attrs(self.cache_dir, key))
+
+    def test_cache_size(self):
+        for i in range(5):
+            save_cached_attrs(self.cache_dir, f"key{i}", {"name": f"P{i}"}, [], size=3)
+        self.assertEqual(3, len(os.listdir(self.cache_dir)))
+
+    def test_local_module_files(self):
+        sys.path.insert(0, self.tmpdir.name)
+        try:
+            import wop_cache_module  # noqa: F401
+
+            files = local_module_files()
+            self.assertIn(os.path.realpath(self.module), files)
+            self.assertFalse(any("site-packages" in f for f in files))
+        finally:
+            sys.path.remove(self.tmpdir.name)
+            del sys.modules["wop_cache_module"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from whatsopt.command_utils import (
+    is_mpi_run,
+    is_watch_command,
+    isolated_state,
+    run_command,
+)
+
+
+class TestCommandUtils(unittest.TestCase):
+    def test_run_command(self):
+        out, err = io.StringIO(), io.StringIO()
+        code = run_command(["--version"], out, err)
+        self.assertEqual(0, code)
+        self.assertIn("version", out.getvalue())
+
+    def test_run_bad_command(self):
+        out, err = io.StringIO(), io.StringIO()
+        code = run_command(["bad_command"], out, err)
+        self.assertEqual(2, code)
+        self.assertIn("No such command", err.getvalue())
+
+    def test_isolated_state(self):
+        cwd = os.getcwd()
+        argv = sys.argv[:]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "wop_user_module.py"), "w") as f:
+                f.write("X = 1\n")
+            with isolated_state(tmpdir, dict(os.environ, WOP_TEST_VAR="1")):
+                sys.argv[:] = ["script.py"]
+                sys.path.insert(0, tmpdir)
+                import wop_user_module  # noqa: F401
+
+                self.assertEqual("1", os.environ["WOP_TEST_VAR"])
+                self.assertEqual(
+                    os.path.realpath(tmpdir), os.path.realpath(os.getcwd())
+                )
+        self.assertEqual(cwd, os.getcwd())
+        self.assertEqual(argv, sys.argv)
+        self.assertNotIn(tmpdir, sys.path)
+        self.assertNotIn("WOP_TEST_VAR", os.environ)
+        self.assertNotIn("wop_user_module", sys.modules)
+
+    def test_is_watch_command(self):
+        self.assertTrue(is_watch_command(["push", "-w", "problem.py"]))
+        self.assertTrue(
+            is_watch_command(["--url", "ether", "show", "--watch", "-f", "pb.py"])
+        )
+        self.assertFalse(is_watch_command(["push", "problem.py"]))
+        self.assertFalse(is_watch_command(["pull", "-w", "1"]))
+
+    def test_is_mpi_run(self):
+        self.assertTrue(is_mpi_run({"OMPI_COMM_WORLD_SIZE": "2"}))
+        self.assertTrue(is_mpi_run({"PMI_RANK": "1"}))
+        if "mpi4py.MPI" not in sys.modules:
+            self.assertFalse(is_mpi_run({"HOME": "/home/user"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+import unittest
+import subprocess
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from whatsopt.daemon_utils import is_daemon_available
+
+dname = os.path.dirname
+
+
+def file(name):
+    return os.path.join(dname(__file__), "data", name)
+
+
+class _FakeWhatsOpt(BaseHTTPRequestHandler):
+    # versioning and analysis export endpoints used by wop pull --json
+    routes = {
+        "/api/v1/versioning": {"whatsopt": "1.0.0", "wop": "2.0.0"},
+        "/api/v1/analyses/1.wopjson": {"name": "Sellar", "disciplines_attributes": []},
+    }
+
+    def do_GET(self):
+        data = self.routes.get(self.path)
+        body = json.dumps(data).encode()
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(not is_daemon_available(), "unix sockets not available")
+class TestDaemonUtils(unittest.TestCase):
+    def _wop(self, args, **env):
+        return subprocess.run(
+            [sys.executable, "-m", "whatsopt.wop"] + args,
+            env=dict(self.env, **env),
+            cwd=self.home,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            encoding="utf-8",
+        )
+
+    def test_daemon(self):
+        with tempfile.TemporaryDirectory() as home:
+            self.home = home
+            self.env = dict(os.environ, HOME=home)
+            self.env.pop("WOP_NO_DAEMON", None)
+            sock = os.path.join(home, ".whatsopt", "daemon.sock")
+
+            self.assertEqual(0, self._wop(["daemon", "start"]).returncode)
+            try:
+                self.assertTrue(os.path.exists(sock))
+                cmd = ["push", "-n", file("sellar.py")]
+                expected = self._wop(cmd, WOP_NO_DAEMON="1")
+                for _ in range(2):
+                    res = self._wop(cmd)
+                    self.assertEqual(0, res.returncode)
+                    self.assertEqual(expected.stdout, res.stdout)
+
+                # binary output streamed to stdout through the daemon
+                server = HTTPServer(("127.0.0.1", 0), _FakeWhatsOpt)
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                try:
+                    url = "http://127.0.0.1:{}".format(server.server_address[1])
+                    res = self._wop(
+                        ["--credentials", "key", "--url", url, "pull", "--json", "1"]
+                    )
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                self.assertEqual(0, res.returncode, res.stderr)
+                self.assertEqual("Sellar", json.loads(res.stdout)["name"])
+
+                res = self._wop(["push", "-n", "not_found.py"])
+                self.assertNotEqual(0, res.returncode)
+                self.assertIn("not_found.py", res.stderr)
+
+                # under MPI, commands are run by each process, not forwarded
+                res = self._wop(["--version"], OMPI_COMM_WORLD_SIZE="2")
+                self.assertEqual(0, res.returncode)
+
+                res = self._wop(["daemon", "status"])
+                self.assertIn("4 commands served", res.stdout)
+            finally:
+                self._wop(["daemon", "stop"])
+            self.assertFalse(os.path.exists(sock))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from contextlib import closing
+
+from whatsopt.index_utils import (
+    SCOPE_ALL,
+    SCOPE_OWNED,
+    get_index_etag,
+    invalidate_index,
+    is_index_fresh,
+    normalize_date,
+    open_index,
+    project_scope,
+    query_index,
+    touch_index,
+    update_index,
+)
+
+REMOTE = "https://example.com/whatsopt"
+
+
+def analyses(ids):
+    return [
+        {
+            "id": i,
+            "name": f"Analysis{i}",
+            "created_at": f"2024-0{1 + i % 9}-15T12:00:00.000Z",
+            "owner_email": "john.doe@example.com",
+        }
+        for i in ids
+    ]
+
+
+class TestIndexUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmpdir.name, "index", "analyses.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_update_index(self):
+        with closing(open_index(self.filename)) as conn:
+            self.assertFalse(is_index_fresh(conn, REMOTE, SCOPE_ALL, 600))
+            self.assertEqual(
+                10, update_index(conn, REMOTE, SCOPE_ALL, analyses(range(10)))
+            )
+            self.assertTrue(is_index_fresh(conn, REMOTE, SCOPE_ALL, 600))
+            self.assertFalse(is_index_fresh(conn, REMOTE, SCOPE_OWNED, 600))
+            # nothing changed
+            self.assertEqual(
+                0, update_index(conn, REMOTE, SCOPE_ALL, analyses(range(10)))
+            )
+            # one deleted
+            self.assertEqual(
+                1, update_index(conn, REMOTE, SCOPE_ALL, analyses(range(9)))
+            )
+            count, _ = query_index(conn, REMOTE, SCOPE_ALL)
+            self.assertEqual(9, count)
+
+            self.assertEqual(
+                3, update_index(conn, REMOTE, SCOPE_OWNED, analyses([1, 3, 5]))
+            )
+            count, rows = query_index(conn, REMOTE, SCOPE_OWNED)
+            self.assertEqual(3, count)
+            self.assertEqual([1, 3, 5], [row[0] for row in rows])
+            self.assertEqual((3, "Analysis3", "2024-04-15T12:00:00.000Z"), rows[1][:3])
+
+            # scopes keep their own order and membership
+            scope = project_scope("ject")
+            update_index(conn, REMOTE, scope, analyses([5, 1]), etag='"v1"')
+            _, rows = query_index(conn, REMOTE, scope)
+            self.assertEqual([5, 1], [row[0] for row in rows])
+            _, rows = query_index(conn, REMOTE, SCOPE_OWNED)
+            self.assertEqual([1, 3, 5], [row[0] for row in rows])
+            self.assertEqual('"v1"', get_index_etag(conn, REMOTE, scope))
+            self.assertIsNone(get_index_etag(conn, REMOTE, SCOPE_ALL))
+
+            # deleted on remote
+            update_index(conn, REMOTE, SCOPE_ALL, analyses(range(4)))
+            _, rows = query_index(conn, REMOTE, scope)
+            self.assertEqual([1], [row[0] for row in rows])
+
+            invalidate_index(conn, REMOTE)
+            self.assertFalse(is_index_fresh(conn, REMOTE, SCOPE_ALL, 600))
+            update_index(conn, REMOTE, scope, analyses([1]), etag='"v2"')
+            touch_index(conn, REMOTE, scope)
+            self.assertTrue(is_index_fresh(conn, REMOTE, scope, 600))
+
+    def test_query_index(self):
+        with closing(open_index(self.filename)) as conn:
+            update_index(conn, REMOTE, SCOPE_ALL, analyses(range(30)))
+            update_index(conn, "other", SCOPE_ALL, analyses(range(5)))
+
+            count, rows = query_index(conn, REMOTE, SCOPE_ALL, name="analysis2")
+            self.assertEqual(11, count)
+            count, rows = query_index(conn, REMOTE, SCOPE_ALL, regex=r"s1\d$")
+            self.assertEqual(list(range(10, 20)), [row[0] for row in rows])
+            count, rows = query_index(
+                conn, REMOTE, SCOPE_ALL, since="2024-02", until="2024-03"
+            )
+            self.assertEqual([1, 2, 10, 11, 19, 20, 28, 29], [row[0] for row in rows])
+            # LIKE wildcards are matched literally
+            count, rows = query_index(conn, REMOTE, SCOPE_ALL, name="analysis_")
+            self.assertEqual(0, count)
+            count, rows = query_index(conn, REMOTE, SCOPE_ALL, limit=7, offset=28)
+            self.assertEqual(30, count)
+            self.assertEqual([28, 29], [row[0] for row in rows])
+
+    def test_normalize_date(self):
+        self.assertEqual("2024-01-05", normalize_date("2024-1-5"))
+        self.assertEqual("2024-02", normalize_date("2024-2"))
+        self.assertEqual("2024-01-05T10:30", normalize_date("2024-01-05 10:30"))
+        for bad in ["05/01/2024", "2024-13-01", "yesterday"]:
+            with self.assertRaises(ValueError):
+                normalize_date(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from whatsopt.json_utils import (
+    JsonIndenter,
+    load_json,
+    open_output,
+    write_json,
+    write_json_chunks,
+)
+
+DOC = {
+    "name": "Sellar",
+    "empty": {},
+    "list": [],
+    "disciplines_attributes": [
+        {
+            "name": 'd1 {"strange": [name]}, \\ ',
+            "variables_attributes": [{"name": "x", "shape": "(2,)", "init": 1.5}],
+        },
+        {"name": "d2", "variables_attributes": [True, None, -1e-05]},
+    ],
+}
+
+
+def chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonUtils(unittest.TestCase):
+    def test_json_indenter(self):
+        expected = json.dumps(DOC, indent=2).encode()
+        compact = json.dumps(DOC, separators=(",", ":")).encode()
+        for size in (1, 3, 7, len(compact)):
+            indenter = JsonIndenter(indent=2)
+            actual = b"".join(indenter.feed(c) for c in chunked(compact, size))
+            self.assertEqual(expected, actual)
+
+    def test_json_indenter_reindent(self):
+        expected = json.dumps(DOC, indent=2).encode()
+        data = json.dumps(DOC, indent=4).encode()
+        self.assertEqual(expected, JsonIndenter(indent=2).feed(data))
+
+    def test_write_json_chunks(self):
+        compact = json.dumps(DOC, separators=(",", ":")).encode()
+        out = io.BytesIO()
+        write_json_chunks(chunked(compact, 5), out)
+        self.assertEqual(compact, out.getvalue())
+
+    def test_open_output_gzip(self):
+        compact = json.dumps(DOC).encode()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "test.json.gz")
+            with open_output(filename, compress=True) as out:
+                write_json_chunks(chunked(compact, 5), out, indent=2)
+            with gzip.open(filename) as f:
+                self.assertEqual(DOC, json.load(f))
+
+    def test_write_json(self):
+        for kwargs, expected in [
+            ({}, json.dumps(DOC)),
+            ({"indent": 2}, json.dumps(DOC, indent=2)),
+            ({"indent": 2, "compact": True}, json.dumps(DOC, separators=(",", ":"))),
+        ]:
+            out = io.BytesIO()
+            write_json(DOC, out, **kwargs)
+            self.assertEqual(expected.encode(), out.getvalue())
+
+    def test_load_json(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for filename, compress in [("doc.json", False), ("doc.json.gz", True)]:
+                filename = os.path.join(tmpdir, filename)
+                with open_output(filename, compress) as out:
+                    write_json(DOC, out, compact=True)
+                self.assertEqual(DOC, load_json(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
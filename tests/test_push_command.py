@@ -1,6 +1,7 @@
 import unittest
 import json
 
+import numpy as np
 import openmdao.api as om
 from openmdao.test_suite.test_examples.test_betz_limit import ActuatorDisc
 from openmdao.test_suite.test_examples.beam_optimization.multipoint_beam_stress import (
@@ -69,6 +70,32 @@ def problem_init2():
     return prob
 
 
+class _FakeComm:
+    """Communicator of a 2 processes run where the other process sees the same model"""
+
+    size = 2
+
+    def __init__(self, rank):
+        self.rank = rank
+
+    def gather(self, obj, root=0):
+        return [obj, obj] if self.rank == root else None
+
+    def bcast(self, obj, root=0):
+        return obj if self.rank == root else []
+
+
+class _PiecesComm(_FakeComm):
+    """Communicator of a 2 processes run where the other process owns given values"""
+
+    def __init__(self, rank, other_values):
+        super().__init__(rank)
+        self.other_values = other_values
+
+    def gather(self, obj, root=0):
+        return [obj, self.other_values] if self.rank == root else None
+
+
 class TestPushCommand2(unittest.TestCase):
     def test_get_mda_attributes(self):
         problem = problem_init2()
@@ -76,6 +103,97 @@ class TestPushCommand2(unittest.TestCase):
         mda_attrs = push_cmd.get_mda_attributes(problem.model, push_cmd.tree)
         print(json.dumps(mda_attrs, indent=2))
 
+    def test_variables_unique_per_discipline(self):
+        problem = problem_init2()
+        push_cmd = PushCommand(problem, 0, False)
+        mda_attrs = push_cmd.get_mda_attributes(problem.model, push_cmd.tree)
+
+        def check(mda):
+            for disc in mda["disciplines_attributes"]:
+                names = [v["name"] for v in disc.get("variables_attributes", [])]
+                self.assertEqual(len(names), len(set(names)), disc["name"])
+                if disc.get("sub_analysis_attributes"):
+                    check(disc["sub_analysis_attributes"])
+
+        check(mda_attrs)
+
+    def test_get_mda_attributes_with_depth(self):
+        problem = problem_init2()
+        push_cmd = PushCommand(problem, 1, False)
+        mda_attrs = push_cmd.get_mda_attributes(
+            problem.model, push_cmd.tree, use_depth=True
+        )
+        # analyses below depth level are not built
+        self.assertEqual({0, 1}, {len(p.split(".")) if p else 0 for p in push_cmd.mdas})
+        for disc in mda_attrs["disciplines_attributes"]:
+            self.assertNotIn("sub_analysis_attributes", disc)
+        parallel = [
+            d for d in mda_attrs["disciplines_attributes"] if d["name"] == "parallel"
+        ]
+        self.assertTrue(parallel[0]["variables_attributes"])
+
+    def test_get_mda_attributes_by_depth(self):
+        problem = problem_init2()
+        push_cmd = PushCommand(problem, 0, False)
+        attrs_by_depth = push_cmd.get_mda_attributes_by_depth(
+            problem.model, push_cmd.tree, [0, 1, 2]
+        )
+        for depth in range(3):
+            push_cmd = PushCommand(problem, depth, False)
+            mda_attrs = push_cmd.get_mda_attributes(
+                problem.model, push_cmd.tree, use_depth=True
+            )
+            self.assertEqual(json.dumps(mda_attrs), json.dumps(attrs_by_depth[depth]))
+
+    def test_outputs_by_scope(self):
+        problem = problem_init2()
+        push_cmd = PushCommand(problem, 0, False)
+        push_cmd.get_mda_attributes(problem.model, push_cmd.tree)
+        outputs_by_scope = push_cmd._get_outputs_by_scope()
+        for scope, absnames in outputs_by_scope.items():
+            for absname in absnames:
+                self.assertTrue(absname.startswith(scope + "."))
+        for root in {name.split(".")[0] for name in push_cmd.vars["out"]}:
+            expected = [n for n in push_cmd.vars["out"] if n.startswith(root + ".")]
+            self.assertEqual(expected, outputs_by_scope[root])
+
+    def test_get_mda_attributes_gathered(self):
+        problem = problem_init2()
+        push_cmd = PushCommand(problem, 2, False)
+        expected = push_cmd.get_mda_attributes(
+            problem.model, push_cmd.tree, use_depth=True
+        )
+        for rank in (0, 1):
+            push_cmd = PushCommand(problem, 2, False)
+            push_cmd.comm = _FakeComm(rank)
+            push_cmd._distributed = True
+            mda_attrs = push_cmd.get_mda_attributes(
+                problem.model, push_cmd.tree, use_depth=True
+            )
+            if rank == 0:
+                self.assertEqual(json.dumps(expected), json.dumps(mda_attrs))
+            else:  # only root process gets attributes
+                self.assertIsNone(mda_attrs)
+
+    def test_distributed_output(self):
+        problem = om.Problem()
+        indeps = problem.model.add_subsystem("indeps", om.IndepVarComp())
+        indeps.add_output("x", np.array([1.0, 2.0]), distributed=True)
+        problem.setup()
+        problem.final_setup()
+        # as seen by the root process of a 2 processes run, each one owning 2 values
+        model = problem.model
+        for meta in (model._var_abs2meta, model._var_allprocs_abs2meta):
+            meta["output"]["indeps.x"].update(distributed=True, global_shape=(4,))
+        push_cmd = PushCommand(problem, 0, False)
+        push_cmd._collect_var_infos(problem)
+        self.assertEqual("(4,)", push_cmd.vars["out"]["indeps.x"].shape)
+
+        push_cmd.comm = _PiecesComm(0, {"indeps.x": np.array([3.0, 4.0])})
+        push_cmd._distributed = True
+        values = push_cmd._get_values({"indeps.x"})
+        self.assertEqual([1.0, 2.0, 3.0, 4.0], values["indeps.x"].tolist())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,17 +1,87 @@
 import os
+import sys
+import copy
+import json
 import unittest
 import numpy as np
 
 from whatsopt.push_utils import (
+    VarAttr,
+    VarInfo,
     build_variable_name,
     simple_value,
     format_shape,
     to_camelcase,
+    to_snakecase,
     extract_mda_var,
-    problem_pyfile,
+    find_indep_var_name,
+    get_connections,
+    get_indep_var_names,
+    get_model_tree,
+    merge_model_trees,
+    component_problem,
+    diff_mda_attrs,
+    new_diff_stats,
+    problems_not_run,
+    to_mda_dict,
 )
 
 
+def _set_ids(mda_attrs, ids=None):
+    # records ids as exported by the server
+    ids = ids if ids is not None else iter(range(1, 100000))
+    mda_attrs["id"] = next(ids)
+    for disc in mda_attrs["disciplines_attributes"]:
+        disc["id"] = next(ids)
+        for var in disc.get("variables_attributes", []):
+            var["id"] = next(ids)
+            if var.get("parameter_attributes"):
+                var["parameter_attributes"]["id"] = next(ids)
+        if disc.get("sub_analysis_attributes"):
+            _set_ids(disc["sub_analysis_attributes"], ids)
+
+
+def _records(mda_attrs):
+    # all nested records (disciplines, variables, parameters, sub-analyses)
+    for disc in mda_attrs.get("disciplines_attributes", []):
+        yield disc
+        for var in disc.get("variables_attributes", []):
+            yield var
+            if var.get("parameter_attributes"):
+                yield var["parameter_attributes"]
+        if disc.get("sub_analysis_attributes"):
+            yield disc["sub_analysis_attributes"]
+            yield from _records(disc["sub_analysis_attributes"])
+
+
+def _unidentified_changes(diff, ref_attrs):
+    # destroyed or modified records sent without id (duplicated or ignored by server)
+    ref_discs = {d["name"]: d for d in ref_attrs.get("disciplines_attributes", [])}
+    for disc in diff.get("disciplines_attributes", []):
+        ref_disc = ref_discs.get(disc.get("name"))
+        if disc.get("_destroy") or ref_disc is not None:
+            if "id" not in disc:
+                yield disc
+        if ref_disc is None:
+            continue
+        ref_vars = {
+            (v["name"], v["io_mode"]) for v in ref_disc.get("variables_attributes", [])
+        }
+        for var in disc.get("variables_attributes", []):
+            if var.get("_destroy") or (var.get("name"), var.get("io_mode")) in ref_vars:
+                if "id" not in var:
+                    yield var
+                param = var.get("parameter_attributes")
+                if param and "id" not in param:
+                    yield param
+        sub_diff = disc.get("sub_analysis_attributes")
+        ref_sub = ref_disc.get("sub_analysis_attributes")
+        if sub_diff and ref_sub:
+            if "id" not in sub_diff:
+                yield sub_diff
+            yield from _unidentified_changes(sub_diff, ref_sub)
+
+
 class TestPushUtils(unittest.TestCase):
     DATA_PATH = os.path.join(os.path.dirname(__file__), "data")
 
@@ -23,6 +93,11 @@ class TestPushUtils(unittest.TestCase):
         self.assertEqual("ToCamelCase", to_camelcase("to_camel_case"))
         self.assertEqual("Camel", to_camelcase("camel"))
 
+    def test_to_snakecase(self):
+        self.assertEqual("to_snake_case", to_snakecase("ToSnakeCase"))
+        self.assertEqual("snake", to_snakecase("snake"))
+        self.assertEqual("sellar_optim", to_snakecase("Sellar Optim"))
+
     def test_simple_value(self):
         dict1 = {"type": "Integer", "shape": "1", "value": 1}
         dict2 = {"type": "Float", "shape": "(1,)", "value": 1.2}
@@ -31,6 +106,69 @@ class TestPushUtils(unittest.TestCase):
         self.assertEqual("1.2", simple_value(dict2))
         self.assertEqual("[1.2, 2.3]", simple_value(dict3))
 
+    def test_simple_value_arrays(self):
+        ones = np.ones((2, 3))
+        ones.flags.writeable = False
+        self.assertEqual(
+            "", simple_value({"type": "Float", "shape": "(2, 3)", "value": ones})
+        )
+        self.assertEqual(
+            "", simple_value({"type": "Float", "shape": "(0,)", "value": np.ones(0)})
+        )
+        self.assertEqual(
+            "[1.0, 0.0]",
+            simple_value(
+                {"type": "Float", "shape": "(2,)", "value": np.array([True, False])}
+            ),
+        )
+        self.assertEqual(
+            "[1.0, nan]",
+            simple_value(
+                {"type": "Float", "shape": "(2,)", "value": np.array([1.0, np.nan])}
+            ),
+        )
+        value = np.array([1.0, 2.0])
+        var = {"type": "Float", "shape": "(2,)", "value": value}
+        self.assertEqual("[1.0, 2.0]", simple_value(var))
+        self.assertIs(value, var["value"])
+
+    def test_to_mda_dict(self):
+        info = VarInfo("x", "Float", "".join(["(2,", ")"]), "m")
+        self.assertIs(sys.intern("(2,)"), info.shape)
+        vattr = VarAttr("x", "out", "abscissa", info, init="[1.0, 2.0]")
+        mda = {
+            "disciplines_attributes": [
+                {"name": "__DRIVER__", "variables_attributes": [vattr]},
+                {
+                    "name": "Sub",
+                    "sub_analysis_attributes": {
+                        "disciplines_attributes": [
+                            {
+                                "name": "Disc",
+                                "variables_attributes": [vattr.with_io_mode("in")],
+                            }
+                        ]
+                    },
+                },
+            ]
+        }
+        to_mda_dict(mda)
+        self.assertEqual(
+            {
+                "name": "x",
+                "io_mode": "out",
+                "desc": "abscissa",
+                "type": "Float",
+                "shape": "(2,)",
+                "units": "m",
+                "parameter_attributes": {"init": "[1.0, 2.0]"},
+            },
+            mda["disciplines_attributes"][0]["variables_attributes"][0],
+        )
+        sub = mda["disciplines_attributes"][1]["sub_analysis_attributes"]
+        vattr = sub["disciplines_attributes"][0]["variables_attributes"][0]
+        self.assertEqual("in", vattr["io_mode"])
+
     def test_extract_mda_var(self):
         val1, val2 = extract_mda_var("a.b.c.d")
         self.assertEqual(["a", "b", "c"], val1)
@@ -38,13 +176,227 @@ class TestPushUtils(unittest.TestCase):
         # raise Exception
         self.assertRaises(Exception, extract_mda_var, "a")
 
-    def test_generate_problem_pyfile(self):
-        with problem_pyfile(
-            os.path.join(self.DATA_PATH, "disc1.py"), "Disc1"
-        ) as pbfile:
-            self.assertTrue(os.path.exists(pbfile))
-            self.assertTrue(os.system("python {}".format(pbfile)) == 0)
-        self.assertFalse(os.path.exists(pbfile))
+    def test_get_indep_var_names(self):
+        import openmdao.api as om
+
+        pb = om.Problem(reports=False)
+        pb.model.add_subsystem("c1", om.ExecComp("y = 2 * x"), promotes=["x"])
+        pb.model.add_subsystem("c2", om.ExecComp("z = 3 * y"))
+        pb.model.connect("c1.y", "c2.y")
+        pb.setup()
+        pb.final_setup()
+        names = get_indep_var_names(pb)
+        self.assertEqual("x", names["_auto_ivc.v0"])
+        self.assertEqual("c2.y", names["c1.y"])
+        self.assertEqual("x", find_indep_var_name(pb, "_auto_ivc.v0"))
+        self.assertIsNone(find_indep_var_name(pb, "c2.z"))
+
+    def test_get_model_tree(self):
+        import openmdao.api as om
+
+        pb = om.Problem(reports=False)
+        par = pb.model.add_subsystem("par", om.ParallelGroup())
+        for i in range(3):
+            point = par.add_subsystem(f"pt{i}", om.Group())
+            point.add_subsystem("c1", om.ExecComp("y = 2 * x"))
+            point.add_subsystem("c2", om.ExecComp("z = 3 * y"))
+            point.connect("c1.y", "c2.y")
+        pb.model.add_subsystem("post", om.ExecComp("s = z0 + z1"))
+        pb.model.connect("par.pt1.c2.z", "post.z1")
+        pb.model.connect("par.pt0.c2.z", "post.z0")
+        pb.setup()
+        pb.final_setup()
+
+        tree = get_model_tree(pb.model)
+        self.assertEqual(
+            ["_auto_ivc", "par", "post"], [c["name"] for c in tree["children"]]
+        )
+        par_tree = tree["children"][1]
+        self.assertEqual("group", par_tree["subsystem_type"])
+        points = par_tree["children"]
+        self.assertEqual(["pt0", "pt1", "pt2"], [c["name"] for c in points])
+        self.assertEqual(["c1", "c2"], [c["name"] for c in points[0]["children"]])
+        # identical points share their subtree
+        self.assertIs(points[0]["children"], points[2]["children"])
+
+        self.assertEqual("indep", tree["children"][0]["component_type"])
+
+        conns = get_connections(pb.model)
+        self.assertEqual(
+            sorted((c["src"], c["tgt"]) for c in conns),
+            [(c["src"], c["tgt"]) for c in conns],
+        )
+        self.assertIn({"src": "par.pt1.c2.z", "tgt": "post.z1"}, conns)
+        self.assertEqual(len(pb.model._conn_global_abs_in2out), len(conns))
+
+    def test_merge_model_trees(self):
+        def comp(name):
+            return {"name": name, "type": "subsystem", "subsystem_type": "component"}
+
+        def remote(name):
+            return {"name": name, "type": "subsystem", "remote": True}
+
+        def group(name, children):
+            return {
+                "name": name,
+                "type": "subsystem",
+                "subsystem_type": "group",
+                "children": children,
+            }
+
+        def root(children):
+            return {
+                "name": "root",
+                "type": "root",
+                "subsystem_type": "group",
+                "children": children,
+            }
+
+        # parallel group points set up in different processes
+        tree0 = root(
+            [comp("c0"), group("par", [group("pt0", [comp("c")]), remote("pt1")])]
+        )
+        tree1 = root(
+            [comp("c0"), group("par", [remote("pt0"), group("pt1", [comp("c")])])]
+        )
+        self.assertEqual(
+            root(
+                [
+                    comp("c0"),
+                    group(
+                        "par", [group("pt0", [comp("c")]), group("pt1", [comp("c")])]
+                    ),
+                ]
+            ),
+            merge_model_trees([tree0, tree1]),
+        )
+
+    def test_problems_not_run(self):
+        import openmdao.api as om
+
+        pb = om.Problem(reports=False)
+        pb.model.add_subsystem("c1", om.ExecComp("y = 2 * x"), promotes=["*"])
+        pb.setup()
+        pb.set_val("x", 3.0)
+        with problems_not_run():
+            pb.run_model()
+            pb.run_driver()
+        self.assertEqual(1.0, pb.get_val("y")[0])
+        pb.run_model()
+        self.assertEqual(6.0, pb.get_val("y")[0])
+
+    def test_component_problem(self):
+        files = set(os.listdir(self.DATA_PATH))
+        pb = component_problem(os.path.join(self.DATA_PATH, "disc1.py"), "Disc1")
+        self.assertEqual("Disc1Component", pb.model.__class__.__name__)
+        self.assertEqual(
+            ["indeps.x", "indeps.y2", "indeps.z"],
+            sorted(pb.model.indeps._var_abs2meta["output"]),
+        )
+        self.assertEqual(2.0, pb.get_val("x")[0])
+        self.assertEqual(files, set(os.listdir(self.DATA_PATH)))  # no file written
+        with self.assertRaises(ValueError):
+            component_problem(os.path.join(self.DATA_PATH, "disc1.py"), "Disc3")
+
+    def test_diff_mda_attrs(self):
+        with open(os.path.join(self.DATA_PATH, "multipoint_beam_group_d2.json")) as f:
+            mda_attrs = json.load(f)
+        ref_attrs = copy.deepcopy(mda_attrs)
+        self.assertIsNone(diff_mda_attrs(mda_attrs, ref_attrs))
+        # removed records without id (older export) can not be destroyed
+        removed_disc = mda_attrs["disciplines_attributes"].pop()
+        with self.assertRaises(ValueError) as cm:
+            diff_mda_attrs(mda_attrs, ref_attrs)
+        self.assertIn(removed_disc["name"], str(cm.exception))
+        mda_attrs = copy.deepcopy(ref_attrs)
+        _set_ids(ref_attrs)
+
+        discs = {d["name"]: d for d in mda_attrs["disciplines_attributes"]}
+        discs["Interp"]["variables_attributes"][0]["shape"] = "(1, 51)"
+        new_var = {
+            "name": "new",
+            "io_mode": "in",
+            "desc": "",
+            "type": "Float",
+            "shape": "1",
+        }
+        discs["IComp"]["variables_attributes"].append(new_var)
+        mda_attrs["disciplines_attributes"].remove(discs["VolumeComp"])
+        sub_discs = discs["Parallel"]["sub_analysis_attributes"][
+            "disciplines_attributes"
+        ]
+        removed = sub_discs[1]["variables_attributes"].pop()
+        # unset and empty attributes are the same
+        ref_attrs["disciplines_attributes"][1]["variables_attributes"][0]["units"] = ""
+
+        stats = new_diff_stats()
+        diff = diff_mda_attrs(mda_attrs, ref_attrs, stats)
+        self.assertNotIn("name", diff)
+        self.assertEqual(
+            ["Interp", "IComp", "Parallel", None],  # removed one only identified
+            [d.get("name") for d in diff["disciplines_attributes"]],
+        )
+        interp, icomp, parallel, volume_comp = diff["disciplines_attributes"]
+        ref_discs = {d["name"]: d for d in ref_attrs["disciplines_attributes"]}
+        ref_var = ref_discs["Interp"]["variables_attributes"][0]
+        self.assertEqual(
+            [dict(discs["Interp"]["variables_attributes"][0], id=ref_var["id"])],
+            interp["variables_attributes"],
+        )
+        self.assertEqual([new_var], icomp["variables_attributes"])
+        self.assertEqual(ref_discs["IComp"]["id"], icomp["id"])
+        self.assertEqual(
+            {"id": ref_discs["VolumeComp"]["id"], "_destroy": True}, volume_comp
+        )
+        sub_diff = parallel["sub_analysis_attributes"]
+        ref_sub = ref_discs["Parallel"]["sub_analysis_attributes"]
+        self.assertEqual(ref_sub["id"], sub_diff["id"])
+        ref_removed = ref_sub["disciplines_attributes"][1]["variables_attributes"][-1]
+        self.assertEqual(removed["name"], ref_removed["name"])
+        self.assertEqual(
+            [{"id": ref_removed["id"], "_destroy": True}],
+            sub_diff["disciplines_attributes"][0]["variables_attributes"],
+        )
+        self.assertEqual({"added": 0, "changed": 4, "removed": 1}, stats["disciplines"])
+        self.assertEqual({"added": 1, "changed": 1, "removed": 3}, stats["variables"])
+
+    def test_diff_mda_attrs_unidentified(self):
+        with open(os.path.join(self.DATA_PATH, "multipoint_beam_group_d2.json")) as f:
+            mda_attrs = json.load(f)
+        ref_attrs = copy.deepcopy(mda_attrs)
+        _set_ids(ref_attrs)
+        discs = mda_attrs["disciplines_attributes"]
+        discs[1]["variables_attributes"][0]["desc"] = "changed"
+        discs[2]["variables_attributes"].pop()
+        discs.pop()
+        for disc in discs:
+            sub_mdattrs = disc.get("sub_analysis_attributes")
+            if sub_mdattrs:
+                sub_mdattrs["disciplines_attributes"][0]["variables_attributes"].pop()
+        diff = diff_mda_attrs(mda_attrs, ref_attrs)
+        self.assertEqual([], list(_unidentified_changes(diff, ref_attrs)))
+        # whichever reference record lacks its id, none is sent unidentified
+        for i in range(len(list(_records(ref_attrs)))):
+            ref = copy.deepcopy(ref_attrs)
+            del list(_records(ref))[i]["id"]
+            try:
+                diff = diff_mda_attrs(mda_attrs, ref)
+            except ValueError:
+                continue
+            self.assertEqual([], list(_unidentified_changes(diff, ref)))
+
+    def test_diff_mda_attrs_order(self):
+        with open(os.path.join(self.DATA_PATH, "multipoint_beam_group_d2.json")) as f:
+            mda_attrs = json.load(f)
+        ref_attrs = copy.deepcopy(mda_attrs)
+        _set_ids(ref_attrs)
+        discs = mda_attrs["disciplines_attributes"]
+        discs[1], discs[2] = discs[2], discs[1]
+        diff = diff_mda_attrs(mda_attrs, ref_attrs)
+        self.assertEqual(
+            [(discs[1]["name"], 1), (discs[2]["name"], 2)],
+            [(d["name"], d["position"]) for d in diff["disciplines_attributes"]],
+        )
 
     def test_build_varname(self):
         name = build_variable_name("12", "ab", 7)
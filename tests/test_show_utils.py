@@ -0,0 +1,144 @@
+import os
+import json
+import sys
+import tempfile
+import unittest
+from whatsopt.show_utils import (
+    generate_xdsm,
+    generate_xdsm_html,
+    generate_xdsm_site,
+    write_xdsm_assets,
+    xdsm_assets,
+)
+
+
+def varattr(name, io_mode):
+    return {"name": name, "io_mode": io_mode, "desc": "", "type": "Float", "shape": "1"}
+
+
+MDA_ATTRS = {
+    "name": "Top",
+    "disciplines_attributes": [
+        {
+            "name": "__DRIVER__",
+            "variables_attributes": [varattr("x", "out"), varattr("z", "in")],
+        },
+        {
+            "name": "Disc1",
+            "variables_attributes": [varattr("x", "in"), varattr("y", "out")],
+        },
+        {
+            "name": "Sub",
+            "sub_analysis_attributes": {
+                "name": "Sub",
+                "disciplines_attributes": [
+                    {
+                        "name": "__DRIVER__",
+                        "variables_attributes": [
+                            varattr("y", "out"),
+                            varattr("z", "in"),
+                        ],
+                    },
+                    {
+                        "name": "Disc2",
+                        "variables_attributes": [
+                            varattr("y", "in"),
+                            varattr("z", "out"),
+                        ],
+                    },
+                ],
+            },
+        },
+    ],
+}
+
+
+class TestShowUtils(unittest.TestCase):
+    def test_generate_xdsm(self):
+        xdsm = generate_xdsm(MDA_ATTRS)
+        self.assertEqual(["root", "Sub"], list(xdsm.keys()))
+
+        root = xdsm["root"]
+        self.assertEqual(
+            [
+                {"id": "_U_", "name": "Driver", "type": "driver"},
+                {"id": "Disc1", "name": "Disc1", "type": "analysis"},
+                {"id": "Sub", "name": "Sub", "type": "mda", "subxdsm": "Sub"},
+            ],
+            root["nodes"],
+        )
+        self.assertEqual(
+            [
+                {"from": "Sub", "to": "_U_", "name": "z"},
+                {"from": "_U_", "to": "Disc1", "name": "x"},
+                {"from": "Disc1", "to": "Sub", "name": "y"},
+            ],
+            root["edges"],
+        )
+        self.assertEqual(
+            [
+                {"from": "Disc2", "to": "_U_", "name": "z"},
+                {"from": "_U_", "to": "Disc2", "name": "y"},
+            ],
+            xdsm["Sub"]["edges"],
+        )
+        self.assertEqual(["_U_", ["Disc1", "Sub"]], root["workflow"])
+        self.assertEqual(["_U_", ["Disc2"]], xdsm["Sub"]["workflow"])
+
+    def test_generate_xdsm_html(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfile = os.path.join(tmpdir, "xdsm.html")
+            generate_xdsm_html("test", generate_xdsm(MDA_ATTRS), outfile)
+            with open(outfile) as f:
+                html = f.read()
+        self.assertIn(json.dumps(generate_xdsm(MDA_ATTRS)), html)
+
+    def test_write_xdsm_assets(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            css_path, js_path = write_xdsm_assets(tmpdir)
+            self.assertRegex(css_path, r"^assets/xdsmjs\.[0-9a-f]{12}\.css$")
+            self.assertRegex(js_path, r"^assets/xdsmjs\.[0-9a-f]{12}\.js$")
+            with open(os.path.join(tmpdir, js_path)) as f:
+                self.assertEqual(xdsm_assets()[1], f.read())
+            # unchanged assets are not rewritten
+            mtime = os.path.getmtime(os.path.join(tmpdir, css_path))
+            os.utime(os.path.join(tmpdir, css_path), (mtime - 10, mtime - 10))
+            self.assertEqual((css_path, js_path), write_xdsm_assets(tmpdir))
+            self.assertEqual(
+                mtime - 10, os.path.getmtime(os.path.join(tmpdir, css_path))
+            )
+
+    def test_generate_xdsm_site(self):
+        def failing():
+            sys.exit(-1)
+
+        xdsm = generate_xdsm(MDA_ATTRS)
+        pages = [
+            {"filename": "top.html", "title": "Top", "source": "test", "xdsm": xdsm},
+            {
+                "filename": "top2.html",
+                "title": "Top2",
+                "source": "test",
+                "xdsm": lambda: xdsm,
+            },
+            {"filename": "bad.html", "title": "Bad", "source": "test", "xdsm": failing},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = generate_xdsm_site(tmpdir, pages, "Project", jobs=2)
+            self.assertEqual([None, None, "failed"], [err for _, err in results])
+            self.assertEqual(
+                ["assets", "index.html", "top.html", "top2.html"],
+                sorted(os.listdir(tmpdir)),
+            )
+            with open(os.path.join(tmpdir, "top2.html")) as f:
+                html = f.read()
+            self.assertIn(json.dumps(xdsm), html)
+            self.assertNotIn(xdsm_assets()[1], html)
+            with open(os.path.join(tmpdir, "index.html")) as f:
+                index = f.read()
+            self.assertIn('<a href="top.html">Top</a>', index)
+            self.assertIn("Bad (failed)", index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import unittest
 from openmdao.api import CaseReader
 
@@ -6,6 +7,11 @@ from whatsopt.upload_utils import (
     load_from_csv,
     load_from_sqlite,
     load_from_hdf5,
+    load_sqlite_file,
+    set_sqlite_cache_size,
+    load_vars_init,
+    load_design_vars,
+    format_init_value,
     _format_upload_cases,
     _check_count,
 )
@@ -39,6 +45,19 @@ class TestUploadUtils(unittest.TestCase):
         for i in statuses:
             self.assertEqual(1, i)
 
+    def test_load_sqlite_file_cached(self):
+        filepath = os.path.join(TestUploadUtils.DATA_PATH, "test_doe.sqlite")
+        set_sqlite_cache_size()
+        try:
+            name, cases, statuses = load_sqlite_file(filepath)
+            cases[0]["values"].append(0.0)
+            name2, cases2, statuses2 = load_sqlite_file(filepath)
+        finally:
+            set_sqlite_cache_size(0)
+        self.assertEqual(name, name2)
+        self.assertEqual(len(cases[0]["values"]) - 1, len(cases2[0]["values"]))
+        self.assertEqual(statuses, statuses2)
+
     @unittest.skipUnless(GEMSEO_INSTALLED, "GEMSEO not installed")
     def test_load_from_hdf5(self):
         filepath = os.path.join(TestUploadUtils.DATA_PATH, "test_doe.hdf5")
@@ -74,6 +93,31 @@ class TestUploadUtils(unittest.TestCase):
         self.assertEqual(2 * n, len(cases2[0]["values"]))
         self.assertEqual(2 * n, len(statuses2))
 
+    def test_load_vars_init(self):
+        filepath = os.path.join(TestUploadUtils.DATA_PATH, "mda_init.py")
+        self.assertEqual({"x": 2, "z": [5, 2]}, load_vars_init(filepath))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "mda_init.py")
+            for body in ["mda.set_val('x', 2)", "mda['z'] = mda['x']"]:
+                with open(filepath, "w") as f:
+                    f.write(f"def initialize(mda):\n    {body}\n")
+                self.assertIsNone(load_vars_init(filepath))  # needs a problem
+            with open(filepath, "w") as f:
+                f.write("def initialize(mda):\n    mda['x'] = undefined\n")
+            with self.assertRaises(NameError):  # user error not hidden by fallback
+                load_vars_init(filepath)
+
+    def test_format_init_value(self):
+        self.assertEqual("[2.0]", format_init_value(2))
+        self.assertEqual("[5.0, 2.0]", format_init_value([5, 2]))
+        self.assertEqual("[2.0, 2.0]", format_init_value(2, (2,)))
+
+    def test_load_design_vars(self):
+        dirname = os.path.join(TestUploadUtils.DATA_PATH, "multipoint_beam")
+        self.assertEqual({"h_cp": [1.0, 1.0, 1.0, 1.0, 1.0]}, load_design_vars(dirname))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.assertIsNone(load_design_vars(tmpdir))
+
     def test_check_count(self):
         dict1 = {"A": [1, 2], "B": [3, 4], "C": [5, 6]}
         dict2 = {"A": [1, 2], "B": [3, 4], "C": [5, 6, 7]}
@@ -4,6 +4,8 @@ import tempfile
 
 from whatsopt.utils import (
     WOP_CONF_FILENAME,
+    file_hash,
+    get_files_manifest,
     is_analysis_user_file,
     is_based_on,
     is_user_file,
@@ -29,7 +31,7 @@ class TestUtils(unittest.TestCase):
 
     def test_save_load_state(self):
         state = {
-            "wop_format_version": 2,
+            "wop_format_version": 3,
             "whatsopt_url": "https://example.com",
             "analysis_id": 666,
             "framework": "openmdao",
@@ -44,6 +46,35 @@ class TestUtils(unittest.TestCase):
         retrieved = load_state()
         self.assertEqual(state, retrieved)
 
+    def test_save_load_state_with_files(self):
+        files = {
+            "sellar/disc1_base.py": "0123456789abcdef",
+            "sellar/__init__.py": "fedcba9876543210",
+        }
+        state = {
+            "wop_format_version": 3,
+            "whatsopt_url": "https://example.com",
+            "analysis_id": 666,
+            "framework": "openmdao",
+            "pull_mode": "package",
+            "files": files,
+        }
+        save_state(state)
+        self.assertEqual(state, load_state())
+        self.assertEqual(files, get_files_manifest())
+
+    def test_file_hash(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "test.py")
+            with open(filename, "w") as f:
+                f.write("print('hello')")
+            h = file_hash(filename)
+            self.assertEqual(64, len(h))
+            self.assertEqual(h, file_hash(filename))
+            with open(filename, "w") as f:
+                f.write("print('hello world')")
+            self.assertNotEqual(h, file_hash(filename))
+
     def test_load_state_old_format(self):
         state = {
             "wop_format_version": 1,
@@ -70,6 +101,12 @@ class TestUtils(unittest.TestCase):
         )
         self.assertEqual(state, retrieved)
 
+    def test_load_state_newer_format(self):
+        with open(WOP_CONF_FILENAME, "w") as f:
+            f.write("wop_format_version = 99\n")
+        with self.assertRaises(SystemExit):
+            load_state()
+
     def test_is_user_file(self):
         self.assertEqual(True, is_user_file("test.py"))
         self.assertEqual(False, is_user_file("test_base.py"))
@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+from whatsopt.watch_utils import changed_files, drop_modules, file_mtimes, watch
+
+
+class TestWatchUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base = self._write("wop_watch_base.py", "class Base:\n    pass\n")
+        self._write("wop_watch_derived.py", "from wop_watch_base import Base\n")
+        self._write("wop_watch_other.py", "X = 1\n")
+        sys.path.insert(0, self.tmpdir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.tmpdir.name)
+        for name in ["wop_watch_base", "wop_watch_derived", "wop_watch_other"]:
+            sys.modules.pop(name, None)
+        self.tmpdir.cleanup()
+
+    def _write(self, filename, content):
+        path = os.path.join(self.tmpdir.name, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_changed_files(self):
+        mtimes = file_mtimes([self.base, "not_found.py"])
+        self.assertIsNone(mtimes["not_found.py"])
+        self.assertEqual([], changed_files(mtimes))
+        os.utime(self.base, ns=(0, 0))
+        self.assertEqual([self.base], changed_files(mtimes))
+
+    def test_drop_modules(self):
+        import wop_watch_derived  # noqa: F401
+        import wop_watch_other  # noqa: F401
+
+        self.assertEqual(
+            ["wop_watch_base", "wop_watch_derived"], drop_modules([self.base])
+        )
+        self.assertNotIn("wop_watch_base", sys.modules)
+        self.assertIn("wop_watch_other", sys.modules)
+
+    def test_watch(self):
+        results = [{"name": "A"}, {"name": "A"}, {"name": "B"}]
+        updates = []
+
+        def discover():
+            attrs = results.pop(0)
+            os.utime(self.base, ns=(len(results), len(results)))  # next change
+            if attrs is None:
+                raise ValueError("bad file")
+            return attrs
+
+        watch(self.base, discover, updates.append, interval=0.01, max_runs=3)
+        self.assertEqual([{"name": "A"}, {"name": "B"}], updates)
+
+        results = [{"name": "A"}, None, {"name": "A"}]
+        updates = []
+        watch(self.base, discover, updates.append, interval=0.01, max_runs=3)
+        self.assertEqual([{"name": "A"}], updates)
+
+
+if __name__ == "__main__":
+    unittest.main()
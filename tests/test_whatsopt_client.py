@@ -1,4 +1,14 @@
+import os
+import socket
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from openmdao.utils import hooks
+from whatsopt.utils import file_hash, get_files_manifest
+from whatsopt import whatsopt_client
 from whatsopt.whatsopt_client import WhatsOpt, EXTRANET_SERVER_URL
 
 
@@ -7,3 +17,192 @@ class WhatsOptClientTest(unittest.TestCase):
         # Check backward compatibility for FASTOAD
         wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
         self.assertEqual(EXTRANET_SERVER_URL, wop.url)
+
+    def test_session_per_thread(self):
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        self.assertIs(wop.session, wop.session)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other = executor.submit(lambda: wop.session).result()
+        self.assertIsNot(wop.session, other)
+
+    def test_concurrent_remotes_updates(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "remotes")
+            with mock.patch.object(whatsopt_client, "REMOTES_FILENAME", filename):
+                WhatsOpt._write_remotes({"ether": {"url": "u", "api_key": "k"}})
+
+                def add(i):
+                    WhatsOpt._update_remotes(
+                        lambda r: r.update({f"r{i}": {"url": "u", "api_key": "k"}})
+                    )
+                    return len(WhatsOpt._read_remotes())
+
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    sizes = list(executor.map(add, range(50)))
+                remotes = WhatsOpt._read_remotes()
+        # no update lost, readers never see a partially written file
+        self.assertEqual(51, len(remotes))
+        self.assertTrue(all(size >= 2 for size in sizes))
+
+    def test_get_project_analyses(self):
+        project = {
+            "name": "proj",
+            "analyses_attributes": [{"name": "a"}, {"name": "b"}],
+        }
+        listed = [
+            {"id": 1, "name": "a"},
+            {"id": 2, "name": "b"},
+            {"id": 3, "name": "b"},  # same name in another project
+            {"id": 4, "name": "c"},
+        ]
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        urls = []
+
+        def get(url, **kwargs):
+            urls.append(url)
+            data = project if url.endswith(".wopjson") else listed
+            return mock.Mock(ok=True, json=lambda: data)
+
+        with mock.patch.object(WhatsOpt, "session", mock.Mock(get=get)):
+            # names only (project export): ambiguous ones skipped
+            self.assertEqual([1], [m["id"] for m in wop._get_project_analyses(7)])
+            project["analyses_attributes"] = [{"id": 1, "name": "a"}]
+            self.assertEqual([1], [m["id"] for m in wop._get_project_analyses(7)])
+            self.assertTrue(any(url.endswith(".wopjson") for url in urls))
+            # listed project ids: no project export
+            for i, mda in enumerate(listed):
+                mda["design_project_id"] = 7 if i < 2 else 8
+            del urls[:]
+            self.assertEqual([1, 2], [m["id"] for m in wop._get_project_analyses(7)])
+            self.assertEqual(1, len(urls))
+            self.assertFalse(urls[0].endswith(".wopjson"))
+
+    def test_probe_unreachable_remote(self):
+        res = WhatsOpt._probe_remote("http://127.0.0.1:1", "api_key", timeout=1)
+        self.assertEqual("unreachable", res["status"])
+
+    def test_install_mda_code_manifest(self):
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            try:
+                gendir = os.path.join(tmpdir, "generated")
+                os.mkdir(gendir)
+                for f, content in [("disc_base.py", "base"), ("disc.py", "user")]:
+                    with open(os.path.join(gendir, f), "w") as fd:
+                        fd.write(content)
+                with open("disc.py", "w") as fd:
+                    fd.write("user modified")
+                wop._install_mda_code(
+                    1,
+                    "openmdao",
+                    gendir,
+                    ["disc_base.py", "disc.py"],
+                    {"--update": True},
+                    "pulled",
+                    True,
+                )
+                # kept user modified file is not recorded as pristine
+                self.assertEqual(
+                    {"disc_base.py": file_hash("disc_base.py")}, get_files_manifest()
+                )
+            finally:
+                os.chdir(cwd)
+
+    def test_upload_vars_init_cmd(self):
+        init_file = os.path.join(os.path.dirname(__file__), "data", "mda_init.py")
+        options = {"--dry-run": False, "--analysis-id": 1}
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        uploaded = []
+        wop.upload_parameters = lambda parameters, options: uploaded.append(parameters)
+        wop._get_design_var_names = lambda options: ["x", "z"]
+        with self.assertRaises(SystemExit):
+            wop.upload_vars_init_cmd(init_file, options)
+        # same values as the ones got from the problem
+        self.assertEqual(
+            [
+                {"varname": "x", "value": "[2.0]"},
+                {"varname": "z", "value": "[5.0, 2.0]"},
+            ],
+            uploaded[0],
+        )
+        # design variable left to its default: values got from run_mda.py problem
+        wop._get_design_var_names = lambda options: ["x", "z", "w"]
+        try:
+            with self.assertRaises(SystemExit):
+                wop.upload_vars_init_cmd(init_file, options)
+        finally:
+            hooks._reset_all_hooks()
+            hooks.use_hooks = False
+        self.assertEqual(uploaded[0], uploaded[1])
+
+    def test_upload_vars_init_cmd_dry_run(self):
+        init_file = os.path.join(os.path.dirname(__file__), "data", "mda_init.py")
+        options = {"--dry-run": True, "--analysis-id": 1}
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        uploaded = []
+        wop.upload_parameters = lambda parameters, options: uploaded.append(parameters)
+        with self.assertRaises(SystemExit):  # neither server nor problem needed
+            wop.upload_vars_init_cmd(init_file, options)
+        self.assertEqual(["[2.0]", "[5.0, 2.0]"], [p["value"] for p in uploaded[0]])
+
+    def test_upload_vars_init_cmd_generated_defaults(self):
+        options = {"--dry-run": False, "--analysis-id": 1}
+        wop = WhatsOpt(url=EXTRANET_SERVER_URL, login=False)
+        uploaded = []
+        wop.upload_parameters = lambda parameters, options: uploaded.append(parameters)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "mda_init.py"), "w") as f:
+                f.write("def initialize(mda):\n    mda['x'] = 2\n    mda['z'] = 3\n")
+            with open(os.path.join(tmpdir, "sellar_base.py"), "w") as f:
+                f.write(
+                    "def setup(self):\n"
+                    "    indeps = self.add_subsystem('indeps', IndepVarComp())\n"
+                    "    indeps.add_output('w')\n"
+                    "    indeps.add_output('x', 1.0)\n"
+                    "    indeps.add_output('z', [5.0, 2.0])\n"
+                )
+            with self.assertRaises(SystemExit):  # neither server nor problem needed
+                wop.upload_vars_init_cmd(os.path.join(tmpdir, "mda_init.py"), options)
+        self.assertEqual(
+            [
+                {"varname": "w", "value": "[1.0]"},
+                {"varname": "x", "value": "[2.0]"},
+                {"varname": "z", "value": "[3.0, 3.0]"},
+            ],
+            uploaded[0],
+        )
+
+    def test_probe_all_analysis_of_other_remote(self):
+        remotes = {"other": {"url": "http://127.0.0.1:1", "api_key": "key"}}
+        res = WhatsOpt._probe_all(remotes, 12, 1, mda_url="https://example.com")
+        self.assertEqual("n/a", res["other"]["analysis"])
+
+    def test_probe_all_total_timeout(self):
+        # server sending its response slowly enough to never hit the read timeout
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        stop = threading.Event()
+
+        def drip():
+            conn, _ = server.accept()
+            conn.recv(1024)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 1000\r\n\r\n")
+            while not stop.wait(0.1):
+                conn.sendall(b" ")
+            conn.close()
+
+        threading.Thread(target=drip, daemon=True).start()
+        url = "http://127.0.0.1:{}".format(server.getsockname()[1])
+        start = time.monotonic()
+        try:
+            res = WhatsOpt._probe_all(
+                {"slow": {"url": url, "api_key": "key"}}, timeout=0.5
+            )
+        finally:
+            stop.set()
+            server.close()
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual({}, res)  # still running: reported as timeout
@@ -1,7 +1,11 @@
 import os
+import sys
 import unittest
 import subprocess
+import glob
+import shutil
 import json
+import tempfile
 
 dname = os.path.dirname
 
@@ -12,6 +16,9 @@ def file(name):
 
 COMMANDS = [
     "wop push -n {}".format(file("sellar.py")),
+    "wop push -n --compact -o {} {}".format(
+        os.path.join(tempfile.gettempdir(), "wop_test_push.json.gz"), file("sellar.py")
+    ),
     "wop upload -n -a 1 {}".format(file("mda_init.py")),
     "wop upload -n {}".format(file("test_doe.csv")),
     "wop upload -n {}".format(file("test_doe.sqlite")),
@@ -21,6 +28,16 @@ COMMANDS = [
     "wop show -b --depth 2 -f {}".format(
         file("multipoint_beam/multipoint_beam_group.py")
     ),
+    "wop show -b -d 1 -d 2 -o {} -f {}".format(
+        os.path.join(tempfile.gettempdir(), "wop_test_xdsm.html"),
+        file("multipoint_beam/multipoint_beam_group.py"),
+    ),
+    "wop show -b -A -o {} -f {}".format(
+        os.path.join(tempfile.gettempdir(), "wop_test_xdsm.html"), file("sellar.py")
+    ),
+    "wop show -b -d 1 -d 2 --site {} -f {}".format(
+        os.path.join(tempfile.gettempdir(), "wop_test_site"), file("sellar.py")
+    ),
     "wop status",
     "wop convert {}".format(file("test_doe.sqlite")),
 ]
@@ -47,8 +64,46 @@ class TestWopCommand(unittest.TestCase):
     def test_commands(self):
         for cmd in COMMANDS:
             self._test_wop_cmd(cmd)
-        if os.path.exists("test_doe.csv"):
-            os.remove("test_doe.csv")
+        for generated in ["test_doe.csv", "xdsm.html"]:
+            if os.path.exists(generated):
+                os.remove(generated)
+        for generated in glob.glob(
+            os.path.join(tempfile.gettempdir(), "wop_test_xdsm*")
+        ):
+            os.remove(generated)
+        if os.path.exists(os.path.join(tempfile.gettempdir(), "wop_test_push.json.gz")):
+            os.remove(os.path.join(tempfile.gettempdir(), "wop_test_push.json.gz"))
+        shutil.rmtree(
+            os.path.join(tempfile.gettempdir(), "wop_test_site"), ignore_errors=True
+        )
+
+    def test_push_output_without_dry_run(self):
+        proc = subprocess.run(
+            ["wop", "push", "--compact", file("sellar.py")],
+            env=dict(os.environ, WOP_NO_DAEMON="1"),
+            capture_output=True,
+            encoding="utf-8",
+        )
+        self.assertEqual(2, proc.returncode)  # usage error, nothing pushed
+        self.assertIn("--compact works only with --dry-run", proc.stderr)
+        proc = subprocess.run(
+            ["wop", "push", "-n", "--gzip", file("sellar.py")],
+            env=dict(os.environ, WOP_NO_DAEMON="1"),
+            capture_output=True,
+            encoding="utf-8",
+        )
+        self.assertEqual(2, proc.returncode)
+        self.assertIn("--gzip works only with --output", proc.stderr)
+
+    def test_pull_output_without_json(self):
+        proc = subprocess.run(
+            ["wop", "pull", "--pretty", "1"],
+            env=dict(os.environ, WOP_NO_DAEMON="1"),
+            capture_output=True,
+            encoding="utf-8",
+        )
+        self.assertEqual(2, proc.returncode)  # usage error, nothing pulled
+        self.assertIn("--pretty works only with --json", proc.stderr)
 
     def test_push_depth(self):
         self.maxDiff = None
@@ -65,5 +120,62 @@ class TestWopCommand(unittest.TestCase):
                 self.assertTrue(expected, actual)
 
 
+# Lightweight commands should not pay for heavy imports (OpenMDAO, NumPy...)
+LIGHT_COMMANDS = [
+    ["--help"],
+    ["status"],
+    ["logout"],
+    ["logout", "--list"],
+    ["list", "--offline"],
+    ["--url", "http://127.0.0.1:1", "--credentials", "api_key", "login", "local"],
+]
+HEAVY_MODULES = [
+    "openmdao",
+    "numpy",
+    "xdsmjs",
+    "whatsopt.push_command",
+    "whatsopt.upload_utils",
+    "whatsopt.show_utils",
+]
+
+
+def _import_times(cmd, env):
+    # modules imported by given command with their self import time (us)
+    proc = subprocess.run(
+        cmd,
+        env=dict(env, PYTHONPROFILEIMPORTTIME="1"),
+        cwd=env["HOME"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        encoding="utf-8",
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "[us]" not in line:
+            self_time, _, name = line[len("import time:") :].split("|")
+            times[name.strip()] = int(self_time)
+    return times
+
+
+class TestWopStartup(unittest.TestCase):
+    def test_light_commands_imports(self):
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home)
+            heavy_time = sum(
+                _import_times(
+                    [sys.executable, "-c", "import openmdao.api"], env
+                ).values()
+            )
+            for args in LIGHT_COMMANDS:
+                times = _import_times(["wop"] + args, env)  # console script (main)
+                self.assertIn("whatsopt.wop", times)
+                heavy = [m for m in HEAVY_MODULES if m in times]
+                self.assertEqual([], heavy, f"wop {' '.join(args)}")
+                # tolerant timing check: startup well below OpenMDAO import time
+                self.assertLess(
+                    sum(times.values()), heavy_time, f"wop {' '.join(args)}"
+                )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1 +1 @@
-__version__ = "2.6.1"
+__version__ = "2.7.0"
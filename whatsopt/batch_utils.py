@@ -0,0 +1,307 @@
+import io
+import codecs
+import os
+import sys
+import time
+import shlex
+import threading
+import tomli
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tabulate import tabulate
+from whatsopt.logging import log, info, error
+from whatsopt.command_utils import (
+    command_name,
+    is_watch_command,
+    isolated_state,
+    redirect_output,
+    run_command,
+)
+
+DEFAULT_WORKERS = 4
+
+# commands which can not be run from a batch
+NOT_BATCHABLE = ["batch", "daemon", "login", "serve"]
+
+# job statuses
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class _StateLock:
+    """
+    Readers-writer lock protecting process wide state: jobs executing user code
+    or changing current directory run alone (exclusive), others run concurrently (shared)
+    except the ones writing files in the current directory, run one at a time.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._cwd_lock = threading.Lock()
+
+    @contextmanager
+    def shared(self, writes_cwd=False):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer)
+            self._readers += 1
+        try:
+            if writes_cwd:
+                with self._cwd_lock:
+                    yield
+            else:
+                yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writer and self._readers == 0)
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _CaptureBuffer(io.RawIOBase):
+    """Binary stream (buffer of a _Capture) decoding bytes into the captured text"""
+
+    def __init__(self, capture):
+        self._capture = capture
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+
+    def write(self, b):
+        data = bytes(b)
+        self._capture.write(self._decoder.decode(data))
+        return len(data)
+
+    def writable(self):
+        return True
+
+
+class _Capture(io.StringIO):
+    def __init__(self, tty=False):
+        super().__init__()
+        self._tty = tty
+        self.buffer = _CaptureBuffer(self)  # binary output (e.g. streamed json)
+
+    def isatty(self):
+        return self._tty
+
+
+def _is_exclusive(job):
+    args = job["args"]
+    name = command_name(args)
+    if job["cwd"] or name in ["push", "show"]:
+        return True
+    if name == "upload":  # mda_init.py upload runs user code
+        return any(arg.endswith(".py") for arg in args)
+    if name == "pull":  # analyses of a project are pulled in sub-directories
+        return any(arg in ["-p", "--project", "--project-id"] for arg in args)
+    return False
+
+
+def _writes_cwd(job):
+    # generated code or converted data files written in the current directory
+    return command_name(job["args"]) in ["pull", "update", "convert"]
+
+
+def load_jobs(filename, remotes=None):
+    """
+    Load batch jobs from given TOML file:
+
+        workers = 4  # optional max number of jobs run concurrently
+
+        [[jobs]]
+        name = "sellar"  # optional job name (default: job<index>)
+        command = "push sellar.py"  # wop command arguments as a string or a list
+        remote = "ether"  # optional known remote name the command is run against
+        cwd = "sellar"  # optional working directory relative to the jobs file
+        after = ["other"]  # optional names of jobs to complete successfully before
+
+    Returns (workers, jobs).
+    """
+    remotes = remotes or {}
+    if not os.path.exists(filename):
+        error(f"File {filename} not found.")
+        sys.exit(-1)
+    try:
+        with open(filename, "rb") as f:
+            content = tomli.load(f)
+    except tomli.TOMLDecodeError as err:
+        error(f"Bad jobs file {filename}: {err}")
+        sys.exit(-1)
+
+    basedir = os.path.dirname(os.path.abspath(filename))
+    jobs = []
+    errors = []
+    workers = content.get("workers", DEFAULT_WORKERS)
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        errors.append(f"workers: positive integer expected, got {workers!r}")
+    for i, item in enumerate(content.get("jobs", []), start=1):
+        name = str(item.get("name", f"job{i}"))
+        command = item.get("command")
+        args = shlex.split(command) if isinstance(command, str) else command
+        if not args or not isinstance(args, list):
+            errors.append(f"job {name}: missing command")
+            continue
+        args = [str(arg) for arg in args]
+        if args[0] == "wop":
+            args = args[1:]
+        if command_name(args) in NOT_BATCHABLE:
+            errors.append(f"job {name}: '{command_name(args)}' command not allowed")
+        if is_watch_command(args):
+            errors.append(f"job {name}: watch mode not allowed")
+        remote = item.get("remote")
+        if remote:
+            if remote not in remotes:
+                errors.append(f"job {name}: unknown remote '{remote}'")
+            args = ["--url", remote] + args
+        cwd = item.get("cwd")
+        if cwd:
+            cwd = os.path.join(basedir, cwd)
+            if not os.path.isdir(cwd):
+                errors.append(f"job {name}: directory {cwd} not found")
+        jobs.append(
+            {"name": name, "args": args, "cwd": cwd, "after": item.get("after", [])}
+        )
+
+    names = [job["name"] for job in jobs]
+    for name in set(n for n in names if names.count(n) > 1):
+        errors.append(f"job {name}: name used several times")
+    for job in jobs:
+        for dep in job["after"]:
+            if dep not in names:
+                errors.append(f"job {job['name']}: unknown job '{dep}' in after")
+    if errors:
+        error(f"Bad jobs file {filename}:")
+        for msg in errors:
+            log(f"  {msg}")
+        sys.exit(-1)
+
+    return workers, jobs
+
+
+def _command(job):
+    return " ".join(shlex.quote(arg) for arg in job["args"])
+
+
+def _run_job(job, lock, tty):
+    out = _Capture(tty)
+    start = time.perf_counter()
+    if _is_exclusive(job):
+        with lock.exclusive(), isolated_state(job["cwd"]):
+            code = run_command(job["args"], out, out)
+    else:
+        with lock.shared(_writes_cwd(job)):
+            code = run_command(job["args"], out, out)
+    return code, time.perf_counter() - start, out.getvalue()
+
+
+def run_jobs(jobs, workers=DEFAULT_WORKERS):
+    """
+    Run jobs within the current process, independent jobs being run concurrently
+    by at most workers threads. Output of each job is displayed when it is completed.
+    Returns a dict job name -> (status, exit code, elapsed time).
+    """
+    lock = _StateLock()
+    tty = sys.stdout.isatty()
+    results = {}
+    pending = list(jobs)
+    running = {}
+    # this thread output is not redirected to the ones of the running jobs
+    with redirect_output(sys.stdout, sys.stderr), ThreadPoolExecutor(
+        max_workers=max(workers, 1)
+    ) as executor:
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for job in list(pending):
+                    statuses = [results.get(dep, (None,))[0] for dep in job["after"]]
+                    if any(status in [FAILED, SKIPPED] for status in statuses):
+                        pending.remove(job)
+                        results[job["name"]] = (SKIPPED, None, 0)
+                        info(f"[{len(results)}/{len(jobs)}] {job['name']}: skipped")
+                        scheduled = True
+                    elif all(status == OK for status in statuses):
+                        pending.remove(job)
+                        running[executor.submit(_run_job, job, lock, tty)] = job
+            if not running:  # remaining jobs wait for each other
+                for job in pending:
+                    results[job["name"]] = (SKIPPED, None, 0)
+                    error(f"{job['name']}: skipped (circular dependency)")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                code, elapsed, output = future.result()
+                status = OK if code == 0 else FAILED
+                results[job["name"]] = (status, code, elapsed)
+                msg = f"[{len(results)}/{len(jobs)}] {job['name']}: wop {_command(job)}"
+                if status == OK:
+                    info(f"{msg} ({elapsed:.1f}s)")
+                else:
+                    error(f"{msg} failed with exit code {code} ({elapsed:.1f}s)")
+                if output:
+                    sys.stdout.write(output)
+                    sys.stdout.flush()
+    return results
+
+
+def run_batch(filename, workers=None, dry_run=False, remotes=None):
+    file_workers, jobs = load_jobs(filename, remotes)
+    workers = workers or file_workers
+    if not jobs:
+        info(f"No job found in {filename}")
+        return
+    if dry_run:
+        headers = ["name", "command", "directory", "after", "exclusive"]
+        data = [
+            [
+                job["name"],
+                "wop " + _command(job),
+                job["cwd"] or "",
+                ", ".join(job["after"]),
+                "yes" if _is_exclusive(job) else "",
+            ]
+            for job in jobs
+        ]
+        log(tabulate(data, headers))
+        return
+
+    from whatsopt.upload_utils import set_sqlite_cache_size
+    from whatsopt.whatsopt_client import unsaved_login
+
+    info(f"Run {len(jobs)} jobs from {filename} ({workers} workers)...")
+    set_sqlite_cache_size()  # jobs may upload or convert the same files
+    start = time.perf_counter()
+    # jobs are run from the jobs file directory, their remotes not becoming the default one
+    with isolated_state(os.path.dirname(os.path.abspath(filename))), unsaved_login():
+        results = run_jobs(jobs, workers)
+    elapsed = time.perf_counter() - start
+
+    headers = ["name", "command", "status", "time"]
+    data = []
+    for job in jobs:
+        status, code, job_elapsed = results[job["name"]]
+        if status == FAILED:
+            status = f"{status} ({code})"
+        time_str = f"{job_elapsed:.1f}s" if status != SKIPPED else ""
+        data.append([job["name"], "wop " + _command(job), status, time_str])
+    log("")
+    log(tabulate(data, headers))
+    failed = [name for name, res in results.items() if res[0] != OK]
+    if failed:
+        error(f"{len(failed)}/{len(jobs)} jobs not completed ({elapsed:.1f}s)")
+        sys.exit(-1)
+    info(f"{len(jobs)} jobs completed ({elapsed:.1f}s)")
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+
+from whatsopt.utils import file_hash
+from whatsopt import __version__
+
+# max count of cached analysis attributes
+CACHE_SIZE = 64
+
+# options changing discovered analysis attributes (--xdsm: show with several depths)
+KEY_OPTIONS = [
+    "--depth",
+    "--scalar",
+    "--name",
+    "--xdsm",
+    "--all-problems",
+    "--component",
+]
+
+
+def attrs_cache_key(py_filename, options):
+    """
+    Cache key of analysis attributes discovered from given OpenMDAO problem file:
+    file path and content, OpenMDAO and wop versions, push options.
+    Local modules imported by the file are checked when attributes are loaded.
+    """
+    from openmdao import __version__ as openmdao_version
+
+    key = {
+        "file": os.path.realpath(py_filename),
+        "hash": file_hash(py_filename),
+        "openmdao": openmdao_version,
+        "wop": __version__,
+        "options": {opt: options.get(opt) for opt in KEY_OPTIONS},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def local_module_files():
+    """Files of currently imported modules coming from user code"""
+    from whatsopt.command_utils import is_user_module
+
+    files = set()
+    for name, module in list(sys.modules.items()):
+        if name != "__main__" and is_user_module(module):
+            files.add(os.path.realpath(module.__file__))
+    return sorted(files)
+
+
+def _entry_filename(cache_dir, key):
+    return os.path.join(cache_dir, key + ".json")
+
+
+def load_cached_attrs(cache_dir, key):
+    """
+    Analysis attributes cached with given key or None if not found
+    or if one of the local modules it was discovered with has changed.
+    """
+    filename = _entry_filename(cache_dir, key)
+    try:
+        with open(filename, "r") as f:
+            entry = json.load(f)
+        for module_file, digest in entry["modules"].items():
+            if file_hash(module_file) != digest:
+                return None
+        os.utime(filename)  # recently used
+    except (OSError, ValueError, KeyError):
+        return None
+    return entry["mda_attrs"]
+
+
+def save_cached_attrs(cache_dir, key, mda_attrs, module_files, size=CACHE_SIZE):
+    """Cache analysis attributes with the local modules they were discovered with"""
+    entry = {
+        "modules": {f: file_hash(f) for f in module_files if os.path.exists(f)},
+        "mda_attrs": mda_attrs,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    handle, tmpfile = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+    try:
+        with os.fdopen(handle, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmpfile, _entry_filename(cache_dir, key))
+    except OSError:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+        raise
+    _prune(cache_dir, size)
+
+
+def _prune(cache_dir, size):
+    # remove least recently used entries
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".json"):
+            path = os.path.join(cache_dir, filename)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+    for _, path in sorted(entries)[: max(len(entries) - size, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
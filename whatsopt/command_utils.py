@@ -0,0 +1,228 @@
+import io
+import os
+import sys
+import sysconfig
+import threading
+import traceback
+from contextlib import contextmanager
+from functools import lru_cache
+
+import click
+from whatsopt.logging import error
+
+# Output of wop commands run in-process is routed to per-thread streams
+_local = threading.local()
+_lock = threading.Lock()
+_active = []  # (out, err) streams of running commands
+_originals = None
+
+
+class _ThreadStream(io.TextIOBase):
+    """
+    Stand-in for sys.stdout/sys.stderr dispatching writes to the streams
+    of the command run by the current thread. When only one command is running,
+    threads spawned by this command are routed to its streams as well.
+    """
+
+    def __init__(self, index, original):
+        self._index = index
+        self._original = original
+
+    def _target(self):
+        streams = getattr(_local, "streams", None)
+        if streams is None and len(_active) == 1:
+            streams = _active[0]
+        return streams[self._index] if streams else self._original
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        self._target().flush()
+
+    def isatty(self):
+        return self._target().isatty()
+
+    def writable(self):
+        return True
+
+    @property
+    def buffer(self):
+        # binary output (e.g. streamed json) of the current thread stream
+        return self._target().buffer
+
+    @property
+    def encoding(self):
+        return getattr(self._target(), "encoding", "utf-8")
+
+
+@contextmanager
+def redirect_output(out, err):
+    """Route sys.stdout/sys.stderr of the current thread to out and err text streams"""
+    global _originals
+    # nested redirection: resolve current thread streams
+    if isinstance(out, _ThreadStream):
+        out = out._target()
+    if isinstance(err, _ThreadStream):
+        err = err._target()
+    streams = (out, err)
+    with _lock:
+        if not _active:
+            _originals = (sys.stdout, sys.stderr)
+            sys.stdout = _ThreadStream(0, _originals[0])
+            sys.stderr = _ThreadStream(1, _originals[1])
+        _active.append(streams)
+    previous = getattr(_local, "streams", None)
+    _local.streams = streams
+    try:
+        yield
+    finally:
+        _local.streams = previous
+        with _lock:
+            _active.remove(streams)
+            if not _active:
+                sys.stdout, sys.stderr = _originals
+
+
+@lru_cache(maxsize=None)
+def _library_dirs():
+    paths = sysconfig.get_paths()
+    dirs = {paths[key] for key in ("stdlib", "platstdlib", "purelib", "platlib")}
+    dirs.add(os.path.dirname(os.path.abspath(__file__)))  # whatsopt package
+    return tuple(os.path.join(os.path.realpath(d), "") for d in dirs)
+
+
+def is_user_module(module):
+    """Whether given module is imported from user code (not from python or installed packages)"""
+    filename = getattr(module, "__file__", None)
+    return bool(filename) and not os.path.realpath(filename).startswith(_library_dirs())
+
+
+def _reset_openmdao():
+    reports = sys.modules.get("openmdao.utils.reports_system")
+    if reports:
+        reports.clear_reports()
+    hooks = sys.modules.get("openmdao.utils.hooks")
+    if hooks:
+        hooks._reset_all_hooks()
+        hooks.use_hooks = False
+    problem = sys.modules.get("openmdao.core.problem")
+    if problem:
+        problem._clear_problem_names()
+
+
+@contextmanager
+def isolated_state(cwd=None, env=None, keep_modules=False):
+    """
+    Run a command within cwd and env restoring afterwards the interpreter state
+    wop commands may change: current directory, environment, sys.argv, sys.path,
+    OpenMDAO hooks and problem names, modules imported from user code
+    (so that edited analysis modules are reloaded by next command) unless keep_modules.
+    """
+    saved_cwd = os.getcwd()
+    saved_env = dict(os.environ)
+    saved_argv = sys.argv[:]
+    saved_path = sys.path[:]
+    saved_modules = set(sys.modules)
+    if cwd:
+        os.chdir(cwd)
+    if env is not None:
+        os.environ.clear()
+        os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        if env is not None:
+            os.environ.clear()
+            os.environ.update(saved_env)
+        sys.argv[:] = saved_argv
+        sys.path[:] = saved_path
+        _reset_openmdao()
+        if not keep_modules:
+            for name in set(sys.modules) - saved_modules:
+                if is_user_module(sys.modules[name]):
+                    del sys.modules[name]
+
+
+def command_name(args):
+    """Name of the wop command given its arguments (without the program name)"""
+    options_with_value = ["--credentials", "--url"]
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in options_with_value:
+            skip = True
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def is_watch_command(args):
+    """Whether given wop command arguments run a push/show watch mode (which never ends)"""
+    return command_name(args) in ["push", "show"] and any(
+        arg in ["-w", "--watch"] for arg in args
+    )
+
+
+# environment variables set by MPI launchers (Open MPI, MPICH/Hydra, PMIx, MVAPICH) in each process
+MPI_ENV_VARS = [
+    "OMPI_COMM_WORLD_SIZE",
+    "OMPI_COMM_WORLD_RANK",
+    "PMI_SIZE",
+    "PMI_RANK",
+    "PMIX_RANK",
+    "MPI_LOCALNRANKS",
+    "MV2_COMM_WORLD_SIZE",
+]
+
+
+def is_mpi_run(environ=None):
+    """Whether the current process is run under MPI (checked without importing mpi4py)"""
+    environ = os.environ if environ is None else environ
+    if any(name in environ for name in MPI_ENV_VARS):
+        return True
+    mpi = sys.modules.get("mpi4py.MPI")
+    return mpi is not None and mpi.COMM_WORLD.size > 1
+
+
+def run_command(args, out, err):
+    """
+    Run wop command given its arguments (without the program name) in the current
+    process, output being written to given out and err text streams.
+    Returns the command exit code.
+    """
+    from whatsopt.wop import wop
+
+    with redirect_output(out, err):
+        try:
+            code = wop.main(args=list(args), prog_name="wop", standalone_mode=False)
+            code = code if isinstance(code, int) else 0  # click.Exit code
+        except SystemExit as e:
+            code = _exit_code(e.code)
+        except click.ClickException as e:
+            e.show(file=err)
+            code = e.exit_code
+        except click.exceptions.Abort:
+            click.echo("Aborted!", file=err)
+            code = 1
+        except EOFError:  # no stdin when run by wop daemon or wop batch
+            error("Input required, use 'wop login' first")
+            code = 1
+        except Exception:
+            traceback.print_exc(file=err)
+            code = 1
+        finally:
+            out.flush()
+            err.flush()
+    return code
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)  # message given to sys.exit()
+    return 1
@@ -0,0 +1,318 @@
+import io
+import os
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import struct
+import threading
+import subprocess
+import socketserver
+
+from whatsopt.logging import log, info, warn, error
+from whatsopt.command_utils import isolated_state, run_command
+from whatsopt.whatsopt_client import WHATSOPT_DIRNAME
+
+DAEMON_SOCKET = os.path.join(WHATSOPT_DIRNAME, "daemon.sock")
+DAEMON_LOG = os.path.join(WHATSOPT_DIRNAME, "daemon.log")
+
+# commands never forwarded to the daemon: daemon management, interactive or long-running ones
+NOT_FORWARDED = ["daemon", "login", "serve"]
+
+# max time (in seconds) waited for the daemon to be ready
+START_TIMEOUT = 60
+
+# modules preloaded by the daemon
+PRELOADED_MODULES = [
+    "numpy",
+    "requests",
+    "tabulate",
+    "openmdao.api",
+    "openmdao.utils.hooks",
+    "openmdao.utils.file_utils",
+    "whatsopt.push_command",
+    "whatsopt.push_utils",
+    "whatsopt.upload_utils",
+    "whatsopt.convert_utils",
+    "whatsopt.show_utils",
+]
+
+# frames sent back by the daemon: 1-byte channel, 4-byte payload length, payload
+_HEADER = struct.Struct(">cI")
+STDOUT = b"o"
+STDERR = b"e"
+EXIT = b"x"
+
+
+def is_daemon_available():
+    return hasattr(socket, "AF_UNIX")
+
+
+def _send_frame(wfile, channel, payload):
+    wfile.write(_HEADER.pack(channel, len(payload)) + payload)
+    wfile.flush()
+
+
+def _recv_exactly(rfile, size):
+    data = rfile.read(size)
+    if len(data) < size:
+        raise ConnectionError("wop daemon connection lost")
+    return data
+
+
+def _recv_frame(rfile):
+    channel, size = _HEADER.unpack(_recv_exactly(rfile, _HEADER.size))
+    return channel, _recv_exactly(rfile, size)
+
+
+class _FrameBuffer(io.RawIOBase):
+    """Binary stream (buffer of a _FrameStream) forwarding bytes as frames"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, b):
+        data = bytes(b)
+        self._stream._send(data)
+        return len(data)
+
+    def writable(self):
+        return True
+
+
+class _FrameStream(io.TextIOBase):
+    """Text stream forwarding writes to the wop client as frames of the given channel"""
+
+    def __init__(self, wfile, channel, tty=False):
+        self._wfile = wfile
+        self._channel = channel
+        self._tty = tty
+        self.closed_by_client = False
+        self.buffer = _FrameBuffer(self)  # binary output (e.g. streamed json)
+
+    def write(self, s):
+        if not isinstance(s, str):
+            raise TypeError(f"write() argument must be str, not {type(s).__name__}")
+        self._send(s.encode("utf-8"))
+        return len(s)
+
+    def _send(self, payload):
+        if payload and not self.closed_by_client:
+            try:
+                _send_frame(self._wfile, self._channel, payload)
+            except OSError:  # client gone, let the command finish anyway
+                self.closed_by_client = True
+
+    def isatty(self):
+        return self._tty
+
+    def writable(self):
+        return True
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        control = request.get("control")
+        if control:
+            self._reply(self.server.infos())
+            if control == "stop":
+                threading.Thread(target=self.server.shutdown).start()
+            return
+
+        out_tty, err_tty = request.get("tty", [False, False])
+        out = _FrameStream(self.wfile, STDOUT, out_tty)
+        err = _FrameStream(self.wfile, STDERR, err_tty)
+        with isolated_state(request.get("cwd"), request.get("env")):
+            code = run_command(request["args"], out, err)
+        self.server.served += 1
+        try:
+            _send_frame(self.wfile, EXIT, str(code).encode())
+        except OSError:
+            pass
+
+    def _reply(self, data):
+        self.wfile.write((json.dumps(data) + "\n").encode())
+
+
+class _DaemonServer(socketserver.UnixStreamServer):
+    # commands are run one at a time as they change process wide state (cwd, env...)
+
+    def __init__(self, path):
+        super().__init__(path, _DaemonHandler)
+        self.started_at = time.time()
+        self.served = 0
+
+    def infos(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "served": self.served,
+        }
+
+
+def serve_daemon(path=DAEMON_SOCKET):
+    """Run wop daemon listening on given unix socket path until stopped"""
+    from whatsopt.upload_utils import set_sqlite_cache_size
+
+    for module in PRELOADED_MODULES:
+        __import__(module)
+    set_sqlite_cache_size()  # commands may upload or convert the same files
+
+    if os.path.exists(path):
+        if _connect(path):
+            error(f"wop daemon already running ({path})")
+            sys.exit(-1)
+        os.remove(path)  # stale socket
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    old_umask = os.umask(0o177)  # socket only accessible by the user
+    try:
+        server = _DaemonServer(path)
+    finally:
+        os.umask(old_umask)
+
+    def terminate(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, terminate)
+    log(f"wop daemon (pid={os.getpid()}) listening on {path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+        log("wop daemon stopped")
+
+
+def _connect(path=DAEMON_SOCKET):
+    if not is_daemon_available() or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as err:
+        sock.close()
+        if err.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            return None
+        raise
+    return sock
+
+
+def _control(command, path=DAEMON_SOCKET):
+    sock = _connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps({"control": command}) + "\n").encode())
+        f.flush()
+        return json.loads(f.readline())
+
+
+def forward_command(args, path=DAEMON_SOCKET):
+    """
+    Run wop command given its arguments on the running daemon, output being
+    written to stdout and stderr. Returns exit code or None if no daemon is running.
+    """
+    sock = _connect(path)
+    if sock is None:
+        return None
+    request = {
+        "args": args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "tty": [sys.stdout.isatty(), sys.stderr.isatty()],
+    }
+    streams = {STDOUT: sys.stdout.buffer, STDERR: sys.stderr.buffer}
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps(request) + "\n").encode())
+        f.flush()
+        try:
+            while True:
+                channel, payload = _recv_frame(f)
+                if channel == EXIT:
+                    return int(payload)
+                streams[channel].write(payload)
+                streams[channel].flush()
+        except ConnectionError as err:
+            error(str(err))
+            return 1
+        except KeyboardInterrupt:
+            warn("Interrupted (command may still be running in wop daemon)")
+            return 130
+
+
+def start_daemon(foreground=False, path=DAEMON_SOCKET):
+    if not is_daemon_available():
+        error(
+            "wop daemon requires unix sockets which are not available on this platform"
+        )
+        sys.exit(-1)
+    status = _control("status", path)
+    if status:
+        info(f"wop daemon already running (pid={status['pid']})")
+        return
+    if foreground:
+        serve_daemon(path)
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(DAEMON_LOG, "ab") as logfile:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "whatsopt.daemon_utils", path],
+            stdin=subprocess.DEVNULL,
+            stdout=logfile,
+            stderr=subprocess.STDOUT,
+            cwd=os.path.dirname(path),
+            start_new_session=True,
+        )
+    start = time.time()
+    while time.time() - start < START_TIMEOUT:
+        if proc.poll() is not None:
+            error(f"wop daemon failed to start (see {DAEMON_LOG})")
+            sys.exit(-1)
+        status = _control("status", path)
+        if status:
+            info(f"wop daemon started (pid={status['pid']})")
+            log(
+                "  (wop commands are now run by the daemon, use 'wop daemon stop' to stop it)"
+            )
+            return
+        time.sleep(0.1)
+    error(f"wop daemon not ready after {START_TIMEOUT}s (see {DAEMON_LOG})")
+    sys.exit(-1)
+
+
+def stop_daemon(path=DAEMON_SOCKET):
+    status = _control("stop", path)
+    if status:
+        start = time.time()
+        while os.path.exists(path) and time.time() - start < START_TIMEOUT:
+            time.sleep(0.05)
+        info(
+            f"wop daemon stopped (pid={status['pid']}, {status['served']} commands served)"
+        )
+    else:
+        warn("wop daemon not running")
+
+
+def daemon_status(path=DAEMON_SOCKET):
+    status = _control("status", path)
+    if status:
+        info(
+            f"wop daemon running (pid={status['pid']}, "
+            f"uptime={status['uptime']:.0f}s, {status['served']} commands served)"
+        )
+    else:
+        info("wop daemon not running")
+        log("  (use 'wop daemon start' to start it)")
+
+
+if __name__ == "__main__":
+    serve_daemon(*sys.argv[1:])
@@ -0,0 +1,248 @@
+import os
+import re
+import time
+import sqlite3
+from datetime import datetime
+
+SCOPE_ALL = "all"
+SCOPE_OWNED = "owned"
+
+# index is a cache: tables of an older schema are dropped and refilled from remote
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    remote TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    created_at TEXT,
+    owner TEXT,
+    PRIMARY KEY (remote, id)
+);
+CREATE INDEX IF NOT EXISTS analyses_name ON analyses (remote, name);
+CREATE INDEX IF NOT EXISTS analyses_created_at ON analyses (remote, created_at);
+CREATE TABLE IF NOT EXISTS listings (
+    remote TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (remote, scope, id)
+);
+CREATE TABLE IF NOT EXISTS refreshes (
+    remote TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    etag TEXT,
+    PRIMARY KEY (remote, scope)
+);
+"""
+
+
+def project_scope(project_query):
+    """Scope of analyses listed by remote for given project name query"""
+    return f"project:{project_query}"
+
+
+def _regexp(pattern, value):
+    return value is not None and re.search(pattern, value) is not None
+
+
+def open_index(filename):
+    dirname = os.path.dirname(filename)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    conn = sqlite3.connect(filename)
+    conn.create_function("REGEXP", 2, _regexp)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            for table in ["analyses", "listings", "refreshes"]:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def is_index_fresh(conn, remote, scope, max_age):
+    row = conn.execute(
+        "SELECT refreshed_at FROM refreshes WHERE remote = ? AND scope = ?",
+        (remote, scope),
+    ).fetchone()
+    return row is not None and time.time() - row[0] < max_age
+
+
+def get_index_etag(conn, remote, scope):
+    """ETag of the remote list the scope was last refreshed with (None if unknown)"""
+    row = conn.execute(
+        "SELECT etag FROM refreshes WHERE remote = ? AND scope = ?", (remote, scope)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def touch_index(conn, remote, scope):
+    """Mark scope as refreshed when remote reported its list unchanged"""
+    with conn:
+        conn.execute(
+            "UPDATE refreshes SET refreshed_at = ? WHERE remote = ? AND scope = ?",
+            (time.time(), remote, scope),
+        )
+
+
+def invalidate_index(conn, remote):
+    with conn:
+        conn.execute("DELETE FROM refreshes WHERE remote = ?", (remote,))
+
+
+def update_index(conn, remote, scope, mdas, etag=None):
+    """
+    Synchronize index with analyses list retrieved from remote for the given scope,
+    only rows which actually changed are written. Returns the count of analyses
+    added, changed (metadata or rank) or removed in the scope.
+    """
+    rows = [
+        (
+            remote,
+            int(mda["id"]),
+            mda["name"],
+            mda.get("created_at"),
+            mda.get("owner_email", mda.get("owner")),
+        )
+        for mda in mdas
+    ]
+    listed = [(remote, scope, row[1], rank) for rank, row in enumerate(rows)]
+    previous = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT a.id, a.name, a.created_at, a.owner, l.rank FROM listings l"
+            " JOIN analyses a ON a.remote = l.remote AND a.id = l.id"
+            " WHERE l.remote = ? AND l.scope = ?",
+            (remote, scope),
+        )
+    }
+    current = {row[1]: row[2:] + (rank,) for rank, row in enumerate(rows)}
+    changes = len(previous.keys() - current.keys()) + sum(
+        previous.get(id) != values for id, values in current.items()
+    )
+    with conn:
+        conn.executemany(
+            "INSERT INTO analyses (remote, id, name, created_at, owner)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (remote, id) DO UPDATE SET"
+            " name = excluded.name, created_at = excluded.created_at,"
+            " owner = excluded.owner"
+            " WHERE name IS NOT excluded.name OR created_at IS NOT excluded.created_at"
+            " OR owner IS NOT excluded.owner",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO listings (remote, scope, id, rank) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (remote, scope, id) DO UPDATE SET rank = excluded.rank"
+            " WHERE rank IS NOT excluded.rank",
+            listed,
+        )
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS listed (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM listed")
+        conn.executemany("INSERT INTO listed VALUES (?)", [(r[1],) for r in rows])
+        # not listed anymore in this scope
+        conn.execute(
+            "DELETE FROM listings WHERE remote = ? AND scope = ?"
+            " AND id NOT IN (SELECT id FROM listed)",
+            (remote, scope),
+        )
+        if scope == SCOPE_ALL:
+            # deleted on remote
+            conn.execute(
+                "DELETE FROM listings WHERE remote = ?"
+                " AND id NOT IN (SELECT id FROM listed)",
+                (remote,),
+            )
+        # not listed in any scope
+        conn.execute(
+            "DELETE FROM analyses WHERE remote = ? AND id NOT IN"
+            " (SELECT id FROM listings WHERE remote = ?)",
+            (remote, remote),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO refreshes (remote, scope, refreshed_at, etag)"
+            " VALUES (?, ?, ?, ?)",
+            (remote, scope, time.time(), etag),
+        )
+    return changes
+
+
+# accepted (input, normalized) formats of --since/--until dates, compared as strings
+# with the ISO 8601 creation dates of the index
+DATE_FORMATS = [
+    ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S"),
+    ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"),
+    ("%Y-%m-%dT%H:%M", "%Y-%m-%dT%H:%M"),
+    ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M"),
+    ("%Y-%m-%d", "%Y-%m-%d"),
+    ("%Y-%m", "%Y-%m"),
+    ("%Y", "%Y"),
+]
+
+
+def normalize_date(text):
+    """
+    Date given as YYYY[-MM[-DD[THH:MM[:SS]]]] (month, day, hour... may be written
+    with one digit) as a zero-padded ISO 8601 prefix, raises ValueError if malformed
+    """
+    for input_format, output_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text.strip(), input_format).strftime(output_format)
+        except ValueError:
+            pass
+    raise ValueError(f"'{text}' is not a date (expected YYYY-MM-DD)")
+
+
+def _like_pattern(substring):
+    # LIKE pattern matching the given substring literally (escape character: \)
+    escaped = re.sub(r"([\\%_])", r"\\\1", substring)
+    return f"%{escaped}%"
+
+
+def query_index(
+    conn,
+    remote,
+    scope=SCOPE_OWNED,
+    name=None,
+    regex=None,
+    since=None,
+    until=None,
+    limit=None,
+    offset=0,
+):
+    """
+    Select analyses listed by given remote for given scope in the remote order
+    and matching given filters: name substring, name regular expression,
+    creation date interval (dates as ISO 8601 strings, see normalize_date(),
+    until date being included).
+    Returns (total count of matching analyses, selected rows).
+    """
+    where = ["l.remote = ?", "l.scope = ?"]
+    params = [remote, scope]
+    if name:
+        where.append("a.name LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(name))
+    if regex:
+        where.append("a.name REGEXP ?")
+        params.append(regex)
+    if since:
+        where.append("a.created_at >= ?")
+        params.append(since)
+    if until:
+        where.append("a.created_at < ?")
+        params.append(until + "\uffff")  # include dates prefixed by until
+    tables = "listings l JOIN analyses a ON a.remote = l.remote AND a.id = l.id"
+    clause = " AND ".join(where)
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM {tables} WHERE {clause}", params
+    ).fetchone()[0]
+    sql = (
+        f"SELECT a.id, a.name, a.created_at, a.owner FROM {tables}"
+        f" WHERE {clause} ORDER BY l.rank, a.id"
+    )
+    if limit:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    return count, conn.execute(sql, params).fetchall()
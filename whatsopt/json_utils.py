@@ -0,0 +1,141 @@
+import re
+import sys
+import json
+import gzip
+from contextlib import contextmanager
+
+# complete string literal or run of bytes outside strings
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[^"]+', re.DOTALL)
+_BRACKETS = re.compile(rb"([{}\[\]])")
+_WHITESPACES = b" \t\n\r"
+# gzip file signature
+_GZIP_MAGIC = b"\x1f\x8b"
+
+# size of the writes of incrementally encoded JSON documents
+WRITE_SIZE = 1 << 16
+
+
+class JsonIndenter:
+    """
+    Pretty-print a JSON document given as a sequence of byte chunks
+    without parsing it, output is formatted like json.dumps(..., indent=indent).
+    Memory used only depends on the chunk size (and on the longest string literal).
+    """
+
+    def __init__(self, indent=2):
+        self.indent = indent
+        self.depth = 0
+        self.opened = False  # container just opened, newline pending
+        self.buffer = b""
+        self._newlines = []
+
+    def _newline(self):
+        while len(self._newlines) <= self.depth:
+            self._newlines.append(b"\n" + b" " * (self.indent * len(self._newlines)))
+        return self._newlines[self.depth]
+
+    def feed(self, chunk):
+        buf = self.buffer + chunk
+        out = []
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            m = _TOKEN.match(buf, pos)
+            if m is None:  # string literal not complete yet
+                break
+            token = m.group()
+            if token[0:1] == b'"':
+                if self.opened:
+                    self.opened = False
+                    out.append(self._newline())
+                out.append(token)
+            else:
+                self._format(token, out)
+            pos = m.end()
+        self.buffer = buf[pos:]
+        return b"".join(out)
+
+    def _format(self, run, out):
+        for piece in _BRACKETS.split(run):
+            if piece in (b"{", b"["):
+                if self.opened:
+                    out.append(self._newline())
+                out.append(piece)
+                self.depth += 1
+                self.opened = True
+            elif piece in (b"}", b"]"):
+                self.depth -= 1
+                if self.opened:
+                    self.opened = False
+                else:
+                    out.append(self._newline())
+                out.append(piece)
+            else:
+                piece = piece.translate(None, _WHITESPACES)
+                if piece:
+                    if self.opened:
+                        self.opened = False
+                        out.append(self._newline())
+                    out.append(
+                        piece.replace(b",", b"," + self._newline()).replace(b":", b": ")
+                    )
+
+
+@contextmanager
+def open_output(filename=None, compress=False):
+    """Binary output stream on given filename (stdout if None), gzip-compressed if required"""
+    if filename:
+        f = open(filename, "wb")
+    else:
+        sys.stdout.flush()
+        f = sys.stdout.buffer
+    try:
+        if compress:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                yield gz
+        else:
+            yield f
+    finally:
+        if filename:
+            f.close()
+        else:
+            f.flush()
+
+
+def write_json_chunks(chunks, out, indent=None):
+    """Write JSON byte chunks to binary stream out, re-indented if indent is given"""
+    indenter = JsonIndenter(indent) if indent else None
+    for chunk in chunks:
+        if indenter:
+            chunk = indenter.feed(chunk)
+        out.write(chunk)
+
+
+def write_json(obj, out, indent=None, compact=False):
+    """
+    Write obj as JSON to binary stream out, encoded incrementally so that the document
+    is never held in memory as a whole. Output is formatted like json.dumps(obj, indent=indent)
+    or without any whitespace if compact.
+    """
+    if compact:
+        encoder = json.JSONEncoder(separators=(",", ":"))
+    else:
+        encoder = json.JSONEncoder(indent=indent)
+    pending = []
+    size = 0
+    for chunk in encoder.iterencode(obj):
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_SIZE:
+            out.write("".join(pending).encode())
+            pending = []
+            size = 0
+    out.write("".join(pending).encode())
+
+
+def load_json(filename):
+    """Load JSON document from given file, gzip-compressed or not"""
+    with open(filename, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    with (gzip.open if compressed else open)(filename, "rb") as f:
+        return json.load(f)
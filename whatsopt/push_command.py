@@ -1,19 +1,23 @@
 import re
+import numpy as np
 from whatsopt.push_utils import (
+    VarAttr,
+    VarInfo,
     build_variable_name,
+    copy_mda_attrs,
     cut,
-    find_indep_var_name,
+    get_abs2prom,
+    get_indep_var_names,
     simple_value,
     extract_mda_var,
     format_shape,
+    get_connections,
+    get_model_tree,
+    merge_model_trees,
+    to_mda_dict,
 )
 from whatsopt.logging import debug
-from openmdao.api import IndepVarComp
-
-from openmdao.visualization.n2_viewer.n2_viewer import _get_viewer_data
-
-from openmdao import __version__ as OPENMDAO_VERSION
-from packaging.version import Version
+from openmdao.utils.mpi import MPI
 
 # Special name for internal WhatsOpt discipline. cf. WhatsOpt Discipline model
 DRIVER_NAME = "__DRIVER__"
@@ -28,38 +32,108 @@ class PushCommand:
     """
 
     def __init__(self, problem, depth, scalar):
-        data = _get_viewer_data(problem)
         self.problem = problem
         self.depth = depth
         self.scalar = scalar
-        self.tree = data["tree"]
-        self.connections = data["connections_list"]
-        self.vars = {"in": {}, "out": {}}
+        self.tree = get_model_tree(problem.model)
+        self.connections = get_connections(problem.model)
+        self.vars = {"in": {}, "out": {}}  # io mode -> absolute name -> VarInfo
         self.vardescs = {}
         self.discmap = {}
         self.mdas = {}
+        # indexes: mda id -> {discipline name -> discipline attributes},
+        # variables attributes list id -> set of variable names
+        self._discs_by_name = {}
+        self._varnames = {}
+        # promoted name -> first output absolute name
+        self._outputs_by_name = None
+        # system path -> absolute names of outputs of this system and its subsystems
+        self._outputs_by_scope = None
+        # deepest level of built sub-analyses (None: no limit)
+        self._max_level = None
+        # under MPI, infos collected by each process are merged by the root one
+        self.comm = problem.comm
+        self._distributed = MPI is not None and self.comm.size > 1
 
     def get_mda_attributes(self, group, tree, use_depth=False):
-        self._collect_disc_infos(self.problem.model, self.tree)
-        self._collect_var_infos(self.problem)
+        """
+        Analysis attributes of given group, under MPI only returned by the root process
+        (None otherwise), every process having to call this method.
+        """
+        if use_depth and self.depth > 0:
+            # sub-analyses at depth level are built without their sub-groups:
+            # only their drivers are used to summarize them when cut
+            self._max_level = self.depth
+        mda_attrs = self._build_mda_attributes(group, tree)
+        if mda_attrs is None:
+            return None
+
+        if use_depth:
+            cut(mda_attrs, self.depth)
 
-        mda_attrs = self._get_mda_hierarchy(group, tree)
+        return to_mda_dict(mda_attrs)
+
+    def get_mda_attributes_by_depth(self, group, tree, depths):
+        """Analysis attributes cut at each given depth, all derived from one attributes tree"""
+        mda_attrs = self._build_mda_attributes(group, tree)
+        if mda_attrs is None:
+            return None
+        attrs_by_depth = {}
+        for depth in depths:
+            depth_attrs = copy_mda_attrs(mda_attrs)
+            cut(depth_attrs, depth)
+            attrs_by_depth[depth] = to_mda_dict(depth_attrs)
+        return attrs_by_depth
+
+    def _build_mda_attributes(self, group, tree):
+        self._collect_var_infos(self.problem)
+        if self._distributed:
+            is_tree = tree is self.tree
+            self._gather_infos()
+            if self.comm.rank != 0:
+                self._get_values(None)  # values requested by root process
+                return None
+            if is_tree:
+                tree = self.tree
+        self._collect_disc_infos(self.tree)
+
+        mda_attrs = self._get_mda_hierarchy(tree)
 
         mda_attrs["name"] = ""  # root -> ""
         self._populate_varattrs_from_connections(mda_attrs)
         self._populate_varattrs_from_outputs(mda_attrs)
-        self._populate_initial_values(mda_attrs)
-        for _, mda in self.mdas.items():
-            self._populate_initial_values(mda)
+        self._populate_initial_values([mda_attrs] + list(self.mdas.values()))
 
         mda_attrs["name"] = group.__class__.__name__
-
-        if use_depth:
-            cut(mda_attrs, self.depth)
-
         return mda_attrs
 
-    def _get_mda_hierarchy(self, group, tree, group_prefix=""):
+    def _gather_infos(self):
+        # tree and variables seen by each process merged by root process,
+        # variables being ordered as in a serial run
+        infos = self.comm.gather((self.tree, self.vars, self.vardescs), root=0)
+        if self.comm.rank != 0:
+            return
+        self.tree = merge_model_trees([tree for tree, _, _ in infos])
+        model = self.problem.model
+        for io_mode, io in (("in", "input"), ("out", "output")):
+            merged = {}
+            for _, variables, _ in infos:
+                for abs_name, var in variables[io_mode].items():
+                    if abs_name not in merged:
+                        merged[abs_name] = VarInfo(
+                            var.name, var.type, var.shape, var.units
+                        )
+            self.vars[io_mode] = {
+                abs_name: merged[abs_name]
+                for abs_name in model._var_allprocs_abs2meta[io]
+                if abs_name in merged
+            }
+        for _, _, vardescs in infos:
+            for name, desc in vardescs.items():
+                if not self.vardescs.get(name):
+                    self.vardescs[name] = desc
+
+    def _get_mda_hierarchy(self, tree, group_prefix=""):
         name = tree["name"]
 
         mda_attrs = {
@@ -69,27 +143,27 @@ class PushCommand:
             ],
         }
         self.mdas[group_prefix] = mda_attrs
+        discs = self._discs_by_name[id(mda_attrs)] = {
+            DRIVER_NAME: mda_attrs["disciplines_attributes"][0]
+        }
+        level = group_prefix.count(".") + 1 if group_prefix else 0
         for child in tree["children"]:
-            for s in group._subsystems_myproc:
-                if s.name == child["name"]:
-                    if (
-                        child["type"] == "subsystem"
-                        and child["subsystem_type"] == "group"
-                    ):
-                        prefix = child["name"]
-                        if group_prefix:
-                            prefix = group_prefix + "." + child["name"]
-                        sub_analysis_attrs = self._get_sub_analysis_attributes(
-                            s, child, prefix
-                        )
-                        mda_attrs["disciplines_attributes"].append(sub_analysis_attrs)
-                    else:
-                        if not isinstance(s, IndepVarComp):
-                            discattrs = {
-                                "name": child["name"],
-                                "variables_attributes": [],
-                            }
-                            mda_attrs["disciplines_attributes"].append(discattrs)
+            if child["type"] == "subsystem" and child["subsystem_type"] == "group":
+                if level == self._max_level:
+                    continue
+                prefix = child["name"]
+                if group_prefix:
+                    prefix = group_prefix + "." + child["name"]
+                sub_analysis_attrs = self._get_sub_analysis_attributes(child, prefix)
+                mda_attrs["disciplines_attributes"].append(sub_analysis_attrs)
+                discs.setdefault(child["name"], sub_analysis_attrs)
+            elif child.get("component_type") != "indep":
+                discattrs = {
+                    "name": child["name"],
+                    "variables_attributes": [],
+                }
+                mda_attrs["disciplines_attributes"].append(discattrs)
+                discs.setdefault(child["name"], discattrs)
 
         return mda_attrs
 
@@ -102,44 +176,45 @@ class PushCommand:
                 hat.append(mda_src[0])
                 mda_src = mda_src[1:]
                 mda_tgt = mda_tgt[1:]
+            hat_mda_attrs = self.mdas.get(".".join(hat))
+            if hat_mda_attrs is None:  # below depth level
+                continue
             conn_name = self._get_conn_name(conn)
-            for discattrs in self.mdas[".".join(hat)]["disciplines_attributes"]:
-                # mda hat: src
-                if (
-                    mda_src[0] != AUTO_IVC
-                    and self.discmap[mda_src[0]] == discattrs["name"]
-                ):
+            discs = self._discs_by_name[id(hat_mda_attrs)]
+
+            # mda hat: src
+            discattrs = None
+            if mda_src[0] != AUTO_IVC:
+                discattrs = discs.get(self.discmap[mda_src[0]])
+            if discattrs is not None:
+                self._set_varattr(discattrs, conn["src"], varname_src, conn_name, "out")
+                # src -> hat
+                self._set_varattr_in_depth(
+                    discattrs.get("sub_analysis_attributes"),
+                    mda_src[1:],
+                    conn["src"],
+                    conn_name,
+                    upward=True,
+                )
+
+            # mda hat: tgt
+            discattrs = discs.get(self.discmap[mda_tgt[0]])
+            if discattrs is not None:
+                self._set_varattr(discattrs, conn["tgt"], varname_tgt, conn_name, "in")
+                if mda_src[0] == AUTO_IVC:
+                    driver_attrs = mda_attrs["disciplines_attributes"][0]
                     self._set_varattr(
-                        discattrs, conn["src"], varname_src, conn_name, "out"
-                    )
-                    # src -> hat
-                    self._set_varattr_in_depth(
-                        discattrs.get("sub_analysis_attributes"),
-                        mda_src[1:],
-                        conn["src"],
-                        conn_name,
-                        upward=True,
+                        driver_attrs, conn["src"], varname_tgt, conn_name, "out"
                     )
 
-                # mda hat: tgt
-                if self.discmap[mda_tgt[0]] == discattrs["name"]:
-                    self._set_varattr(
-                        discattrs, conn["tgt"], varname_tgt, conn_name, "in"
-                    )
-                    if mda_src[0] == AUTO_IVC:
-                        driver_attrs = mda_attrs["disciplines_attributes"][0]
-                        self._set_varattr(
-                            driver_attrs, conn["src"], varname_tgt, conn_name, "out"
-                        )
-
-                    # hat -> tgt
-                    self._set_varattr_in_depth(
-                        discattrs.get("sub_analysis_attributes"),
-                        mda_tgt[1:],
-                        conn["tgt"],
-                        conn_name,
-                        upward=False,
-                    )
+                # hat -> tgt
+                self._set_varattr_in_depth(
+                    discattrs.get("sub_analysis_attributes"),
+                    mda_tgt[1:],
+                    conn["tgt"],
+                    conn_name,
+                    upward=False,
+                )
 
     def _populate_varattrs_from_outputs(self, mda_attrs, group_prefix=""):
         mda_prefix = group_prefix
@@ -147,51 +222,110 @@ class PushCommand:
             mda_prefix += "."
         if mda_attrs["name"]:
             mda_prefix += mda_attrs["name"] + "."
+        outputs_by_scope = self._get_outputs_by_scope()
         for discattrs in mda_attrs["disciplines_attributes"]:
             sub_mda_attrs = discattrs.get("sub_analysis_attributes")
             if sub_mda_attrs is None:
-                for absname, varattrs in self.vars["out"].items():
-                    mda, _ = extract_mda_var(absname)
-                    scope = discattrs["name"]
-                    if mda_prefix:
-                        scope = mda_prefix + scope
-                    mda_name = ".".join(mda)
-                    if mda_name == scope or (
-                        mda_name.startswith(scope) and mda_name[len(scope)] == "."
-                    ):
-                        vattr = {
-                            "name": varattrs["name"],
-                            "desc": self.vardescs.get(absname, ""),
-                            "type": varattrs["type"],
-                            "shape": varattrs["shape"],
-                            "units": varattrs["units"],
-                        }
-                        self._set_varattrs_from_outputs(
-                            vattr, "out", discattrs["variables_attributes"]
-                        )
-                        dvattr = vattr.copy()
-                        dvattr["io_mode"] = "in"
-                        driver_attrs = mda_attrs["disciplines_attributes"][0]
-                        self._set_varattrs_from_outputs(
-                            dvattr, "in", driver_attrs["variables_attributes"]
-                        )
+                scope = mda_prefix + discattrs["name"]
+                for absname in outputs_by_scope.get(scope, []):
+                    var = self.vars["out"][absname]
+                    vattr = VarAttr(
+                        var.name, "out", self.vardescs.get(absname, ""), var
+                    )
+                    self._add_varattr(discattrs["variables_attributes"], vattr)
+                    driver_attrs = mda_attrs["disciplines_attributes"][0]
+                    self._add_varattr(
+                        driver_attrs["variables_attributes"], vattr.with_io_mode("in")
+                    )
             else:
                 self._populate_varattrs_from_outputs(sub_mda_attrs, mda_prefix[:-1])
 
-    def _populate_initial_values(self, mda_attrs):
-        driver_attrs = mda_attrs["disciplines_attributes"][0]
-        for vattr in driver_attrs["variables_attributes"]:
-            if vattr["io_mode"] == "out":
-                # set init value for design variables and parameters (outputs of driver)
-                conn_name = vattr["name"].split("==")[0]
-                if self.vars["out"].get(conn_name):
-                    v = self.vars["out"][conn_name]
-                    vattr["parameter_attributes"] = {"init": simple_value(v)}
-                else:  # indep comp promoted
-                    for _, v in self.vars["out"].items():
-                        if conn_name == v["name"]:
-                            vattr["parameter_attributes"] = {"init": simple_value(v)}
-                            break
+    def _get_outputs_by_scope(self):
+        if self._outputs_by_scope is None:
+            # index each output under every system path it belongs to,
+            # outputs order is kept within each scope
+            self._outputs_by_scope = {}
+            for absname in self.vars["out"]:
+                mda, _ = extract_mda_var(absname)
+                scope = ""
+                for name in mda:
+                    scope = scope + "." + name if scope else name
+                    self._outputs_by_scope.setdefault(scope, []).append(absname)
+        return self._outputs_by_scope
+
+    def _populate_initial_values(self, mdas):
+        # set init value for design variables and parameters (outputs of drivers)
+        inits = []  # (variable attributes, output absolute name)
+        for mda_attrs in mdas:
+            driver_attrs = mda_attrs["disciplines_attributes"][0]
+            for vattr in driver_attrs["variables_attributes"]:
+                if vattr.io_mode == "out":
+                    conn_name = vattr.name.split("==")[0]
+                    absname = conn_name
+                    if not self.vars["out"].get(conn_name):  # indep comp promoted
+                        absname = self._get_outputs_by_name().get(conn_name)
+                    if absname:
+                        inits.append((vattr, absname))
+        values = self._get_values({absname for _, absname in inits})
+        for vattr, absname in inits:
+            var = self.vars["out"][absname]
+            v = {"type": var.type, "shape": var.shape}
+            vattr.init = simple_value(dict(v, value=values[absname]))
+
+    def _get_values(self, abs_names):
+        """
+        Current values of given outputs. Under MPI, names given by the root process
+        are sent to every process, each one sending back the values it owns,
+        distributed outputs being rebuilt from the pieces of all processes.
+        """
+        if not self._distributed:
+            return {abs_name: self._get_value(abs_name) for abs_name in abs_names}
+        abs_names = self.comm.bcast(
+            sorted(abs_names) if self.comm.rank == 0 else None, root=0
+        )
+        local_outputs = self.problem.model._var_abs2meta["output"]
+        local_values = {
+            abs_name: self._get_value(abs_name)
+            for abs_name in abs_names
+            if abs_name in local_outputs
+        }
+        gathered = self.comm.gather(local_values, root=0)
+        if gathered is None:  # not the root process
+            return {}
+        allprocs_meta = self.problem.model._var_allprocs_abs2meta["output"]
+        values = {}
+        for abs_name in abs_names:
+            pieces = [pvalues[abs_name] for pvalues in gathered if abs_name in pvalues]
+            meta = allprocs_meta[abs_name]
+            if meta.get("distributed"):
+                # global value is the concatenation of local values in rank order
+                value = np.concatenate([np.atleast_1d(piece) for piece in pieces])
+                values[abs_name] = value.reshape(meta["global_shape"])
+            elif pieces:
+                values[abs_name] = pieces[0]
+        return values
+
+    def _get_value(self, abs_name):
+        """Current value of given output, fetched only when needed as a read-only view"""
+        system = self.problem.model
+        if abs_name in system._outputs._views:
+            value = system._outputs[abs_name]
+        elif abs_name in system._discrete_outputs:
+            value = system._discrete_outputs[abs_name]
+        else:
+            meta = system._var_abs2meta["output"][abs_name]
+            value = meta.get("value", meta.get("val"))  # fix OpenMDAO < 3.10
+        if isinstance(value, np.ndarray):
+            value = value.view()
+            value.flags.writeable = False
+        return value
+
+    def _get_outputs_by_name(self):
+        if self._outputs_by_name is None:
+            self._outputs_by_name = {}
+            for absname, v in self.vars["out"].items():
+                self._outputs_by_name.setdefault(v.name, absname)
+        return self._outputs_by_name
 
     def _set_varattr_in_depth(
         self, mda_attrs, mda_endpoint, endpoint, conn_name, upward
@@ -199,34 +333,22 @@ class PushCommand:
         if mda_attrs:
             io_mode = "out" if upward else "in"
             var = self.vars[io_mode][endpoint]
-            varattrs = {
-                "name": conn_name,
-                "io_mode": io_mode,
-                "desc": self.vardescs.get(endpoint, ""),
-                "type": var["type"],
-                "shape": var["shape"],
-                "units": var["units"],
-            }
+            varattrs = VarAttr(conn_name, io_mode, self.vardescs.get(endpoint, ""), var)
             disc_endpoint = mda_endpoint[0]
-            for discattrs in mda_attrs["disciplines_attributes"]:
-                if self.discmap[disc_endpoint] == discattrs["name"]:
-                    if discattrs.get("variables_attributes") is not None:
-                        already_present = [
-                            varattr["name"]
-                            for varattr in discattrs["variables_attributes"]
-                        ]
-                        if conn_name not in already_present:
-                            discattrs["variables_attributes"].append(varattrs)
-                    submda_attrs = discattrs.get("sub_analysis_attributes")
-                    break
+            submda_attrs = None
+            discattrs = self._discs_by_name[id(mda_attrs)].get(
+                self.discmap[disc_endpoint]
+            )
+            if discattrs is not None:
+                if discattrs.get("variables_attributes") is not None:
+                    self._add_varattr(discattrs["variables_attributes"], varattrs)
+                submda_attrs = discattrs.get("sub_analysis_attributes")
             driver_varattrs = mda_attrs["disciplines_attributes"][0][
                 "variables_attributes"
             ]
-            already_present = [varattr["name"] for varattr in driver_varattrs]
-            if conn_name not in already_present:
-                varattr_driver = varattrs.copy()
-                varattr_driver["io_mode"] = "in" if upward else "out"
-                driver_varattrs.append(varattr_driver)
+            if conn_name not in self._get_varnames(driver_varattrs):
+                varattr_driver = varattrs.with_io_mode("in" if upward else "out")
+                self._add_varattr(driver_varattrs, varattr_driver)
             self._set_varattr_in_depth(
                 submda_attrs, mda_endpoint[1:], endpoint, conn_name, upward
             )
@@ -234,35 +356,29 @@ class PushCommand:
     def _set_varattr(self, discattrs, endpoint, varname, conn_name, io_mode):
         if discattrs.get("variables_attributes") is None:
             return
-        already_present = [
-            varattr["name"] for varattr in discattrs["variables_attributes"]
-        ]
-        if conn_name not in already_present:
+        if conn_name not in self._get_varnames(discattrs["variables_attributes"]):
             var = self.vars[io_mode][endpoint]
-            discattrs["variables_attributes"].append(
-                {
-                    "name": conn_name,
-                    "io_mode": io_mode,
-                    "desc": self.vardescs.get(endpoint, ""),
-                    "type": var["type"],
-                    "shape": var["shape"],
-                    "units": var["units"],
-                }
+            self._add_varattr(
+                discattrs["variables_attributes"],
+                VarAttr(conn_name, io_mode, self.vardescs.get(endpoint, ""), var),
             )
 
-    def _set_varattrs_from_outputs(self, varattr, io_mode, varattrs):
-        already_present = [varattr["name"] for varattr in varattrs]
-        if varattr["name"] not in already_present:
-            vattr = varattr.copy()
-            vattr["io_mode"] = io_mode
-            varattrs.append(vattr)
+    def _get_varnames(self, varattrs):
+        """Set of names of variables in given variables attributes list"""
+        names = self._varnames.get(id(varattrs))
+        if names is None:
+            names = self._varnames[id(varattrs)] = {v.name for v in varattrs}
+        return names
+
+    def _add_varattr(self, varattrs, varattr):
+        names = self._get_varnames(varattrs)
+        if varattr.name not in names:
+            names.add(varattr.name)
+            varattrs.append(varattr)
 
     def _get_conn_name(self, conn):
-        if (
-            self.vars["out"][conn["src"]]["name"]
-            == self.vars["in"][conn["tgt"]]["name"]
-        ):
-            return self.vars["out"][conn["src"]]["name"]
+        if self.vars["out"][conn["src"]].name == self.vars["in"][conn["tgt"]].name:
+            return self.vars["out"][conn["src"]].name
         elif conn["src"].startswith(
             AUTO_IVC
         ):  # special case take varname of target when auto_ivc
@@ -271,8 +387,8 @@ class PushCommand:
         else:
             return build_variable_name(conn["src"], conn["tgt"], limit=255)
 
-    def _get_sub_analysis_attributes(self, group, child, prefix):
-        submda_attrs = self._get_mda_hierarchy(group, child, prefix)
+    def _get_sub_analysis_attributes(self, child, prefix):
+        submda_attrs = self._get_mda_hierarchy(child, prefix)
         submda_attrs["name"] = child["name"]
         submda_attrs["disciplines_attributes"] = submda_attrs["disciplines_attributes"]
         self.mdas[prefix] = submda_attrs
@@ -285,31 +401,27 @@ class PushCommand:
 
     # see _get_tree_dict at
     # https://github.com/OpenMDAO/OpenMDAO/blob/master/openmdao/visualization/n2_viewer/n2_viewer.py
-    def _collect_disc_infos(self, system, tree):
+    def _collect_disc_infos(self, tree):
         if "children" not in tree:
             return
 
         for child in tree["children"]:
-            for s in system._subsystems_myproc:
-                if s.name == child["name"]:
-                    if (
-                        child["type"] == "subsystem"
-                        and child["subsystem_type"] == "group"
-                    ):
-                        self.discmap[child["name"]] = child["name"]
-                        self._collect_disc_infos(s, child)
-                    else:
-                        # do not represent IndepVarComp
-                        if isinstance(s, IndepVarComp):
-                            self.discmap[child["name"]] = DRIVER_NAME
-                        else:
-                            self.discmap[child["name"]] = child["name"]
+            if child["type"] == "subsystem" and child["subsystem_type"] == "group":
+                self.discmap[child["name"]] = child["name"]
+                self._collect_disc_infos(child)
+            elif child.get("component_type") == "indep":
+                # do not represent IndepVarComp
+                self.discmap[child["name"]] = DRIVER_NAME
+            else:
+                self.discmap[child["name"]] = child["name"]
 
     # see _get_tree_dict at
     # https://github.com/OpenMDAO/OpenMDAO/blob/master/openmdao/visualization/n2_viewer/n2_viewer.py
     def _collect_var_infos(self, problem):
         system = problem.model
+        indep_var_names = get_indep_var_names(problem)
         for io in ("input", "output"):
+            abs2prom = get_abs2prom(system, io)
             for abs_name in system._var_abs2meta[io]:
                 if io == "input":
                     io_mode = "in"
@@ -323,36 +435,19 @@ class PushCommand:
                 val = meta.get("value", meta.get("val"))  # fix OpenMDAO < 3.10
                 if re.match("int", type(val).__name__):
                     vtype = "Integer"
-                shape = str(meta["shape"])
-                shape = format_shape(self.scalar, shape)
+                # distributed variables are pushed with their shape across processes
+                shape = (
+                    meta["global_shape"] if meta.get("distributed") else meta["shape"]
+                )
+                shape = format_shape(self.scalar, str(shape))
 
-                name = None
-                if Version(OPENMDAO_VERSION) < Version("3.39"):
-                    name = system._var_abs2prom[io][abs_name]
-                else:
-                    name = system._resolver.abs2prom(abs_name, io)
-
-                # name = abs_name
+                name = abs2prom[abs_name]
                 if abs_name.startswith(AUTO_IVC):
-                    name = find_indep_var_name(problem, abs_name)
-                self.vars[io_mode][abs_name] = {
-                    "name": name,
-                    "type": vtype,
-                    "shape": shape,
-                    "units": meta["units"],
-                    "value": val,
-                }
-
-                # retrieve initial conditions
-                var = self.vars[io_mode][abs_name]
-                if abs_name in system._outputs._views:
-                    var["value"] = system._outputs[abs_name]
-                elif abs_name in system._inputs._views:
-                    var["value"] = system._inputs[abs_name]
-                elif abs_name in system._discrete_outputs:
-                    var["value"] = system._discrete_outputs[abs_name]
-                elif abs_name in system._discrete_inputs:
-                    var["value"] = system._discrete_inputs[abs_name]
+                    name = indep_var_names.get(abs_name)
+                # value is retrieved later only for driver outputs (see _get_value)
+                self.vars[io_mode][abs_name] = VarInfo(
+                    name, vtype, shape, meta["units"]
+                )
 
                 desc = self.vardescs.setdefault(name, "")
                 if desc == "":
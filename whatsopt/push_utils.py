@@ -1,12 +1,93 @@
 import re
 import os
-import tempfile
+import sys
 import numpy as np
 from contextlib import contextmanager
 
 from openmdao import __version__ as OPENMDAO_VERSION
+from openmdao.core.group import Group
 from packaging.version import Version
 
+# OpenMDAO 3.39 replaced _var_abs2prom maps by a name resolver
+OPENMDAO_PRE_3_39 = Version(OPENMDAO_VERSION) < Version("3.39")
+
+
+class VarInfo:
+    """Metadata of an OpenMDAO variable (see PushCommand.vars), strings are interned"""
+
+    __slots__ = ("name", "type", "shape", "units")
+
+    def __init__(self, name, vtype, shape, units):
+        self.name = _intern(name)
+        self.type = vtype
+        self.shape = _intern(shape)
+        self.units = _intern(units)
+
+
+class VarAttr:
+    """
+    Variable of a discipline as pushed to WhatsOpt: the variable metadata is shared,
+    the JSON layout is only built by to_dict() when the analysis is serialized.
+    """
+
+    __slots__ = ("name", "io_mode", "desc", "info", "init")
+
+    def __init__(self, name, io_mode, desc, info, init=None):
+        self.name = name
+        self.io_mode = io_mode
+        self.desc = desc
+        self.info = info
+        self.init = init
+
+    def with_io_mode(self, io_mode):
+        return VarAttr(self.name, io_mode, self.desc, self.info, self.init)
+
+    def to_dict(self):
+        attrs = {
+            "name": self.name,
+            "io_mode": self.io_mode,
+            "desc": self.desc,
+            "type": self.info.type,
+            "shape": self.info.shape,
+            "units": self.info.units,
+        }
+        if self.init is not None:
+            attrs["parameter_attributes"] = {"init": self.init}
+        return attrs
+
+
+def _intern(s):
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+def to_mda_dict(mda_attrs):
+    """Replace in place VarAttr records of given analysis attributes by their JSON layout"""
+    for disc in mda_attrs["disciplines_attributes"]:
+        varattrs = disc.get("variables_attributes")
+        if varattrs is not None:
+            for i, vattr in enumerate(varattrs):
+                varattrs[i] = vattr.to_dict()  # record released as soon as converted
+        sub_mdattrs = disc.get("sub_analysis_attributes")
+        if sub_mdattrs:
+            to_mda_dict(sub_mdattrs)
+    return mda_attrs
+
+
+def copy_mda_attrs(mda_attrs):
+    """Copy of given analysis attributes structure, VarAttr records being shared"""
+    copy = dict(mda_attrs)
+    copy["disciplines_attributes"] = []
+    for disc in mda_attrs["disciplines_attributes"]:
+        disc = dict(disc)
+        if "variables_attributes" in disc:
+            disc["variables_attributes"] = list(disc["variables_attributes"])
+        if disc.get("sub_analysis_attributes"):
+            disc["sub_analysis_attributes"] = copy_mda_attrs(
+                disc["sub_analysis_attributes"]
+            )
+        copy["disciplines_attributes"].append(disc)
+    return copy
+
 
 def cut(mda_attrs, depth):
     if depth <= 0:
@@ -21,30 +102,176 @@ def cut(mda_attrs, depth):
 
 
 def flatten(mda_attrs):
-    # print("-------- flatten ", mda_attrs["name"])
+    """
+    Replace sub-analyses of given analysis by disciplines holding the variables
+    of their drivers (io modes swapped), the analysis driver getting the ones it misses.
+    """
+    driver_varattrs = mda_attrs["disciplines_attributes"][0]["variables_attributes"]
+    driver_names = {v.name for v in driver_varattrs}
     for disc in mda_attrs["disciplines_attributes"]:
-        # print("************** ", disc["name"])
-        sub_mdattrs = disc.get("sub_analysis_attributes")
+        sub_mdattrs = disc.pop("sub_analysis_attributes", None)
         if sub_mdattrs:
             varattrs = disc.get("variables_attributes", [])
             subdriver = sub_mdattrs["disciplines_attributes"][0]
-            # print("<<<< DRIVER ", subdriver["variables_attributes"])
             for vattr in subdriver["variables_attributes"]:
-                v = vattr.copy()
-                v["io_mode"] = "out" if vattr["io_mode"] == "in" else "in"
-                varattrs.append(v)
-            del disc["sub_analysis_attributes"]
+                varattrs.append(
+                    vattr.with_io_mode("out" if vattr.io_mode == "in" else "in")
+                )
+                if vattr.name not in driver_names:
+                    driver_names.add(vattr.name)
+                    driver_varattrs.append(vattr)  # records are shared
             disc["variables_attributes"] = varattrs
-            # print(">>>>", disc["name"])
-            # print(disc["variables_attributes"])
 
-            driver = mda_attrs["disciplines_attributes"][0]
-            for vattr in subdriver["variables_attributes"]:
-                already_present = [v["name"] for v in driver["variables_attributes"]]
-                if vattr["name"] not in already_present:
-                    v = vattr.copy()
-                    # print("ADD DRIVER of ", mda_attrs["name"], v)
-                    driver["variables_attributes"].append(v)
+
+def diff_mda_attrs(mda_attrs, ref_attrs, stats=None):
+    """
+    Changes to apply to reference analysis attributes (as exported by WhatsOpt in wopjson
+    format, with records ids) to get the given ones (as built by PushCommand), in the same
+    nested attributes layout: only added or changed disciplines and variables, changed
+    ones being identified by the id of the reference record they update, removed ones
+    being only identified and flagged with "_destroy" (Rails nested attributes),
+    moved disciplines getting their new position.
+    Disciplines are matched by name, variables by name and io mode. Counts of
+    added/changed/removed disciplines and variables are accumulated in given stats.
+    Returns None when there is no change.
+    Raises ValueError when changed or removed reference records have no id (older
+    exports), such records being otherwise created again or left as is by the server.
+    """
+    if stats is None:
+        stats = new_diff_stats()
+    unidentified = []
+    diff = _diff_mda(mda_attrs, ref_attrs, stats, unidentified)
+    if unidentified:
+        raise ValueError(
+            "records without id can not be updated: "
+            + ", ".join(sorted(set(unidentified)))
+        )
+    return diff
+
+
+def _diff_mda(mda_attrs, ref_attrs, stats, unidentified):
+    diff = {}
+    if mda_attrs["name"] != ref_attrs.get("name"):
+        diff["name"] = mda_attrs["name"]
+    ref_discs = {d["name"]: d for d in ref_attrs.get("disciplines_attributes", [])}
+    # disciplines order (driver first) is only changed when kept ones are reordered
+    names = [d["name"] for d in mda_attrs["disciplines_attributes"]]
+    kept = [name for name in names if name in ref_discs]
+    ref_kept = [name for name in ref_discs if name in set(kept)]
+    moved = {name for name, ref_name in zip(kept, ref_kept) if name != ref_name}
+    discs = []
+    for position, disc in enumerate(mda_attrs["disciplines_attributes"]):
+        ref_disc = ref_discs.pop(disc["name"], None)
+        if ref_disc is None:
+            stats["disciplines"]["added"] += 1
+            stats["variables"]["added"] += _count_vars(disc)
+            discs.append(disc)
+            continue
+        disc_diff = _diff_discipline(disc, ref_disc, stats, unidentified)
+        if disc["name"] in moved:
+            disc_diff["position"] = position
+        if disc_diff:
+            stats["disciplines"]["changed"] += 1
+            disc_diff.update(_ref_key(ref_disc, unidentified))
+            disc_diff["name"] = disc["name"]
+            discs.append(disc_diff)
+    for name, ref_disc in ref_discs.items():
+        stats["disciplines"]["removed"] += 1
+        stats["variables"]["removed"] += _count_vars(ref_disc)
+        discs.append(dict(_ref_key(ref_disc, unidentified), _destroy=True))
+    if discs:
+        diff["disciplines_attributes"] = discs
+    return diff or None
+
+
+def new_diff_stats():
+    return {
+        kind: {"added": 0, "changed": 0, "removed": 0}
+        for kind in ("disciplines", "variables")
+    }
+
+
+def _ref_key(ref, unidentified):
+    # nested records are updated or destroyed by id on the server side,
+    # references without id are reported (the diff being refused)
+    if ref.get("id") is None:
+        unidentified.append(ref.get("name", "analysis"))
+        return {}
+    return {"id": ref["id"]}
+
+
+def _count_vars(disc):
+    count = len(disc.get("variables_attributes", []))
+    sub_mdattrs = disc.get("sub_analysis_attributes")
+    if sub_mdattrs:
+        count += sum(_count_vars(d) for d in sub_mdattrs["disciplines_attributes"])
+    return count
+
+
+def _diff_discipline(disc, ref_disc, stats, unidentified):
+    diff = {}
+    ref_vars = {
+        (v["name"], v["io_mode"]): v for v in ref_disc.get("variables_attributes", [])
+    }
+    varattrs = []
+    for var in disc.get("variables_attributes", []):
+        ref_var = ref_vars.pop((var["name"], var["io_mode"]), None)
+        if ref_var is None:
+            stats["variables"]["added"] += 1
+            varattrs.append(var)
+        elif not _same_var(var, ref_var):
+            stats["variables"]["changed"] += 1
+            varattrs.append(_var_update(var, ref_var, unidentified))
+    for ref_var in ref_vars.values():
+        stats["variables"]["removed"] += 1
+        ref_key = _ref_key(ref_var, unidentified)
+        varattrs.append(dict(ref_key, _destroy=True))
+    if varattrs:
+        diff["variables_attributes"] = varattrs
+
+    sub_mdattrs = disc.get("sub_analysis_attributes")
+    ref_sub_mdattrs = ref_disc.get("sub_analysis_attributes")
+    if sub_mdattrs and ref_sub_mdattrs:
+        sub_diff = _diff_mda(sub_mdattrs, ref_sub_mdattrs, stats, unidentified)
+        if sub_diff:
+            diff["sub_analysis_attributes"] = dict(
+                sub_diff, **_ref_key(ref_sub_mdattrs, unidentified)
+            )
+    elif sub_mdattrs:  # discipline became a sub-analysis
+        stats["variables"]["added"] += sum(
+            _count_vars(d) for d in sub_mdattrs["disciplines_attributes"]
+        )
+        diff["sub_analysis_attributes"] = sub_mdattrs
+    elif ref_sub_mdattrs:
+        stats["variables"]["removed"] += sum(
+            _count_vars(d) for d in ref_sub_mdattrs["disciplines_attributes"]
+        )
+        diff["sub_analysis_attributes"] = dict(
+            _ref_key(ref_sub_mdattrs, unidentified), _destroy=True
+        )
+    return diff
+
+
+def _var_update(var, ref_var, unidentified):
+    update = dict(var, **_ref_key(ref_var, unidentified))
+    ref_param = ref_var.get("parameter_attributes")
+    if var.get("parameter_attributes") and ref_param:
+        param = dict(var["parameter_attributes"])
+        param.update(_ref_key(dict(ref_param, name=ref_var["name"]), unidentified))
+        update["parameter_attributes"] = param
+    return update
+
+
+def _same_var(var, ref_var):
+    # only attributes set by push are compared, unset and empty strings being the same
+    for key, value in var.items():
+        if key == "parameter_attributes":
+            ref_param = ref_var.get(key) or {}
+            if value.get("init") != ref_param.get("init"):
+                return False
+        elif (value or "") != (ref_var.get(key) or ""):
+            return False
+    return True
 
 
 # push_command collect_var_infos
@@ -60,24 +287,33 @@ def to_camelcase(name):
     return re.sub(r"(?:^|_)(\w)", lambda x: x.group(1).upper(), name)
 
 
+# wop pull --project subdirectories
+def to_snakecase(name):
+    name = re.sub(r"\W+", "_", name)
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
 # push_command get_mda_attributes
 def simple_value(var):
     typ = var["type"]
+    value = var["value"]
     if var["shape"] == "1" or var["shape"] == "(1,)":
-        if isinstance(var["value"], np.ndarray):
-            var["value"] = var["value"].item()
-        ret = float(var["value"])
+        if isinstance(value, np.ndarray):
+            value = value.item()
+        ret = float(value)
         if typ == "Integer":
             ret = int(ret)
     else:
+        value = np.asarray(value)
+        # convert only when needed (int, bool, string... values), float arrays are not copied
         if typ == "Integer":
-            var["value"] = var["value"].astype(int)
-        else:
-            var["value"] = var["value"].astype(float)
-        if np.all(var["value"] == np.ones(var["value"].shape)):
-            ret = ""
+            value = value.astype(int)
+        elif value.dtype.kind != "f":
+            value = value.astype(float)
+        if value.size == 0 or (value.min() == 1 and value.max() == 1):
+            ret = ""  # all ones: default value
         else:
-            ret = var["value"].tolist()
+            ret = value.tolist()
     return str(ret)
 
 
@@ -94,84 +330,180 @@ def extract_mda_var(fullname):
     return mda, var
 
 
+def component_problem(py_filename, component):
+    """
+    Problem set up with given OpenMDAO component class, importable from given python file,
+    its inputs being promoted outputs of an IndepVarComp (initialized with inputs default
+    values), so that the component can be pushed as an analysis.
+    Inputs are declared by the component setup: they are added to the IndepVarComp in
+    the model configure, the problem is hence set up only once.
+    """
+    from importlib import import_module
+    from openmdao.api import Problem, IndepVarComp
+
+    dirname = os.path.dirname(os.path.abspath(py_filename))
+    module_name = os.path.splitext(os.path.basename(py_filename))[0]
+    if dirname not in sys.path:
+        sys.path.insert(0, dirname)
+    comp_class = getattr(import_module(module_name), component, None)
+    if comp_class is None:
+        raise ValueError(f"Component {component} not found in {py_filename}")
+
+    def configure(group):
+        comp = group._get_subsystem(component)
+        indeps = group._get_subsystem("indeps")
+        for name in comp._var_rel_names["input"]:
+            meta = comp._var_rel2meta[name]
+            indeps.add_output(
+                name,
+                val=meta.get("val"),
+                shape=meta.get("shape"),
+                desc=meta.get("desc", ""),
+                units=meta.get("units"),
+            )
+
+    model = type(component + "Component", (Group,), {"configure": configure})()
+    model.add_subsystem("indeps", IndepVarComp(), promotes=["*"])
+    model.add_subsystem(component, comp_class(), promotes=["*"])
+    problem = Problem(model)
+    problem.setup()
+    problem.final_setup()
+    return problem
+
+
 @contextmanager
-def problem_pyfile(py_filename, component):
-    dirname = os.path.dirname(py_filename)
-    filename = os.path.basename(py_filename)
-    module = os.path.splitext(filename)[0]
-    content = """from openmdao.api import Problem, Group, IndepVarComp
-from {} import {}
-
-comp = {}()
-comp_name = "{}"
-
-
-class {}ComponentDiscovery(Group):
-    pass
-
-
-class {}Component(Group):
-    pass
-
-
-model_discovery = {}ComponentDiscovery()
-model_discovery.add_subsystem(comp_name, comp, promotes=["*"])
-pb_discovery = Problem(model_discovery)
-pb_discovery.setup()
-
-
-inputs = comp.list_inputs(out_stream=None)
-indeps = IndepVarComp()
-for name, meta in inputs:
-    args = {{
-        "val": meta.get("value", meta.get("val")),   # fix OpenMDAO < 3.10
-        "shape": meta.get("shape"),
-        "desc": meta.get("desc", ""),
-        "units": meta.get("units", None)
-    }}
-    indeps.add_output(name, **args)
-
-model = {}Component()
-model.add_subsystem("indeps", indeps, promotes=["*"])
-model.add_subsystem(comp_name, comp, promotes=["*"])
-pb = Problem(model)
-pb.setup()
-pb.final_setup()
-""".format(
-        module,
-        component,
-        component,
-        component,
-        component,
-        component,
-        component,
-        component,
-    )
-    handle, pbfile = tempfile.mkstemp(suffix=".py", dir=dirname)
-    os.close(handle)
-    with open(pbfile, "w") as pbf:
-        pbf.write(content)
+def problems_not_run():
+    """Within this context OpenMDAO problems are only set up when run (model and driver)"""
+    from openmdao.api import Problem
+
+    run_model, run_driver = Problem.run_model, Problem.run_driver
 
+    def final_setup_only(self, *args, **kwargs):
+        self.final_setup()
+
+    Problem.run_model = Problem.run_driver = final_setup_only
     try:
-        yield pbfile
+        yield
     finally:
-        os.unlink(pbfile)
+        Problem.run_model, Problem.run_driver = run_model, run_driver
 
 
-def find_indep_var_name(pb, absname):
-    target = None
+def get_abs2prom(system, io):
+    """Absolute name -> promoted name map of system variables (io: "input" or "output")"""
+    if OPENMDAO_PRE_3_39:
+        return system._var_abs2prom[io]
+    return dict(system._resolver.abs2prom_iter(io))
+
+
+def get_indep_var_names(pb):
+    """
+    Map every connection source absolute name to the promoted name of its first
+    connected input, built in one pass over the problem connections.
+    """
+    abs2prom = get_abs2prom(pb.model, "input")
+    names = {}
     for tgt, src in pb.model._conn_global_abs_in2out.items():
-        if src == absname:
-            target = tgt
-            break
+        if src not in names:
+            names[src] = abs2prom.get(tgt)
+    return names
+
+
+def get_model_tree(group):
+    """
+    Subsystems tree of given model group: the part of OpenMDAO n2 viewer data
+    used by PushCommand (name, type, subsystem_type, component_type, children),
+    variables excluded. Structurally identical groups (same subsystems names and kinds
+    recursively), like points of a multipoint model, share the same children subtree.
+    Only this subsystems tree is memoized: variables attributes depend on the connections
+    crossing each group boundary and are built per group by PushCommand.
+    Under MPI, subsystems not set up in the current process are only named and flagged
+    as "remote" (see merge_model_trees).
+    """
+    tree = {"name": "root", "type": "root", "subsystem_type": "group"}
+    tree["children"] = _get_children_tree(group, {})[1]
+    return tree
+
+
+def _get_children_tree(group, memo):
+    # returns (fingerprint, children) of the given group
+    from openmdao.api import IndepVarComp
+
+    local = {id(s) for s in group._subsystems_myproc}
+    entries = []
+    for s in _get_subsystems_allprocs(group):
+        if id(s) not in local:
+            entries.append((s.name, "remote", None))
+        elif isinstance(s, Group):
+            entries.append((s.name, "group", _get_children_tree(s, memo)))
+        elif isinstance(s, IndepVarComp):
+            entries.append((s.name, "indep", None))
+        else:
+            entries.append((s.name, "component", None))
+    fingerprint = tuple(
+        (name, kind, sub[0] if sub else None) for name, kind, sub in entries
+    )
+    children = memo.get(fingerprint)
+    if children is None:
+        children = memo[fingerprint] = []
+        for name, kind, sub in entries:
+            if kind == "remote":
+                child = {"name": name, "type": "subsystem", "remote": True}
+            elif kind == "indep":
+                child = {
+                    "name": name,
+                    "type": "subsystem",
+                    "subsystem_type": "component",
+                    "component_type": "indep",
+                }
+            else:
+                child = {"name": name, "type": "subsystem", "subsystem_type": kind}
+            if sub:
+                child["children"] = sub[1]
+            children.append(child)
+    return fingerprint, children
+
+
+def _get_subsystems_allprocs(group):
+    allprocs = group._subsystems_allprocs
+    if isinstance(allprocs, dict):  # name -> (system, index) since OpenMDAO 3.4
+        return [system for system, _ in allprocs.values()]
+    return list(allprocs)
+
+
+def merge_model_trees(trees):
+    """
+    Model tree of a model distributed over MPI processes given the trees built by
+    each process with get_model_tree: remote subsystems of a process are taken from
+    the one where they are set up, subsystems order being kept.
+    """
+    tree = dict(trees[0])
+    tree["children"] = _merge_children([t["children"] for t in trees])
+    return tree
+
+
+def _merge_children(children_lists):
+    # subsystems are listed in the same order by every process
+    children = []
+    for entries in zip(*children_lists):
+        local_entries = [c for c in entries if not c.get("remote")]
+        if not local_entries:
+            continue
+        child = dict(local_entries[0])
+        if "children" in child:
+            child["children"] = _merge_children([c["children"] for c in local_entries])
+        children.append(child)
+    return children
+
+
+def get_connections(group):
+    """Connections of given model group sorted by source and target as in n2 viewer data"""
+    conns = sorted((src, tgt) for tgt, src in group._conn_global_abs_in2out.items())
+    return [{"src": src, "tgt": tgt} for src, tgt in conns]
 
-    name = None
-    if Version(OPENMDAO_VERSION) < Version("3.39"):
-        name = pb.model._var_abs2prom["input"].get(target)
-    else:
-        name = pb.model._resolver.abs2prom(target, "input")
 
-    return name
+def find_indep_var_name(pb, absname):
+    # use get_indep_var_names() when resolving several names
+    return get_indep_var_names(pb).get(absname)
 
 
 def build_variable_name(varname1, varname2, limit=255):
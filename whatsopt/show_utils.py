@@ -1,27 +1,50 @@
+import os
+import json
+import html
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from xdsmjs import bundlejs, css
 from datetime import date
 
-HTML_TEMPLATE = """
-<!doctype html>
+# XDSMjs driver node id
+DRIVER_ID = "_U_"
 
-<head>
-<meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
-<style type="text/css">
-{}
+# static site subdirectory where xdsmjs assets are written once
+ASSETS_DIRNAME = "assets"
+INDEX_FILENAME = "index.html"
 
-.footer {{
+FOOTER_STYLE = """
+.footer {
     font-style: italic;
     font-size: small;
     position: absolute;
     right: 20px;
-}}
-</style>
+}
+"""
+
+INLINE_ASSETS_TEMPLATE = """<style type="text/css">
+{}
+{}</style>
 <script type="text/javascript">
 {}
-</script>
+</script>"""
+
+LINKED_ASSETS_TEMPLATE = """<link rel="stylesheet" type="text/css" href="{}">
+<style type="text/css">
+{}</style>
+<script type="text/javascript" src="{}"></script>"""
+
+HTML_TEMPLATE = """
+<!doctype html>
+
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+<title>{title}</title>
+{assets}
 <script type="text/javascript">
     document.addEventListener('DOMContentLoaded', () => {{
-      const mdo = {};
+      const mdo = {mdo};
       const config = {{
         labelizer: {{
             ellipsis: 5,
@@ -41,26 +64,220 @@ HTML_TEMPLATE = """
 </head>
 
 <body>
+    {nav}
     <div class="xdsm-toolbar"></div>
     <div class="xdsm2"></div>
     <hr>
-    <div class="footer">{}</div>
+    <div class="footer">{footer}</div>
 </body>
 
 </html>
 """
 
+INDEX_TEMPLATE = """
+<!doctype html>
+
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+<title>{title}</title>
+<style type="text/css">
+{style}</style>
+</head>
+
+<body>
+    <h1>{title}</h1>
+    <ul>
+{items}
+    </ul>
+    <hr>
+    <div class="footer">{footer}</div>
+</body>
+
+</html>
+"""
+
+
+@lru_cache(maxsize=None)
+def xdsm_assets():
+    """xdsmjs (css, js) contents, read once"""
+    return css(), bundlejs()
+
 
 def generate_xdsm_html(source, xdsm, outfilename="xdsm.html"):
-    html = _generate_html(source, xdsm)
+    content = _generate_html(source, xdsm)
 
     with open(outfilename, "w") as f:
-        f.write(html)
+        f.write(content)
 
 
-def _generate_html(source, xdsm):
-    footer = "XDSM generated from {}, {}, ONERA WhatsOpt".format(
+def _footer(source):
+    return "XDSM generated from {}, {}, ONERA WhatsOpt".format(
         source, date.today().strftime("%b %d, %Y")
     )
-    html = HTML_TEMPLATE.format(css(), bundlejs(), xdsm, footer)
-    return html
+
+
+def _generate_html(source, xdsm, assets=None, title="XDSM", nav=""):
+    if assets is None:  # standalone page
+        xdsm_css, xdsm_js = xdsm_assets()
+        assets = INLINE_ASSETS_TEMPLATE.format(xdsm_css, FOOTER_STYLE, xdsm_js)
+    return HTML_TEMPLATE.format(
+        title=html.escape(title),
+        assets=assets,
+        mdo=json.dumps(xdsm),
+        nav=nav,
+        footer=html.escape(_footer(source)),
+    )
+
+
+def _write_file(filename, content):
+    # write to a temporary file first: an interrupted run leaves no truncated page
+    tmpfile = filename + ".tmp"
+    try:
+        with open(tmpfile, "w") as f:
+            f.write(content)
+        os.replace(tmpfile, filename)
+    except OSError:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+        raise
+
+
+def write_xdsm_assets(outdir):
+    """
+    Write xdsmjs css and js files in assets subdirectory of given directory,
+    file names being suffixed by a hash of their content, so that pages refer to
+    them without cache invalidation concerns and unchanged assets are not rewritten.
+    Returns (css, js) paths relative to given directory.
+    """
+    assets_dir = os.path.join(outdir, ASSETS_DIRNAME)
+    os.makedirs(assets_dir, exist_ok=True)
+    paths = []
+    for content, ext in zip(xdsm_assets(), ["css", "js"]):
+        digest = hashlib.sha256(content.encode()).hexdigest()[:12]
+        filename = f"xdsmjs.{digest}.{ext}"
+        if not os.path.exists(os.path.join(assets_dir, filename)):
+            _write_file(os.path.join(assets_dir, filename), content)
+        paths.append(ASSETS_DIRNAME + "/" + filename)
+    return tuple(paths)
+
+
+def generate_xdsm_site(outdir, pages, title="XDSM", jobs=4):
+    """
+    Generate a static site in given directory: xdsmjs assets written once,
+    one small html page per given page and an index page linking them.
+    pages is a list of dict with keys:
+        filename: page file name relative to outdir
+        title: page title used in index
+        source: where the XDSM comes from (page footer)
+        xdsm: XDSM structure or a function returning it (ex: fetching it from server)
+    Pages are generated concurrently by at most jobs threads.
+    Returns list of (page, error) where error is None when the page is generated.
+    """
+    os.makedirs(outdir, exist_ok=True)
+    css_path, js_path = write_xdsm_assets(outdir)
+    assets = LINKED_ASSETS_TEMPLATE.format(css_path, FOOTER_STYLE, js_path)
+    nav = '<a href="{}">{}</a>'.format(INDEX_FILENAME, html.escape(title))
+
+    def generate_page(page):
+        xdsm = page["xdsm"]() if callable(page["xdsm"]) else page["xdsm"]
+        content = _generate_html(page["source"], xdsm, assets, page["title"], nav)
+        _write_file(os.path.join(outdir, page["filename"]), content)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = [(page, executor.submit(generate_page, page)) for page in pages]
+        for page, future in futures:
+            try:
+                future.result()
+                results.append((page, None))
+            except SystemExit:  # http error already reported
+                results.append((page, "failed"))
+            except Exception as err:
+                results.append((page, str(err) or err.__class__.__name__))
+
+    items = []
+    for page, err in results:
+        if err is None:
+            items.append(
+                '        <li><a href="{}">{}</a></li>'.format(
+                    html.escape(page["filename"]), html.escape(page["title"])
+                )
+            )
+        else:
+            items.append(
+                "        <li>{} ({})</li>".format(
+                    html.escape(page["title"]), html.escape(err)
+                )
+            )
+    index = INDEX_TEMPLATE.format(
+        title=html.escape(title),
+        style=FOOTER_STYLE,
+        items="\n".join(items),
+        footer="Generated {}, ONERA WhatsOpt".format(
+            date.today().strftime("%b %d, %Y")
+        ),
+    )
+    _write_file(os.path.join(outdir, INDEX_FILENAME), index)
+    return results
+
+
+def generate_xdsm(mda_attrs):
+    """
+    XDSM structure (XDSMjs format) of given analysis attributes as built by PushCommand:
+    one diagram for the analysis under "root" key and one for each sub-analysis
+    under its path (dot separated names), nodes being linked to them through "subxdsm".
+    Each diagram workflow is its driver iterating over its disciplines in order, the
+    group nesting being reproduced by the workflows of sub-analyses diagrams.
+    """
+    xdsm = {}
+    _add_xdsm(xdsm, "root", mda_attrs, "")
+    return xdsm
+
+
+def _add_xdsm(xdsm, key, mda_attrs, path):
+    # imported here as push_command imports OpenMDAO, not needed for server analyses
+    from whatsopt.push_command import DRIVER_NAME
+
+    nodes = []
+    producers = {}  # variable name -> node id
+    consumers = []  # (variable name, node id)
+    xdsm[key] = {"nodes": nodes, "edges": [], "workflow": []}
+    for disc in mda_attrs["disciplines_attributes"]:
+        name = disc["name"]
+        varattrs = disc.get("variables_attributes", [])
+        if name == DRIVER_NAME:
+            node = {"id": DRIVER_ID, "name": "Driver", "type": "driver"}
+        else:
+            node = {"id": name, "name": name, "type": "analysis"}
+            sub_mda_attrs = disc.get("sub_analysis_attributes")
+            if sub_mda_attrs:
+                subkey = path + "." + name if path else name
+                node.update(type="mda", subxdsm=subkey)
+                _add_xdsm(xdsm, subkey, sub_mda_attrs, subkey)
+                # sub-analysis variables are the ones of its driver seen from outside
+                subdriver = sub_mda_attrs["disciplines_attributes"][0]
+                varattrs = [
+                    dict(v, io_mode="out" if v["io_mode"] == "in" else "in")
+                    for v in subdriver["variables_attributes"]
+                ]
+        nodes.append(node)
+        for vattr in varattrs:
+            if vattr["io_mode"] == "out":
+                producers.setdefault(vattr["name"], node["id"])
+            else:
+                consumers.append((vattr["name"], node["id"]))
+
+    edges = {}  # (from, to) -> variable names
+    for varname, to in consumers:
+        src = producers.get(varname)
+        if src is not None and src != to:
+            edges.setdefault((src, to), []).append(varname)
+    xdsm[key]["edges"] = [
+        {"from": src, "to": to, "name": ", ".join(varnames)}
+        for (src, to), varnames in edges.items()
+    ]
+    disc_ids = [node["id"] for node in nodes if node["id"] != DRIVER_ID]
+    if len(disc_ids) < len(nodes):
+        xdsm[key]["workflow"] = [DRIVER_ID, disc_ids]
+    else:
+        xdsm[key]["workflow"] = disc_ids
@@ -2,9 +2,11 @@ import os
 import re
 import csv
 import sys
+import copy
+import threading
 from openmdao.api import CaseReader
 from tabulate import tabulate
-from whatsopt.logging import log, error
+from whatsopt.logging import log, error, debug
 
 
 def load_from_csv(filename):
@@ -112,6 +114,133 @@ def load_from_hdf5(filename):
     return name, cases, statuses
 
 
+class _ProblemNeeded(Exception):
+    # raised when initialize uses mda as an analysis problem
+    pass
+
+
+class _RecordingMda(dict):
+    """Mapping recording values set by initialize(mda)"""
+
+    def __missing__(self, name):
+        raise _ProblemNeeded(f"{name} read before being set")
+
+    def __getattr__(self, attr):
+        raise _ProblemNeeded(f"{attr} problem attribute used")
+
+
+def load_vars_init(py_filename):
+    """
+    Variables init values set by initialize(mda) function of given mda_init.py file
+    evaluated on a plain mapping, without setting up the analysis problem.
+    Returns values {name: value} or None when initialize needs the problem
+    (values read before set, problem methods).
+    """
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location("_wop_mda_init", py_filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    mda = _RecordingMda()
+    try:
+        module.initialize(mda)
+    except _ProblemNeeded as err:
+        debug(f"{py_filename} static evaluation stopped ({err})")
+        return None
+    return dict(mda)
+
+
+def format_init_value(value, shape=None):
+    """Init value as uploaded to the server (list of floats string), broadcast to shape if given"""
+    import numpy as np
+
+    value = np.atleast_1d(np.asarray(value, dtype=float))
+    if shape is not None and value.shape != tuple(shape):
+        try:
+            value = np.broadcast_to(value, shape)
+        except ValueError:
+            pass
+    return str(value.tolist())
+
+
+def _literal(node, default=None):
+    import ast
+
+    if node is None:
+        return default
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def _indeps_defaults(tree):
+    import ast
+    import numpy as np
+
+    indeps = set()  # names bound to IndepVarComp subsystems
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(
+            isinstance(n, ast.Call)
+            and isinstance(n.func, ast.Name)
+            and n.func.id == "IndepVarComp"
+            for n in ast.walk(node.value)
+        ):
+            indeps.update(t.id for t in node.targets if isinstance(t, ast.Name))
+    defaults = {}
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "add_output"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id in indeps
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+        ):
+            kwargs = {kw.arg: kw.value for kw in node.keywords}
+            val = node.args[1] if len(node.args) > 1 else kwargs.get("val")
+            val = _literal(val, default=1.0)  # OpenMDAO default value
+            shape = _literal(kwargs.get("shape"))
+            if val is not None and shape is not None:
+                try:
+                    val = np.broadcast_to(val, shape).tolist()
+                except (TypeError, ValueError):
+                    val = None
+            defaults[node.args[0].value] = val
+    return defaults
+
+
+def load_design_vars(dirname):
+    """
+    Design variables of the analysis generated in given directory, read from the
+    independent variables component of the generated *_base.py files (the ones listed
+    in the .wop files manifest, or the ones of the directory) without running them.
+    Returns {name: default value (None when not a literal)} or None when not found.
+    """
+    import ast
+    import glob
+    from whatsopt.utils import FILES_KEY, WOP_CONF_FILENAME, load_state
+
+    manifest = load_state(os.path.join(dirname, WOP_CONF_FILENAME)).get(FILES_KEY)
+    if manifest:
+        filenames = [
+            os.path.join(dirname, f) for f in manifest if f.endswith("_base.py")
+        ]
+    else:
+        filenames = glob.glob(os.path.join(dirname, "*_base.py"))
+    for filename in sorted(filenames):
+        if not os.path.exists(filename):
+            continue
+        with open(filename, encoding="utf-8") as f:
+            source = f.read()
+        if "IndepVarComp" in source:
+            defaults = _indeps_defaults(ast.parse(source))
+            if defaults:
+                return defaults
+    return None
+
+
 def print_cases(cases, statuses):
     headers = ["success"]
     n = len(cases[0]["values"]) if cases else 0
@@ -126,8 +255,40 @@ def print_cases(cases, statuses):
     log(tabulate(data, headers))
 
 
+# recorded data loaded from sqlite files: (path, mtime, size) -> (name, cases, statuses)
+# only cached by processes running several commands (wop daemon, wop batch) which
+# may load the same file several times, disabled (size 0) for one-shot commands
+SQLITE_CACHE_SIZE = 8
+_sqlite_cache_size = 0
+_sqlite_cache = {}
+_sqlite_lock = threading.Lock()
+
+
+def set_sqlite_cache_size(size=SQLITE_CACHE_SIZE):
+    """Set max count of cached sqlite files data (0 disables the cache)"""
+    global _sqlite_cache_size
+    with _sqlite_lock:
+        _sqlite_cache_size = size
+        while len(_sqlite_cache) > size:
+            del _sqlite_cache[next(iter(_sqlite_cache))]
+
+
 def load_sqlite_file(filename):
     log("Load {}...".format(filename))
+    if _sqlite_cache_size == 0:
+        return _load_sqlite_file(filename)
+    stat = os.stat(filename)
+    key = (os.path.realpath(filename), stat.st_mtime_ns, stat.st_size)
+    with _sqlite_lock:
+        if key not in _sqlite_cache:
+            if len(_sqlite_cache) >= _sqlite_cache_size:
+                del _sqlite_cache[next(iter(_sqlite_cache))]
+            _sqlite_cache[key] = _load_sqlite_file(filename)
+        data = _sqlite_cache[key]
+    return copy.deepcopy(data)  # callers may modify loaded data
+
+
+def _load_sqlite_file(filename):
     reader = CaseReader(filename)
     cases = reader.list_cases("driver", out_stream=None)
     if len(cases) == 0:
@@ -1,18 +1,23 @@
 import os
 import re
 import sys
+import hashlib
+import tomli
 import tomli_w
 from whatsopt.logging import error
 from shutil import move
 
 
 WOP_CONF_FILENAME = ".wop"
+# files content hash manifest (version 3) can not be read by wop < 2.7.0
+WOP_FORMAT_VERSION = 3
 
 WOP_FORMAT_VERSION_KEY = "wop_format_version"
 WHATSOPT_URL_KEY = "whatsopt_url"
 ANALYSIS_ID_KEY = "analysis_id"
 FRAMEWORK_KEY = "framework"
 PULL_MODE_KEY = "pull_mode"
+FILES_KEY = "files"
 
 FRAMEWORK_OPENMDAO = "openmdao"
 FRAMEWORK_GEMSEO = "gemseo"
@@ -28,17 +33,20 @@ def save_state(
     comment = """# This file contains recorded state from wop pull/update commands
 # DO NOT EDIT unless you know what you are doing
 # Version history:
+# * version 3: add files content hash manifest (not readable by wop < 2.7.0)
 # * version 2: use toml format, add wop_format_version
 # * version 1: initial format "key: val"
 # * version 0: no wop file
 #
 """
     _state = {}
-    _state[WOP_FORMAT_VERSION_KEY] = 2
+    _state[WOP_FORMAT_VERSION_KEY] = WOP_FORMAT_VERSION
     _state[WHATSOPT_URL_KEY] = state[WHATSOPT_URL_KEY]
     _state[ANALYSIS_ID_KEY] = int(state[ANALYSIS_ID_KEY])
     _state[FRAMEWORK_KEY] = state[FRAMEWORK_KEY]
     _state[PULL_MODE_KEY] = state[PULL_MODE_KEY]
+    if state.get(FILES_KEY):
+        _state[FILES_KEY] = dict(sorted(state[FILES_KEY].items()))
     content = tomli_w.dumps(_state)
 
     with open(filename, "w") as f:
@@ -47,27 +55,44 @@ def save_state(
 
 
 def load_state(filename=WOP_CONF_FILENAME):
-    # Should be able to load version 0, version 1 and version 2 format
+    # Should be able to load version 0, version 1, version 2 and version 3 format
     state = {"wop_format_version": 0}
     if not os.path.exists(filename):
         return state
     with open(filename, "r") as f:
-        for line in f.readlines():
-            line = line.strip()
-            if line == "" or line.startswith("#"):
-                continue
-            m = re.search(r"(\S+)\s*[:=]\s*(\S+)", line)
-            if m:
-                val = m.group(2)
-                if val.startswith('"') or val.startswith("'"):
-                    val = val[1:-1]
-                if re.match(r"\d+", val):
-                    val = int(val)
-
-                state[m.group(1)] = val
-            else:
-                error(f"Syntax error in {filename} file: line '{line}' invalid")
+        content = f.read()
+    try:
+        # version 2+: toml format
+        toml_state = tomli.loads(content)
+        if toml_state.get(WOP_FORMAT_VERSION_KEY):
+            if toml_state[WOP_FORMAT_VERSION_KEY] > WOP_FORMAT_VERSION:
+                error(
+                    f"{filename} file format version "
+                    f"{toml_state[WOP_FORMAT_VERSION_KEY]} is not supported "
+                    f"(max {WOP_FORMAT_VERSION}): upgrade wop"
+                )
                 sys.exit(-1)
+            state.update(toml_state)
+            return state
+    except tomli.TOMLDecodeError:
+        pass
+    # version 1: "key: val" format
+    for line in content.splitlines():
+        line = line.strip()
+        if line == "" or line.startswith("#"):
+            continue
+        m = re.search(r"(\S+)\s*[:=]\s*(\S+)", line)
+        if m:
+            val = m.group(2)
+            if val.startswith('"') or val.startswith("'"):
+                val = val[1:-1]
+            if re.match(r"\d+", val):
+                val = int(val)
+
+            state[m.group(1)] = val
+        else:
+            error(f"Syntax error in {filename} file: line '{line}' invalid")
+            sys.exit(-1)
     if not state.get("wop_format_version"):
         state["wop_format_version"] = 1
 
@@ -209,3 +234,23 @@ def move_files(file_to_move, tempdir):
             os.makedirs(dir_to)
         if file_to_move[file_to]:
             move(file_from, dir_to)
+
+
+def file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_files_manifest():
+    state = load_state()
+    return state.get(FILES_KEY, {})
+
+
+def is_mpi_root():
+    """Whether the current process is the root one of an MPI run (or not run under MPI)"""
+    from openmdao.utils.mpi import MPI
+
+    return MPI is None or MPI.COMM_WORLD.rank == 0
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+from types import ModuleType
+
+from whatsopt.logging import log, info, error
+from whatsopt.cache_utils import local_module_files
+from whatsopt.command_utils import is_user_module, isolated_state
+
+# seconds between two checks of watched files
+POLL_INTERVAL = 1.0
+
+
+def file_mtimes(files):
+    """Modification times of given files (None when a file does not exist)"""
+    mtimes = {}
+    for f in files:
+        try:
+            mtimes[f] = os.stat(f).st_mtime_ns
+        except OSError:
+            mtimes[f] = None
+    return mtimes
+
+
+def changed_files(mtimes):
+    """Files whose modification time differs from the given ones"""
+    current = file_mtimes(mtimes)
+    return [f for f in mtimes if current[f] != mtimes[f]]
+
+
+def drop_modules(files):
+    """
+    Remove from sys.modules user modules loaded from given files, so that they are
+    reloaded by next import, as well as user modules referring to them (transitively)
+    which would otherwise keep stale classes or functions. Returns dropped module names.
+    """
+    files = {os.path.realpath(f) for f in files}
+    user_modules = {
+        name: module
+        for name, module in list(sys.modules.items())
+        if name != "__main__" and is_user_module(module)
+    }
+    stale = {
+        name
+        for name, module in user_modules.items()
+        if os.path.realpath(module.__file__) in files
+    }
+    dropped = set()
+    while stale:
+        dropped |= stale
+        stale = {
+            name
+            for name, module in user_modules.items()
+            if name not in dropped and _refers_to(module, dropped)
+        }
+    for name in dropped:
+        del sys.modules[name]
+    return sorted(dropped)
+
+
+def _refers_to(module, names):
+    if any(module.__name__.startswith(name + ".") for name in names):
+        return True  # submodule of a stale package
+    for value in list(vars(module).values()):
+        if isinstance(value, ModuleType):
+            ref = value.__name__
+        else:
+            ref = getattr(value, "__module__", None)
+        if isinstance(ref, str) and ref in names:
+            return True
+    return False
+
+
+def wait_for_changes(mtimes, interval=POLL_INTERVAL):
+    """Block until one of the files of given modification times changes, return changed files"""
+    while True:
+        time.sleep(interval)
+        changed = changed_files(mtimes)
+        if changed:
+            return changed
+
+
+def watch(py_filename, discover, update, interval=POLL_INTERVAL, max_runs=None):
+    """
+    Call discover() to get attributes from given problem file, then update(attributes)
+    when they differ from the last ones, again each time the problem file or a local
+    module it imports changes. Changed modules (and modules referring to them) are
+    reloaded, others (OpenMDAO, unchanged user modules) stay imported. Discovery errors
+    are reported and the files watched again. Stops after max_runs discoveries if given
+    or on keyboard interrupt.
+    """
+    last = None
+    watched = {os.path.realpath(py_filename)}
+    runs = 0
+    try:
+        while True:
+            runs += 1
+            # taken before discovery: changes made while it runs are not missed
+            mtimes = file_mtimes(sorted(watched))
+            with isolated_state(keep_modules=True):
+                try:
+                    attrs = discover()
+                except (Exception, SystemExit) as err:
+                    error(
+                        f"{py_filename} discovery failed ({type(err).__name__}: {err})"
+                    )
+                    attrs = None
+                imported = set(local_module_files()) - watched
+            watched |= imported
+            mtimes.update(file_mtimes(imported))
+            if attrs is not None:
+                if attrs == last:
+                    info("Analysis unchanged")
+                else:
+                    update(attrs)
+                    last = attrs
+            if max_runs is not None and runs >= max_runs:
+                return
+            log(f"Watching {len(mtimes)} files for changes (Ctrl+C to stop)...")
+            changed = wait_for_changes(mtimes, interval)
+            info("Changed: {}".format(", ".join(os.path.basename(f) for f in changed)))
+            drop_modules(changed)
+    except KeyboardInterrupt:
+        log("")
+        info("Watch stopped")
@@ -2,30 +2,38 @@ import os
 import sys
 import json
 import getpass
-import requests
 import copy
+import functools
 import re
 import zipfile
 import tempfile
-import numpy as np
+import threading
 import time
+import weakref
 import tomli
+from collections import Counter
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import tomli_w
-from tabulate import tabulate
 from urllib.parse import urlparse
-from packaging.version import Version
-
-# push
-import openmdao.utils.hooks as hooks
-from openmdao.utils.file_utils import _load_and_exec
-
-from openmdao.utils.webview import webview
-from openmdao.api import IndepVarComp
-
-from openmdao import __version__ as OPENMDAO_VERSION
-
-from whatsopt.convert_utils import convert_sqlite_to_csv
 
+# Heavy dependencies (requests, tabulate, numpy, openmdao, xdsmjs) and whatsopt
+# modules relying on them are imported only within the methods which need them,
+# this way lightweight commands (login, logout, status, list) start quickly.
+
+from whatsopt.index_utils import (
+    SCOPE_ALL,
+    SCOPE_OWNED,
+    get_index_etag,
+    invalidate_index,
+    is_index_fresh,
+    open_index,
+    project_scope,
+    query_index,
+    touch_index,
+    update_index,
+)
+from whatsopt.json_utils import open_output, write_json, write_json_chunks
 from whatsopt.logging import log, info, warn, error, debug
 from whatsopt.utils import (
     FRAMEWORK_GEMSEO,
@@ -33,9 +41,12 @@ from whatsopt.utils import (
     MODE_PACKAGE,
     MODE_PLAIN,
     extract_remote_name,
+    file_hash,
+    get_files_manifest,
     is_analysis_user_file,
     is_based_on,
     is_framework_switch,
+    is_mpi_root,
     is_package_mode,
     is_run_script_file,
     is_test_file,
@@ -45,19 +56,6 @@ from whatsopt.utils import (
     move_files,
     save_state,
 )
-from whatsopt.upload_utils import (
-    load_from_csv,
-    load_from_sqlite,
-    load_from_hdf5,
-    print_cases,
-)
-from whatsopt.push_utils import (
-    find_indep_var_name,
-    problem_pyfile,
-    to_camelcase,
-)
-from whatsopt.push_command import PushCommand
-from whatsopt.show_utils import generate_xdsm_html
 
 from whatsopt import __version__
 
@@ -65,6 +63,18 @@ WHATSOPT_DIRNAME = os.path.join(os.path.expanduser("~"), ".whatsopt")
 API_KEY_FILENAME = os.path.join(WHATSOPT_DIRNAME, "api_key")
 URL_FILENAME = os.path.join(WHATSOPT_DIRNAME, "url")
 REMOTES_FILENAME = os.path.join(WHATSOPT_DIRNAME, "remotes")
+INDEX_FILENAME = os.path.join(WHATSOPT_DIRNAME, "analyses.sqlite")
+ATTRS_CACHE_DIRNAME = os.path.join(WHATSOPT_DIRNAME, "cache")
+
+# max time (in seconds) allowed to probe a remote server
+PROBE_TIMEOUT = 5
+
+# max age of local analyses index (in seconds) before refreshing it from remote
+INDEX_MAX_AGE = 600
+
+# max age of a successful connection test (in seconds) before checking again,
+# only relevant for long-running processes (wop daemon, wop batch)
+CONNECTION_MAX_AGE = 300
 
 EXTRANET_SERVER_URL = "https://ether.onera.fr/whatsopt"
 
@@ -73,12 +83,48 @@ class WhatsOptImportMdaError(Exception):
     pass
 
 
-class AnalysisPushedException(Exception):
-    def __init__(self, xdsm):
-        self.xdsm = xdsm
+class _AnalysesDiscovered(Exception):
+    # raised to interrupt problem file execution
+    pass
+
+
+# serializes login state writes (remotes, url, api_key files) of the process
+_STATE_LOCK = threading.RLock()
+
+
+def _write_file(filename, content):
+    """Write content (str or bytes) to filename atomically: readers never see a partial file"""
+    dirname = os.path.dirname(filename)
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=dirname, prefix=".wop_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content.encode("utf-8") if isinstance(content, str) else content)
+        os.replace(tmpname, filename)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
+@contextmanager
+def unsaved_login():
+    """Within this context (wop batch), logins do not change the default remote server"""
+    saved = WhatsOpt._login_saved
+    WhatsOpt._login_saved = False
+    try:
+        yield
+    finally:
+        WhatsOpt._login_saved = saved
 
 
 class WhatsOpt:
+    # sessions (one per thread as requests sessions are not thread-safe) and
+    # successful connection tests shared by all instances of the process
+    _local = threading.local()
+    _connections = {}
+    # whether a successful login is saved as the default remote server (url and api_key)
+    _login_saved = True
+
     def __init__(self, url=None, api_key=None, login=None):
         self._remotes = self._read_remotes()
 
@@ -92,7 +138,7 @@ class WhatsOpt:
             if url:
                 self._url = url.strip("/")
                 current_url = self._read_url()
-                if current_url and self._url != current_url:
+                if current_url and self._url != current_url and self._login_saved:
                     self.logout(echo=False)
             elif self.is_logged():
                 self._url = self._read_url()
@@ -104,12 +150,22 @@ class WhatsOpt:
             else:
                 self._api_key = self._read_api_key()
 
-        # config session object
-        self.session = requests.Session()
-        urlinfos = urlparse(self._url)
-        self.session.trust_env = re.match(r"\w+.onera\.fr", urlinfos.netloc)
         self.headers = {}
 
+    @property
+    def session(self):
+        sessions = WhatsOpt._local.__dict__.setdefault("sessions", {})
+        session = sessions.get(self._url)
+        if session is None:
+            import requests
+
+            # config session object
+            session = requests.Session()
+            urlinfos = urlparse(self._url)
+            session.trust_env = re.match(r"\w+.onera\.fr", urlinfos.netloc)
+            sessions[self._url] = session
+        return session
+
     @property
     def url(self):
         return self._url
@@ -131,8 +187,16 @@ class WhatsOpt:
 
     @staticmethod
     def _write_remotes(remotes):
-        with open(REMOTES_FILENAME, "wb") as f:
-            tomli_w.dump(remotes, f)
+        _write_file(REMOTES_FILENAME, tomli_w.dumps(remotes))
+
+    @staticmethod
+    def _update_remotes(update):
+        """Apply update function to the remotes read from file then save them, returns them"""
+        with _STATE_LOCK:
+            remotes = WhatsOpt._read_remotes()
+            update(remotes)
+            WhatsOpt._write_remotes(remotes)
+        return remotes
 
     def _ask_api_key(self):
         log("You have to set your API key.")
@@ -165,12 +229,9 @@ class WhatsOpt:
             return None
 
     def _write_login_infos(self):
-        if not os.path.exists(WHATSOPT_DIRNAME):
-            os.makedirs(WHATSOPT_DIRNAME)
-        with open(API_KEY_FILENAME, "w") as f:
-            f.write(self.api_key)
-        with open(URL_FILENAME, "w") as f:
-            f.write(self.url)
+        with _STATE_LOCK:
+            _write_file(API_KEY_FILENAME, self.api_key)
+            _write_file(URL_FILENAME, self.url)
 
     def login(self, echo=False, retry=True):
         debug(f"login(api_key={self.api_key}, echo={echo})")
@@ -204,25 +265,32 @@ class WhatsOpt:
         debug(f"ok={ok}")
         if not ok and retry:
             # try to log again
-            # log out silently as one may be logged on another server
-            self.logout(echo=False)
-            self._remotes = {
-                k: v for k, v in self._remotes.items() if v["url"] != self.url
-            }
-            # save url again as is has been wipe out by logout
-            with open(URL_FILENAME, "w") as f:
-                f.write(self._url)
+            def forget(remotes):
+                for name in [k for k, v in remotes.items() if v["url"] == self.url]:
+                    del remotes[name]
+
+            with _STATE_LOCK:
+                if self._login_saved:
+                    # log out silently as one may be logged on another server
+                    self.logout(echo=False)
+                    # save url again as is has been wipe out by logout
+                    _write_file(URL_FILENAME, self._url)
+                self._remotes = self._update_remotes(forget)
             return self.login(retry=False)
 
         # make remote info
         if ok:
-            self._write_login_infos()
             remote_name = extract_remote_name(self.url)
-            if remote_name:
-                self._remotes[remote_name] = {"url": self.url, "api_key": self.api_key}
-
+            with _STATE_LOCK:
+                if self._login_saved:
+                    self._write_login_infos()
+                if remote_name:
+                    remote = {"url": self.url, "api_key": self.api_key}
+                    if self._remotes.get(remote_name) != remote:
+                        self._remotes = self._update_remotes(
+                            lambda remotes: remotes.update({remote_name: remote})
+                        )
         debug(self._remotes)
-        self._write_remotes(self._remotes)
 
         if not ok:
             error("Login to WhatsOpt ({}) failed.".format(self.url))
@@ -243,25 +311,30 @@ class WhatsOpt:
 
     @staticmethod
     def logout(list=None, all=None, remote=None, echo=True):
+        WhatsOpt._connections.clear()
         if list:
             WhatsOpt.list_remotes()
         elif all:
-            WhatsOpt._write_remotes({})
+            with _STATE_LOCK:
+                WhatsOpt._write_remotes({})
             if echo:
                 info("Sucessfully logged out from all WhatsOpt remotes")
         elif remote:
-            remotes = WhatsOpt._read_remotes()
-            if remotes.get(remote):
-                del remotes[remote]
-                WhatsOpt._write_remotes(remotes)
-                if echo:
-                    info(f"Sucessfully logged out from remote WhatsOpt {remote}")
+            with _STATE_LOCK:
+                remotes = WhatsOpt._read_remotes()
+                known = bool(remotes.get(remote))
+                if known:
+                    del remotes[remote]
+                    WhatsOpt._write_remotes(remotes)
+            if known and echo:
+                info(f"Sucessfully logged out from remote WhatsOpt {remote}")
         else:
-            if os.path.exists(API_KEY_FILENAME):
-                os.remove(API_KEY_FILENAME)
-            url = WhatsOpt._read_url()
-            if url:
-                os.remove(URL_FILENAME)
+            with _STATE_LOCK:
+                if os.path.exists(API_KEY_FILENAME):
+                    os.remove(API_KEY_FILENAME)
+                url = WhatsOpt._read_url()
+                if url:
+                    os.remove(URL_FILENAME)
             if echo:
                 if url:
                     info(f"Sucessfully logged out from remote WhatsOpt {url}")
@@ -274,6 +347,8 @@ class WhatsOpt:
 
     @staticmethod
     def list_remotes():
+        from tabulate import tabulate
+
         remotes = WhatsOpt._read_remotes()
         headers = ["name", "url"]
         data = []
@@ -282,25 +357,189 @@ class WhatsOpt:
         info("Known remote servers")
         log(tabulate(data, headers))
 
-    def list_analyses(self, all=False, project_query=None):
-        param = ""
+    @staticmethod
+    def probe_remotes(timeout=PROBE_TIMEOUT):
+        from tabulate import tabulate
+
+        remotes = WhatsOpt._read_remotes()
+        if not remotes:
+            info("No known remote server")
+            log("  (use 'wop login <url>' to connect to a remote WhatsOpt server)")
+            return
+        mda_id = mda_url = None
+        try:
+            mda_id = get_analysis_id()
+            mda_url = get_whatsopt_url()
+        except ValueError as err:
+            warn(str(err))
+        current_url = WhatsOpt._read_url()
+
+        info(f"Probe {len(remotes)} known remote servers...")
+        results = WhatsOpt._probe_all(remotes, mda_id, timeout, mda_url)
+
+        headers = ["", "name", "url", "status", "latency", "whatsopt", "wop"]
+        if mda_id:
+            headers.append(f"analysis #{mda_id}")
+        data = []
+        for name in remotes:
+            url = remotes[name]["url"]
+            res = results.get(name, {"status": "timeout"})
+            row = [
+                "*" if url == current_url else "",
+                name,
+                url,
+                res["status"],
+                f"{res['latency']:.0f} ms" if res.get("latency") else "",
+                res.get("whatsopt", ""),
+                res.get("wop", ""),
+            ]
+            if mda_id:
+                row.append(res.get("analysis", ""))
+            data.append(row)
+        log(tabulate(data, headers))
+        log(f"(you are using wop {__version__}, * marks the current remote)")
+        if mda_id:
+            log(
+                f"(analysis #{mda_id} is only checked on the remote it was pulled from)"
+            )
+        log("")
+
+    @staticmethod
+    def _probe_all(remotes, mda_id=None, timeout=PROBE_TIMEOUT, mda_url=None):
+        # remotes are probed at the same time within a total time budget:
+        # requests timeouts only bound each connect/read, so probes run in daemon
+        # threads which are not waited for (even at exit) once the budget is spent
+        # analysis ids being per server, mda_id is only checked on mda_url remote
+        results = {}
+
+        def probe(name, url, api_key):
+            pulled_from = bool(mda_url) and url.rstrip("/") == mda_url.rstrip("/")
+            res = WhatsOpt._probe_remote(
+                url, api_key, mda_id if pulled_from else None, timeout
+            )
+            if mda_id and not pulled_from:
+                res["analysis"] = "n/a"
+            results[name] = res
+
+        threads = [
+            threading.Thread(
+                target=probe, args=(name, rem["url"], rem["api_key"]), daemon=True
+            )
+            for name, rem in remotes.items()
+        ]
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        return dict(results)
+
+    @staticmethod
+    def _probe_remote(url, api_key, mda_id=None, timeout=PROBE_TIMEOUT):
+        import requests
+
+        session = requests.Session()
+        session.trust_env = re.match(r"\w+.onera\.fr", urlparse(url).netloc)
+        headers = {
+            "Authorization": "Token token=" + api_key,
+            "User-Agent": "wop/{}".format(__version__),
+        }
+        res = {}
+        start = time.perf_counter()
+        try:
+            resp = session.get(
+                url + "/api/v1/versioning", headers=headers, timeout=timeout
+            )
+            res["latency"] = 1000 * (time.perf_counter() - start)
+            if resp.status_code == requests.codes.forbidden:
+                res["status"] = "wop version rejected"
+            elif not resp.ok:
+                res["status"] = f"HTTP error {resp.status_code}"
+            else:
+                res.update(resp.json())
+                res["status"] = "ok"
+                if mda_id:
+                    res["analysis"] = "timeout"
+                    remaining = timeout - (time.perf_counter() - start)
+                    resp = session.get(
+                        url + f"/api/v1/analyses/{mda_id}",
+                        headers=headers,
+                        timeout=max(remaining, 0.1),
+                    )
+                    res["analysis"] = "found" if resp.ok else "not found"
+        except requests.exceptions.Timeout:
+            res.setdefault("status", "timeout")
+        except requests.exceptions.RequestException:
+            res.setdefault("status", "unreachable")
+        except ValueError:  # not a json response
+            res.setdefault("status", "not a WhatsOpt server")
+        finally:
+            session.close()
+        return res
+
+    def list_analyses(self, all=False, project_query=None, options={}):
+        from tabulate import tabulate
+
         if all:
-            param = "?all=true"
+            scope, params = SCOPE_ALL, {"all": "true"}
         elif project_query:
-            param = "?design_project_query={}".format(project_query)
-        url = self.endpoint("/api/v1/analyses" + param)
-        resp = self.session.get(url, headers=self.headers)
-        if resp.ok:
-            mdas = resp.json()
-            headers = ["id", "name", "created at"]
-            data = []
-            for mda in mdas:
-                date = mda.get("created_at", None)
-                data.append([mda["id"], mda["name"], date])
-            log(tabulate(data, headers))
-            log("")
+            # project names are only known by the remote: query it for the project
+            scope = project_scope(project_query)
+            params = {"design_project_query": project_query}
         else:
-            WhatsOpt.check_http_error(resp)
+            scope, params = SCOPE_OWNED, {}
+        if options.get("--regex"):
+            try:
+                re.compile(options["--regex"])
+            except re.error as err:
+                error(f"Bad regular expression '{options['--regex']}': {err}")
+                sys.exit(-1)
+        with closing(open_index(INDEX_FILENAME)) as conn:
+            if not options.get("--offline") and (
+                options.get("--refresh")
+                or not is_index_fresh(conn, self.url, scope, INDEX_MAX_AGE)
+            ):
+                self.login()
+                url = self.endpoint("/api/v1/analyses")
+                headers = dict(self.headers)
+                etag = get_index_etag(conn, self.url, scope)
+                if etag and not options.get("--refresh"):
+                    # list downloaded only when changed (if remote supports it)
+                    headers["If-None-Match"] = etag
+                resp = self.session.get(url, headers=headers, params=params)
+                if resp.status_code == 304:
+                    touch_index(conn, self.url, scope)
+                else:
+                    if not resp.ok:
+                        WhatsOpt.check_http_error(resp)
+                    update_index(
+                        conn, self.url, scope, resp.json(), resp.headers.get("ETag")
+                    )
+
+            page = options.get("--page")
+            page_size = options.get("--page-size") or 50
+            count, rows = query_index(
+                conn,
+                self.url,
+                scope,
+                name=options.get("--name"),
+                regex=options.get("--regex"),
+                since=options.get("--since"),
+                until=options.get("--until"),
+                limit=page_size if page else None,
+                offset=(page - 1) * page_size if page else 0,
+            )
+
+        if count == 0 and options.get("--offline"):
+            info(f"No analysis found in local index of {self.url}")
+            log("  (use 'wop list' without --offline to refresh the index)")
+        headers = ["id", "name", "created at"]
+        data = [[id, name, date] for id, name, date, _ in rows]
+        log(tabulate(data, headers))
+        if page:
+            page_count = max(1, -(-count // page_size))
+            log(f"(page {page}/{page_count}, {count} analyses)")
+        log("")
 
     def is_connected(self):
         return self._test_connection()
@@ -325,6 +564,8 @@ class WhatsOpt:
                 resp = self.session.get(url, headers=self.headers)
 
                 if resp.ok:
+                    from tabulate import tabulate
+
                     mda = resp.json()
                     if is_based_on(FRAMEWORK_GEMSEO):
                         mda["framework"] = "GEMSEO"
@@ -371,14 +612,68 @@ class WhatsOpt:
         log("")
 
     def push_component_cmd(self, py_filename, component, options):
-        with problem_pyfile(py_filename, component) as pyf:
-            if options["--dry-run"]:
-                with open(pyf, "r") as pbf:
-                    print(pbf.read())
-                    sys.exit()
-            self.push_mda_cmd(pyf, options)
+        from whatsopt.push_utils import component_problem
+
+        options["--component"] = component
+        self._push_cached_attrs(py_filename, options)
+        try:
+            problem = component_problem(py_filename, component)
+        except ValueError as err:
+            error(str(err))
+            sys.exit(-1)
+        options["--pyfilename"] = py_filename
+        self.push_mda(problem, options)
+        sys.exit()
+
+    def push_watch_cmd(self, py_filename, options, component=None):
+        """Push analysis of given problem file (or component) again each time it changes"""
+        from whatsopt.watch_utils import watch
+
+        depth = options["--depth"]
+        if component:
+            from whatsopt.push_utils import component_problem
+
+            def discover():
+                problem = component_problem(py_filename, component)
+                return self.get_push_attrs(
+                    problem, dict(options, **{"--pyfilename": py_filename})
+                )
+
+        else:
+            discover_options = dict(options, **{"--depth": [depth], "--no-cache": True})
+
+            def discover():
+                analyses = self.discover_mdas(py_filename, discover_options)
+                if not analyses:
+                    name = options["--name"]
+                    raise ValueError(
+                        f"Analysis {name} not found" if name else "Analysis not found"
+                    )
+                return analyses[0][1][depth]
+
+        watch(py_filename, discover, lambda attrs: self.push_mda_attrs(attrs, options))
+
+    def _push_cached_attrs(self, py_filename, options):
+        # push analysis attributes cached for given problem file and exit if any
+        from whatsopt.cache_utils import attrs_cache_key, load_cached_attrs
+
+        if not options.get("--no-cache"):
+            options["--cache-key"] = attrs_cache_key(py_filename, options)
+            mda_attrs = load_cached_attrs(ATTRS_CACHE_DIRNAME, options["--cache-key"])
+            if mda_attrs is not None:
+                # unchanged problem: no need to instantiate it
+                if not options["--dry-run"]:
+                    info("Analysis %s retrieved from cache" % mda_attrs["name"])
+                    log("  (use --no-cache option to discover it again)")
+                self.push_mda_attrs(mda_attrs, options)
+                sys.exit()
 
     def push_mda_cmd(self, py_filename, options):
+        self._push_cached_attrs(py_filename, options)
+
+        import openmdao.utils.hooks as hooks
+        from openmdao.utils.file_utils import _load_and_exec
+
         def push_mda(prob):
             name = options["--name"]
             pbname = prob.model.__class__.__name__
@@ -387,12 +682,8 @@ class WhatsOpt:
                 # do not exit seeking for another problem (ie analysis)
             else:
                 options["--pyfilename"] = py_filename
-                xdsm = self.push_mda(prob, options)
-                if options.get("--xdsm"):  # show command
-                    # required to interrupt pb execution
-                    raise AnalysisPushedException(xdsm=xdsm)
-                else:
-                    sys.exit()
+                self.push_mda(prob, options)
+                sys.exit()
 
         hooks.use_hooks = True
         hooks._register_hook("final_setup", "Problem", post=push_mda)
@@ -400,6 +691,11 @@ class WhatsOpt:
         return push_mda
 
     def push_mda(self, problem, options):
+        return self.push_mda_attrs(self.get_push_attrs(problem, options), options)
+
+    def get_push_attrs(self, problem, options):
+        from whatsopt.push_command import PushCommand
+
         scalar = options.get("--scalar")
         depth = options.get("--depth")
         push_cmd = PushCommand(problem, depth, scalar)
@@ -407,29 +703,83 @@ class WhatsOpt:
         mda_attrs = push_cmd.get_mda_attributes(
             problem.model, push_cmd.tree, use_depth=True
         )
+        if mda_attrs is None:  # not the MPI root process
+            return None
+        _set_mda_name(mda_attrs, options.get("--pyfilename"))
 
-        if mda_attrs["name"] == "Group" and options.get("--pyfilename"):
-            mda_attrs["name"] = os.path.splitext(
-                to_camelcase(os.path.basename(options.get("--pyfilename")))
-            )[0]
+        if options.get("--cache-key"):
+            from whatsopt.cache_utils import local_module_files, save_cached_attrs
 
+            save_cached_attrs(
+                ATTRS_CACHE_DIRNAME,
+                options["--cache-key"],
+                mda_attrs,
+                local_module_files(),
+            )
+        return mda_attrs
+
+    def push_mda_attrs(self, mda_attrs, options):
+        if mda_attrs is None or not is_mpi_root():
+            return None  # under MPI, analysis is pushed by the root process
+        if options.get("--update"):
+            return self.push_mda_update(options["--update"], mda_attrs, options)
         if options["--dry-run"]:
-            log(json.dumps(mda_attrs, indent=2))
+            _dump_json(mda_attrs, options)
         else:
-            suffix = ""
-            if options.get("--xdsm"):
-                suffix = ".xdsm"
-            url = self.endpoint("/api/v1/analyses{}".format(suffix))
+            url = self.endpoint("/api/v1/analyses")
             resp = self.session.post(
                 url, headers=self.headers, json={"analysis": mda_attrs}
             )
             WhatsOpt.check_http_error(resp)
             log("Analysis %s pushed" % mda_attrs["name"])
+            self._invalidate_index()
             return resp.json()
 
-    def push_json(self, filename):
-        with open(filename, "rb") as f:
-            attrs = json.load(f)
+    def push_mda_update(self, mda_id, mda_attrs, options):
+        """Push only changes of given analysis attributes against analysis #mda_id on server"""
+        from whatsopt.push_utils import diff_mda_attrs, new_diff_stats
+
+        url = self.endpoint(f"/api/v1/analyses/{mda_id}.wopjson")
+        resp = self.session.get(url, headers=self.headers)
+        WhatsOpt.check_http_error(resp)
+        stats = new_diff_stats()
+        try:
+            diff = diff_mda_attrs(mda_attrs, resp.json(), stats)
+        except ValueError as err:  # export without records ids (older WhatsOpt server)
+            error(f"Analysis #{mda_id} can not be updated: {err}")
+            info("Push the whole analysis (without --update) instead")
+            sys.exit(-1)
+        if diff is None:
+            info(f"Analysis #{mda_id} unchanged, nothing to push")
+            return None
+        summary = ", ".join(
+            f"{count} {kind if count > 1 else kind[:-1]} {change}"
+            for kind, counts in stats.items()
+            for change, count in counts.items()
+            if count
+        )
+        if options["--dry-run"]:
+            _dump_json(diff, options)
+            info(f"Analysis #{mda_id} changes: {summary}")
+            return None
+        url = self.endpoint(f"/api/v1/analyses/{mda_id}")
+        resp = self.session.patch(url, headers=self.headers, json={"analysis": diff})
+        WhatsOpt.check_http_error(resp)
+        log(f"Analysis #{mda_id} updated ({summary})")
+        self._invalidate_index()
+        return resp.json()
+
+    def push_json(self, filename, options={}):
+        from whatsopt.json_utils import load_json
+
+        if not is_mpi_root():
+            return None  # under MPI, json is pushed by the root process
+        attrs = load_json(filename)
+        if options.get("--update"):
+            if "analyses_attributes" in attrs:
+                error("Project json can not be pushed as an analysis update")
+                sys.exit(-1)
+            return self.push_mda_update(options["--update"], attrs, options)
         if "analyses_attributes" in attrs:  # project detection
             url = self.endpoint("/api/v1/design_projects")
             key = "Project"
@@ -441,11 +791,23 @@ class WhatsOpt:
         resp = self.session.post(url, headers=self.headers, json=params)
         WhatsOpt.check_http_error(resp)
         log("{} {} pushed".format(key, attrs["name"]))
+        self._invalidate_index()
+
+    def _invalidate_index(self):
+        # analyses list has changed on remote
+        with closing(open_index(INDEX_FILENAME)) as conn:
+            invalidate_index(conn, self.url)
 
     def pull_mda(self, mda_id, options={}, msg=None, info_keep_run_ops=True):
         if not msg:
             msg = "Analysis %s pulled" % mda_id
 
+        framework, tempdir, filenames = self._download_mda_code(mda_id, options)
+        self._install_mda_code(
+            mda_id, framework, tempdir, filenames, options, msg, info_keep_run_ops
+        )
+
+    def _download_mda_code(self, mda_id, options):
         framework = FRAMEWORK_OPENMDAO
         if options.get("--gemseo"):
             framework = FRAMEWORK_GEMSEO
@@ -494,6 +856,12 @@ class WhatsOpt:
         zipf.extractall(tempdir)
         filenames = zipf.namelist()
         zipf.close()
+        os.remove(name)
+        return framework, tempdir, filenames
+
+    def _install_mda_code(
+        self, mda_id, framework, tempdir, filenames, options, msg, info_keep_run_ops
+    ):
         file_to_move = {}
         if options.get("--dry-run"):
             # cmd = "Pull"
@@ -516,12 +884,21 @@ class WhatsOpt:
         else:
             mda_name = ""
 
+        previous_manifest = get_files_manifest()
+        generated = {}
+        added, changed, unchanged = [], [], []
         for f in filenames:
             file_to = f
             file_to_move[file_to] = True
+            generated[f] = file_hash(os.path.join(tempdir, f))
             if os.path.exists(file_to):
-                if options.get("--force"):
+                if file_hash(file_to) == generated[f]:
+                    # same content: leave the file untouched
+                    file_to_move[file_to] = False
+                    unchanged.append(file_to)
+                elif options.get("--force"):
                     log(f"Update {file_to}")
+                    changed.append(file_to)
                     if options.get("--dry-run"):
                         file_to_move[file_to] = False
                     else:
@@ -543,6 +920,7 @@ class WhatsOpt:
                         else:
                             continue
                     log(f"Update {file_to}")
+                    changed.append(file_to)
                     if not options.get("--dry-run"):
                         os.remove(file_to)
                 else:
@@ -553,6 +931,7 @@ class WhatsOpt:
             else:
                 if options.get("--force"):
                     log(f"Pull {file_to}")
+                    added.append(file_to)
                     if options.get("--dry-run"):
                         file_to_move[file_to] = False
                 elif options.get("--update") and (
@@ -563,7 +942,38 @@ class WhatsOpt:
                     file_to_move[file_to] = False
                 else:
                     log(f"Pull {file_to}")
-
+                    added.append(file_to)
+
+        # generated files which are not part of the analysis code anymore
+        removed = []
+        for f, recorded in previous_manifest.items():
+            if f in generated or not os.path.exists(f):
+                continue
+            if (
+                (options.get("--update") or options.get("--force"))
+                and not is_user_file(f)
+                and file_hash(f) == recorded
+            ):
+                log(f"Remove {f}")
+                removed.append(f)
+                if not options.get("--dry-run"):
+                    os.remove(f)
+            else:
+                info(f"Keep {f} (not generated anymore)")
+
+        # record generated content hash only for files holding it, kept files
+        # (user modified, in the way) retain their previously recorded hash if any
+        manifest = {}
+        for f, digest in generated.items():
+            if file_to_move[f] or f in unchanged:
+                manifest[f] = digest
+            elif f in previous_manifest:
+                manifest[f] = previous_manifest[f]
+
+        log(
+            f"{len(added)} added, {len(changed)} changed, {len(removed)} removed "
+            f"({len(unchanged)} unchanged)"
+        )
         if not options.get("--dry-run"):
             move_files(file_to_move, tempdir)
             state = {
@@ -571,21 +981,157 @@ class WhatsOpt:
                 "analysis_id": mda_id,
                 "framework": framework,
                 "pull_mode": MODE_PACKAGE if options.get("--package") else MODE_PLAIN,
+                "files": manifest,
             }
             save_state(state)
             info(msg)
+        return added, changed, removed
+
+    def pull_project(self, project_id, options={}, jobs=4):
+        from tabulate import tabulate
+        from whatsopt.push_utils import to_snakecase
+
+        mdas = self._get_project_analyses(project_id)
+        if not mdas:
+            info(f"No analysis found in project #{project_id}")
+            return
+
+        dirnames = {}
+        for mda in mdas:
+            dirname = to_snakecase(mda["name"])
+            if dirname in dirnames.values():
+                dirname += f"_{mda['id']}"
+            dirnames[mda["id"]] = dirname
+
+        info(f"Pull {len(mdas)} analyses of project #{project_id}...")
+        downloads = {}
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = {
+                mda["id"]: executor.submit(self._download_mda_code, mda["id"], options)
+                for mda in mdas
+            }
+            for mda_id, future in futures.items():
+                try:
+                    downloads[mda_id] = future.result()
+                except SystemExit:  # http error already reported
+                    downloads[mda_id] = None
+
+        # files are installed sequentially as it is done relatively to the current directory
+        headers = ["id", "name", "directory", "status"]
+        data = []
+        cwd = os.getcwd()
+        for mda in mdas:
+            mda_id, dirname = mda["id"], dirnames[mda["id"]]
+            if downloads[mda_id] is None:
+                data.append([mda_id, mda["name"], dirname, "failed"])
+                continue
+            log("")
+            info(f"Analysis #{mda_id} ({mda['name']}) in {dirname}/")
+            framework, tempdir, filenames = downloads[mda_id]
+            with tempfile.TemporaryDirectory(suffix="wop") as emptydir:
+                workdir = dirname
+                if not os.path.exists(dirname):
+                    if options.get("--dry-run"):
+                        # list actions as if pulled in an empty directory
+                        workdir = emptydir
+                    else:
+                        os.makedirs(dirname)
+                try:
+                    os.chdir(workdir)
+                    added, changed, removed = self._install_mda_code(
+                        mda_id,
+                        framework,
+                        tempdir,
+                        filenames,
+                        options,
+                        f"Analysis #{mda_id} pulled",
+                        True,
+                    )
+                finally:
+                    os.chdir(cwd)
+            status = (
+                f"{len(added)} added, {len(changed)} changed, {len(removed)} removed"
+            )
+            data.append([mda_id, mda["name"], dirname, status])
+        log("")
+        info(f"Project #{project_id} pull report")
+        log(tabulate(data, headers))
+        log("")
 
-    def pull_mda_json(self, mda_id):
-        url = self.endpoint(f"/api/v1/analyses/{mda_id}.wopjson")
-        resp = self.session.get(url, headers=self.headers, stream=True)
+    def _get_project_analyses(self, project_id):
+        # analyses listed for the project: checked on their project id as the filter
+        # is ignored by older servers, which do not list project ids either
+        url = self.endpoint("/api/v1/analyses")
+        resp = self.session.get(
+            url, headers=self.headers, params={"design_project_id": project_id}
+        )
+        WhatsOpt.check_http_error(resp)
+        listed = resp.json()
+        if listed and all(_project_ref(mda) is not None for mda in listed):
+            return [mda for mda in listed if _project_ref(mda) == int(project_id)]
+        return self._get_exported_project_analyses(project_id)
+
+    def _get_exported_project_analyses(self, project_id):
+        # get project name and analyses from the project export, then the analyses
+        # listed for this project name (matched as a substring by the server, hence
+        # the check on project membership: analyses ids when exported, project id
+        # when listed, analyses names otherwise)
+        url = self.endpoint(f"/api/v1/design_projects/{project_id}.wopjson")
+        resp = self.session.get(url, headers=self.headers)
         WhatsOpt.check_http_error(resp)
-        print(json.dumps(resp.json()))
+        project = resp.json()
+        exported = project.get("analyses_attributes", [])
+        ids = {mda["id"] for mda in exported if mda.get("id") is not None}
+        names = {mda["name"] for mda in exported}
+        url = self.endpoint("/api/v1/analyses")
+        resp = self.session.get(
+            url,
+            headers=self.headers,
+            params={"design_project_query": project["name"]},
+        )
+        WhatsOpt.check_http_error(resp)
+        mdas = []
+        for mda in resp.json():
+            if ids:
+                if mda["id"] in ids:
+                    mdas.append(mda)
+            elif mda["name"] in names and _project_ref(mda) in (
+                None,
+                int(project_id),
+            ):
+                mdas.append(mda)
+        if not ids:
+            # same-named analyses of other projects can not be told apart
+            counts = Counter(mda["name"] for mda in mdas if _project_ref(mda) is None)
+            ambiguous = [name for name, count in counts.items() if count > 1]
+            for name in sorted(ambiguous):
+                warn(f"Several analyses named {name} found: skipped")
+                log("  (use 'wop pull <id>' to pull the one of the project)")
+            mdas = [mda for mda in mdas if mda["name"] not in ambiguous]
+        return mdas
+
+    def pull_mda_json(self, mda_id, output=None, pretty=False, compress=False):
+        url = self.endpoint(f"/api/v1/analyses/{mda_id}.wopjson")
+        self._stream_json(url, output, pretty, compress)
 
-    def pull_project_json(self, project_id):
+    def pull_project_json(self, project_id, output=None, pretty=False, compress=False):
         url = self.endpoint(f"/api/v1/design_projects/{project_id}.wopjson")
+        self._stream_json(url, output, pretty, compress)
+
+    def _stream_json(self, url, output=None, pretty=False, compress=False):
         resp = self.session.get(url, headers=self.headers, stream=True)
-        WhatsOpt.check_http_error(resp)
-        print(json.dumps(resp.json()))
+        if not resp.ok:
+            # only parse the response content in case of error
+            WhatsOpt.check_http_error(resp)
+        compress = compress or bool(output and output.endswith(".gz"))
+        with open_output(output, compress) as out:
+            write_json_chunks(
+                resp.iter_content(chunk_size=65536), out, indent=2 if pretty else None
+            )
+            if not output:
+                out.write(b"\n")
+        if output:
+            log(f"Json data written in {output}")
 
     def update_mda(self, analysis_id=None, options={}, info_keep_run_ops=True):
         mda_id = analysis_id or get_analysis_id()
@@ -631,47 +1177,201 @@ class WhatsOpt:
             mda_id, opts, "Analysis #{} updated".format(mda_id), info_keep_run_ops
         )
 
-    def show_mda(self, analysis_id, pbfile, name, outfile, batch, depth):
-        options = {
-            "--xdsm": True,
-            "--name": name,
-            "--dry-run": False,
-            "--depth": depth,
-        }
-        xdsm = None
+    def discover_mdas(self, py_filename, options):
+        """
+        Discover analysis of the first problem (with --name model class if given) set up
+        by given python file, or of every problem with --all-problems option, each one
+        cut at every depth of --depth list. The file is executed only once, problems
+        being set up but not run. Returns a list of (analysis name, {depth: attributes}).
+        """
+        from whatsopt.cache_utils import (
+            attrs_cache_key,
+            load_cached_attrs,
+            local_module_files,
+            save_cached_attrs,
+        )
+
+        key = None
+        if not options.get("--no-cache"):
+            key = attrs_cache_key(py_filename, options)
+            cached = load_cached_attrs(ATTRS_CACHE_DIRNAME, key)
+            if cached is not None:
+                info("Analyses retrieved from cache")
+                log("  (use --no-cache option to discover them again)")
+                return [(name, dict(attrs_by_depth)) for name, attrs_by_depth in cached]
+
+        import openmdao.utils.hooks as hooks
+        from openmdao.utils.file_utils import _load_and_exec
+        from whatsopt.push_command import PushCommand
+        from whatsopt.push_utils import problems_not_run
+
+        analyses = []
+        discovered = weakref.WeakSet()  # final_setup is called at each run
+
+        def discover_mda(prob):
+            if prob in discovered:
+                return
+            discovered.add(prob)
+            name = options["--name"]
+            pbname = prob.model.__class__.__name__
+            if name and pbname != name:
+                info("Analysis %s skipped" % pbname)
+                return
+            push_cmd = PushCommand(prob, 0, options.get("--scalar"))
+            attrs_by_depth = push_cmd.get_mda_attributes_by_depth(
+                prob.model, push_cmd.tree, options["--depth"]
+            )
+            if attrs_by_depth is not None:  # None when not the MPI root process
+                for mda_attrs in attrs_by_depth.values():
+                    _set_mda_name(mda_attrs, py_filename)
+                analyses.append((mda_attrs["name"], attrs_by_depth))
+            if not options.get("--all-problems"):
+                raise _AnalysesDiscovered()
+
+        hooks.use_hooks = True
+        hooks._register_hook("final_setup", "Problem", post=discover_mda)
+        try:
+            with problems_not_run():
+                _load_and_exec(py_filename, [])
+        except _AnalysesDiscovered:
+            pass
+        except (Exception, SystemExit) as err:
+            if not analyses:
+                raise
+            # script may rely on results of problems which are not run
+            warn(f"{py_filename} execution stopped ({type(err).__name__}: {err})")
+
+        if key and is_mpi_root():
+            cached = [[name, list(attrs.items())] for name, attrs in analyses]
+            save_cached_attrs(ATTRS_CACHE_DIRNAME, key, cached, local_module_files())
+        return analyses
+
+    def show_mda(
+        self,
+        analysis_id,
+        pbfile,
+        name,
+        outfile,
+        batch,
+        depths,
+        no_cache=False,
+        all_problems=False,
+        site=None,
+        project_id=None,
+        jobs=4,
+        watch=False,
+    ):
+        from openmdao.utils.webview import webview
+
         if pbfile:
-            start = time.time()
-            try:
-                info("XDSM info retrieval...")
-                self.push_mda_cmd(pbfile, options)
-            except AnalysisPushedException as pushed:
-                xdsm = pushed.xdsm
-            end = time.time()
-            log("Retrieved in {:.2f}s".format(end - start))
-            source = os.path.basename(pbfile)
+            options = {
+                "--name": name,
+                "--depth": list(dict.fromkeys(depths)),
+                "--no-cache": no_cache or watch,
+                "--xdsm": True,
+                "--all-problems": all_problems,
+            }
+            site_title = os.path.basename(pbfile)
+            if watch:
+                from whatsopt.watch_utils import watch as watch_file
+
+                outfiles = []
+
+                def update(analyses):
+                    pages = _xdsm_pages(pbfile, analyses, outfile, site)
+                    opened = bool(outfiles)
+                    outfiles[:] = self._write_xdsm_pages(pages, site, site_title, jobs)
+                    if not batch and not opened:
+                        webview(outfiles[0])
+
+                watch_file(pbfile, lambda: self._discover_xdsm(pbfile, options), update)
+                return
+            pages = _xdsm_pages(
+                pbfile, self._discover_xdsm(pbfile, options), outfile, site
+            )
         else:
-            mda_id = analysis_id or get_analysis_id()
-            if mda_id is None:
-                error(
-                    "Unknown analysis with id={} (maybe use wop pull <analysis-id>)".format(
-                        mda_id
+            from whatsopt.push_utils import to_snakecase
+
+            if project_id:
+                mdas = self._get_project_analyses(project_id)
+                if not mdas:
+                    info(f"No analysis found in project #{project_id}")
+                    return
+                site_title = f"Project #{project_id}"
+            else:
+                mda_id = analysis_id or get_analysis_id()
+                if mda_id is None:
+                    error(
+                        "Unknown analysis with id={} (maybe use wop pull <analysis-id>)".format(
+                            mda_id
+                        )
                     )
+                    sys.exit(-1)
+                mdas = [{"id": mda_id, "name": f"Analysis #{mda_id}"}]
+                site_title = mdas[0]["name"]
+            pages = []  # filename, title, source, xdsm (or function fetching it)
+            for mda in mdas:
+                filename = outfile
+                if site:
+                    filename = f"{mda['id']}_{to_snakecase(mda['name'])}.html"
+                pages.append(
+                    {
+                        "filename": filename,
+                        "title": mda["name"],
+                        "source": f"{mda['id']}@{self._url}",
+                        "xdsm": functools.partial(self._get_xdsm, mda["id"]),
+                    }
                 )
-                sys.exit(-1)
-            url = self.endpoint("/api/v1/analyses/{}.xdsm".format(mda_id))
-            resp = self.session.get(url, headers=self.headers)
-            WhatsOpt.check_http_error(resp)
-            xdsm = resp.json()
-            source = f"{mda_id}@{self._url}"
 
-        info("XDSM building...")
-        generate_xdsm_html(source, xdsm, outfile)
-        if pbfile:
-            log("XDSM of analysis from {} generated in {}".format(pbfile, outfile))
-        else:
-            log("XDSM of analysis {} generated in {}".format(mda_id, outfile))
+        outfiles = self._write_xdsm_pages(pages, site, site_title, jobs)
         if not batch:
-            webview(outfile)
+            webview(outfiles[0])
+
+    def _discover_xdsm(self, pbfile, options):
+        start = time.time()
+        info("XDSM info retrieval...")
+        analyses = self.discover_mdas(pbfile, options)
+        end = time.time()
+        log("Retrieved in {:.2f}s".format(end - start))
+        if not is_mpi_root():
+            sys.exit()  # XDSMs are generated by MPI root process
+        if not analyses:
+            name = options["--name"]
+            error("Analysis %s not found" % name if name else "Analysis not found")
+            sys.exit(-1)
+        return analyses
+
+    def _write_xdsm_pages(self, pages, site, site_title, jobs):
+        from whatsopt.show_utils import (
+            INDEX_FILENAME,
+            generate_xdsm_html,
+            generate_xdsm_site,
+        )
+
+        info("XDSM building...")
+        if site:
+            results = generate_xdsm_site(site, pages, site_title, jobs)
+            for page, err in results:
+                if err:
+                    error(f"XDSM of {page['title']} not generated: {err}")
+            log(f"{len(pages)} XDSM pages generated in {site}/")
+            if any(err for _, err in results):
+                sys.exit(-1)
+            return [os.path.join(site, INDEX_FILENAME)]
+
+        outfiles = []
+        for page in pages:
+            xdsm = page["xdsm"]() if callable(page["xdsm"]) else page["xdsm"]
+            generate_xdsm_html(page["source"], xdsm, page["filename"])
+            log("XDSM of {} generated in {}".format(page["title"], page["filename"]))
+            outfiles.append(page["filename"])
+        return outfiles
+
+    def _get_xdsm(self, mda_id):
+        url = self.endpoint("/api/v1/analyses/{}.xdsm".format(mda_id))
+        resp = self.session.get(url, headers=self.headers)
+        WhatsOpt.check_http_error(resp)
+        return resp.json()
 
     def upload(
         self,
@@ -685,6 +1385,13 @@ class WhatsOpt:
         parallel=False,
     ):
         from socket import gethostname
+        import numpy as np
+        from whatsopt.upload_utils import (
+            load_from_csv,
+            load_from_sqlite,
+            load_from_hdf5,
+            print_cases,
+        )
 
         mda_id = get_analysis_id() if not analysis_id else analysis_id
         # Test sqlite files generated with MPI
@@ -765,6 +1472,19 @@ class WhatsOpt:
             log(f"attached to analysis #{mda_id}")
 
     def upload_vars_init_cmd(self, py_filename, options):
+        import openmdao.utils.hooks as hooks
+        from openmdao.utils.file_utils import _load_and_exec
+        from whatsopt.upload_utils import load_vars_init
+
+        values = load_vars_init(py_filename)
+        if values is not None:
+            parameters = self._get_init_parameters(py_filename, values, options)
+            if parameters is not None:
+                self.upload_parameters(parameters, options)
+                sys.exit()
+
+        # initialize() needs the analysis problem or does not set all design variables:
+        # get values (defaults included) once run_mda.py set the problem up
         def upload_vars_init(prob):
             self.upload_vars_init(prob, options)
             sys.exit()
@@ -777,26 +1497,93 @@ class WhatsOpt:
         hooks._register_hook("final_setup", "Problem", post=upload_vars_init)
         _load_and_exec(run_mda_filename, [])
 
+    def _get_init_parameters(self, py_filename, values, options):
+        """
+        Parameters uploaded for design variables given values set by initialize(),
+        variables left unset taking their default value. Returns None when a default
+        value is unknown (problem has to be set up).
+        """
+        import numpy as np
+        from whatsopt.upload_utils import format_init_value, load_design_vars
+
+        dirname = os.path.dirname(os.path.abspath(py_filename))
+        design_vars = load_design_vars(dirname)
+        if design_vars is None:
+            if options["--dry-run"]:
+                # remote server not contacted: values as set by initialize()
+                return [
+                    {"varname": name, "value": format_init_value(value)}
+                    for name, value in values.items()
+                ]
+            design_vars = dict.fromkeys(self._get_design_var_names(options))
+        unset = [
+            name
+            for name, default in design_vars.items()
+            if name not in values and default is None
+        ]
+        if unset:
+            debug(f"Design variables not set by initialize: {', '.join(unset)}")
+            return None
+        parameters = []
+        for name, default in design_vars.items():
+            value = values.get(name, default)
+            shape = None if default is None else np.shape(np.atleast_1d(default))
+            try:
+                value = format_init_value(value, shape)
+            except (TypeError, ValueError):  # not numeric, let the problem convert it
+                return None
+            parameters.append({"varname": name, "value": value})
+        return parameters
+
+    def _get_design_var_names(self, options):
+        """Names of variables set by the driver of the analysis on the remote server"""
+        from whatsopt.push_command import DRIVER_NAME
+
+        mda_id = self._get_upload_analysis_id(options)
+        url = self.endpoint(f"/api/v1/analyses/{mda_id}.wopjson")
+        resp = self.session.get(url, headers=self.headers)
+        WhatsOpt.check_http_error(resp)
+        return [
+            var["name"]
+            for disc in resp.json()["disciplines_attributes"]
+            if disc["name"] == DRIVER_NAME
+            for var in disc.get("variables_attributes", [])
+            if var["io_mode"] == "out"
+        ]
+
     def upload_vars_init(self, problem, options):
-        mda_id = get_analysis_id() if get_analysis_id() else options["--analysis-id"]
-        if mda_id is None:
-            error("Unknown analysis with id={}".format(mda_id))
-            sys.exit(-1)
+        from openmdao.api import IndepVarComp
+        from whatsopt.push_utils import OPENMDAO_PRE_3_39, get_indep_var_names
+        from whatsopt.upload_utils import format_init_value
+
         parameters = []
-        headers = ["variable", "init value"]
-        data = []
+        indep_var_names = get_indep_var_names(problem)
         for s in problem.model._subsystems_myproc:
             if isinstance(s, IndepVarComp):
                 for absname in s._var_abs2meta["output"]:
-                    name = find_indep_var_name(problem, absname)
+                    name = indep_var_names.get(absname)
                     value = None
-                    if Version(OPENMDAO_VERSION) < Version("3.39"):
+                    if OPENMDAO_PRE_3_39:
                         value = s._outputs._views[absname][0]
                     else:
                         value = s._outputs.get_val(absname, flat=False)
-                    if isinstance(value, np.ndarray):
-                        value = str(value.tolist())
+                    value = format_init_value(value)
                     parameters.append({"varname": name, "value": value})
+        self.upload_parameters(parameters, options)
+
+    @staticmethod
+    def _get_upload_analysis_id(options):
+        mda_id = get_analysis_id() if get_analysis_id() else options["--analysis-id"]
+        if mda_id is None:
+            error("Unknown analysis with id={}".format(mda_id))
+            sys.exit(-1)
+        return mda_id
+
+    def upload_parameters(self, parameters, options):
+        from tabulate import tabulate
+
+        mda_id = self._get_upload_analysis_id(options)
+        headers = ["variable", "init value"]
         data = [[p["varname"], p["value"]] for p in parameters]
         params = {"parameterization": {"parameters": parameters}}
         log(tabulate(data, headers))
@@ -851,6 +1638,8 @@ class WhatsOpt:
 
     @staticmethod
     def convert(filename):
+        from whatsopt.convert_utils import convert_sqlite_to_csv
+
         if not os.path.exists(filename):
             error(f"File {filename} not found.")
         pathname, extension = os.path.splitext(filename)
@@ -877,10 +1666,15 @@ class WhatsOpt:
 
     def _test_connection(self):
         if self.api_key:
+            import requests
+
             self.headers = {
                 "Authorization": "Token token=" + self.api_key,
                 "User-Agent": "wop/{}".format(__version__),
             }
+            key = (self.url, self.api_key)
+            if time.time() - WhatsOpt._connections.get(key, 0) < CONNECTION_MAX_AGE:
+                return True
             url = self.endpoint("/api/v1/versioning")
             debug(f"Test connect: {url}, {self.api_key}")
             try:
@@ -889,6 +1683,8 @@ class WhatsOpt:
                 if resp.status_code == requests.codes.forbidden:
                     error(resp.json()["message"])
                     sys.exit(-1)
+                if resp.ok:
+                    WhatsOpt._connections[key] = time.time()
                 return resp.ok
             except requests.exceptions.ConnectionError:
                 return False
@@ -897,9 +1693,13 @@ class WhatsOpt:
 
     @staticmethod
     def check_http_error(resp):
+        import requests
+
         msg = None
         try:
-            msg = resp.json().get("message")
+            data = resp.json()
+            if isinstance(data, dict):  # analyses listings are json lists
+                msg = data.get("message")
         except requests.exceptions.JSONDecodeError:
             pass  # Does not contain json => ignore
         if msg:
@@ -909,3 +1709,68 @@ class WhatsOpt:
         except requests.exceptions.HTTPError as http_err:
             error(f"HTTP Error : {http_err}")
             exit(-1)
+
+
+def _dump_json(attrs, options):
+    # dry run output: attributes displayed or written incrementally in --output file
+    output = options.get("--output")
+    if output:
+        compress = options.get("--gzip") or output.endswith(".gz")
+        with open_output(output, compress) as out:
+            write_json(attrs, out, indent=2, compact=options.get("--compact"))
+        log("Push data written in {}".format(output))
+    elif options.get("--compact"):
+        log(json.dumps(attrs, separators=(",", ":")))
+    else:
+        log(json.dumps(attrs, indent=2))
+
+
+def _project_ref(mda):
+    # project id of a listed analysis, if provided by the server
+    ref = mda.get("design_project")
+    ref = ref.get("id") if isinstance(ref, dict) else None
+    return mda.get("design_project_id", ref)
+
+
+def _xdsm_pages(pbfile, analyses, outfile, site):
+    # XDSM pages of analyses discovered in problem file (see WhatsOpt.discover_mdas),
+    # output file being suffixed by analysis name and/or depth when several
+    from whatsopt.push_utils import to_snakecase
+    from whatsopt.show_utils import generate_xdsm
+
+    pages = []
+    source = os.path.basename(pbfile)
+    names = [mda_name for mda_name, _ in analyses]
+    for i, (mda_name, attrs_by_depth) in enumerate(analyses):
+        suffix = ""
+        if len(analyses) > 1 or site:
+            suffix = "_" + mda_name
+            if names.count(mda_name) > 1:
+                suffix += str(i)
+        for depth, mda_attrs in attrs_by_depth.items():
+            filename = outfile
+            depth_suffix = f"_d{depth}" if len(attrs_by_depth) > 1 else ""
+            if site:
+                filename = to_snakecase(suffix[1:] + depth_suffix) + ".html"
+            elif suffix or depth_suffix:
+                base, ext = os.path.splitext(outfile)
+                filename = base + suffix + depth_suffix + ext
+            pages.append(
+                {
+                    "filename": filename,
+                    "title": f"{mda_name} (depth={depth})",
+                    "source": source,
+                    "xdsm": generate_xdsm(mda_attrs),
+                }
+            )
+    return pages
+
+
+def _set_mda_name(mda_attrs, py_filename):
+    # analysis of a plain Group model is named after the problem file
+    from whatsopt.push_utils import to_camelcase
+
+    if mda_attrs["name"] == "Group" and py_filename:
+        mda_attrs["name"] = os.path.splitext(
+            to_camelcase(os.path.basename(py_filename))
+        )[0]
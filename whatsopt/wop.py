@@ -1,7 +1,9 @@
+import os
+import sys
 import click
 from whatsopt import __version__
-from whatsopt.utils import get_analysis_id
-from .whatsopt_client import WhatsOpt, EXTRANET_SERVER_URL
+from whatsopt.utils import get_analysis_id, is_mpi_root
+from .whatsopt_client import WhatsOpt, EXTRANET_SERVER_URL, PROBE_TIMEOUT
 from logging import error
 
 DEFAULT_PUSH_DEPTH = 2
@@ -58,6 +60,17 @@ def logout(list, all, remote):
     WhatsOpt().logout(list, all, remote)
 
 
+def _date_option(ctx, param, value):
+    from whatsopt.index_utils import normalize_date
+
+    if value is None:
+        return None
+    try:
+        return normalize_date(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err), ctx, param)
+
+
 @wop.command()
 @click.option(
     "-a", "--all", is_flag=True, default=False, help="list all analyses available"
@@ -68,6 +81,50 @@ def logout(list, all, remote):
     type=str,
     help="list all analyses available whose project name matches the given substring",
 )
+@click.option(
+    "-n",
+    "--name",
+    type=str,
+    help="list analyses whose name matches the given substring",
+)
+@click.option(
+    "-e",
+    "--regex",
+    type=str,
+    help="list analyses whose name matches the given regular expression",
+)
+@click.option(
+    "--since",
+    type=str,
+    callback=_date_option,
+    help="list analyses created since the given date (YYYY-MM-DD)",
+)
+@click.option(
+    "--until",
+    type=str,
+    callback=_date_option,
+    help="list analyses created until the given date included (YYYY-MM-DD)",
+)
+@click.option("--page", type=click.IntRange(min=1), help="display only the given page")
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=50,
+    help="number of analyses per page (default is 50)",
+)
+@click.option(
+    "-o",
+    "--offline",
+    is_flag=True,
+    default=False,
+    help="list analyses from local index without connecting to the remote server",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="force local index refresh from the remote server",
+)
 @click.option(
     "-r",
     "--remotes",
@@ -75,20 +132,76 @@ def logout(list, all, remote):
     default=False,
     help="list all known remote servers",
 )
+@click.option(
+    "-A",
+    "--all-remotes",
+    is_flag=True,
+    default=False,
+    help="list all known remote servers with their connection status",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=PROBE_TIMEOUT,
+    help=f"max time in seconds to probe a remote server (default is {PROBE_TIMEOUT})",
+)
 @click.pass_context
-def list(ctx, all, project_query, remotes):
+def list(
+    ctx,
+    all,
+    project_query,
+    name,
+    regex,
+    since,
+    until,
+    page,
+    page_size,
+    offline,
+    refresh,
+    remotes,
+    all_remotes,
+    timeout,
+):
     """List analyses owned by the user."""
-    if remotes:
+    options = {
+        "--name": name,
+        "--regex": regex,
+        "--since": since,
+        "--until": until,
+        "--page": page,
+        "--page-size": page_size,
+        "--offline": offline,
+        "--refresh": refresh,
+    }
+    if all_remotes:
+        WhatsOpt.probe_remotes(timeout)
+    elif remotes:
         WhatsOpt.list_remotes()
     else:
-        WhatsOpt(**ctx.obj).login().list_analyses(all, project_query)
+        WhatsOpt(**ctx.obj).list_analyses(all, project_query, options)
 
 
 @wop.command()
+@click.option(
+    "-A",
+    "--all-remotes",
+    is_flag=True,
+    default=False,
+    help="check connection and current pulled analysis on all known remote servers",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=PROBE_TIMEOUT,
+    help=f"max time in seconds to probe a remote server (default is {PROBE_TIMEOUT})",
+)
 @click.pass_context
-def status(ctx):
+def status(ctx, all_remotes, timeout):
     """List server connection and current pulled analysis status."""
-    WhatsOpt(**ctx.obj).get_status()
+    if all_remotes:
+        WhatsOpt.probe_remotes(timeout)
+    else:
+        WhatsOpt(**ctx.obj).get_status()
 
 
 @wop.command()
@@ -120,25 +233,97 @@ def status(ctx):
     "--json",
     is_flag=True,
     default=False,
-    help="import analysis from file in WhatsOpt analysis json format (disable other options)",
+    help="import analysis from file in WhatsOpt analysis json format, possibly gzip-compressed "
+    "(disable other options but --update)",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="discover analysis from problem file even if unchanged since last push",
+)
+@click.option(
+    "-w",
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="keep watching the problem file and the local modules it imports, "
+    "push again analysis when changed (Ctrl+C to stop)",
+)
+@click.option(
+    "-u",
+    "--update",
+    help="push only changes of the analysis against the given analysis id on the remote server "
+    "(with --dry-run: display changes)",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    help="write push data in given file instead of stdout, the file can be pushed later "
+    "with --json (works only with --dry-run)",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    default=False,
+    help="write push data without indentation nor spaces (works only with --dry-run)",
+)
+@click.option(
+    "-z",
+    "--gzip",
+    is_flag=True,
+    default=False,
+    help="gzip-compress push data, implied by '.gz' output file (works only with --output)",
 )
 @click.argument("filename")
 @click.pass_context
-def push(ctx, dry_run, scalar, name, component, depth, json, filename):
+def push(
+    ctx,
+    dry_run,
+    scalar,
+    name,
+    component,
+    depth,
+    json,
+    no_cache,
+    watch,
+    update,
+    output,
+    compact,
+    gzip,
+    filename,
+):
     """Push OpenMDAO problem or WhatsOpt analysis json from given FILENAME."""
-    wop = WhatsOpt(**ctx.obj)
     if not dry_run:
+        options = (("--output", output), ("--compact", compact), ("--gzip", gzip))
+        for opt, value in options:
+            if value:
+                raise click.UsageError(f"{opt} works only with --dry-run", ctx)
+    if gzip and not output:
+        raise click.UsageError("--gzip works only with --output", ctx)
+    wop = WhatsOpt(**ctx.obj)
+    # under MPI, only the root process talks to the server
+    if (not dry_run or update) and is_mpi_root():
         wop.login()
     options = {
         "--dry-run": dry_run,
         "--scalar": scalar,
         "--name": name,
         "--depth": depth,
+        "--no-cache": no_cache,
+        "--update": update,
+        "--output": output,
+        "--compact": compact,
+        "--gzip": gzip,
     }
-    if component:
+    if watch and not json:
+        wop.push_watch_cmd(filename, options, component)
+        exit()
+    elif component:
         wop.push_component_cmd(filename, component, options)
     elif json:
-        wop.push_json(filename)
+        wop.push_json(filename, options)
         exit()
     else:
         wop.push_mda_cmd(filename, options)
@@ -182,12 +367,40 @@ def push(ctx, dry_run, scalar, name, component, depth, json, filename):
     default=False,
     help="export analysis in json format on stdout (disable other options)",
 )
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    help="write json export in given file instead of stdout (works only with --json)",
+)
+@click.option(
+    "--pretty",
+    is_flag=True,
+    default=False,
+    help="pretty-print json export (works only with --json)",
+)
+@click.option(
+    "-z",
+    "--gzip",
+    is_flag=True,
+    default=False,
+    help="gzip-compress json export, implied by '.gz' output file (works only with --json)",
+)
 @click.option(
     "-p",
     "--project-id",
+    "--project",
     is_flag=True,
     default=False,
-    help="export project in json format on stdout (works only with --json)",
+    help="pull all analyses of the project given its identifier, each one in its own directory"
+    " (with --json: export project in json format on stdout)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=4,
+    help="number of concurrent analysis downloads when pulling a project (default is 4)",
 )
 @click.option(
     "--gemseo/--openmdao",
@@ -210,12 +423,24 @@ def pull(
     run_ops,
     test_units,
     json,
+    output,
+    pretty,
+    gzip,
     project_id,
+    jobs,
     gemseo,
     package,
     analysis_id,
 ):
-    """Pull analysis given its identifier."""
+    """Pull analysis (or project with --project) given its identifier."""
+    if not json:
+        for opt, value in (
+            ("--output", output),
+            ("--pretty", pretty),
+            ("--gzip", gzip),
+        ):
+            if value:
+                raise click.UsageError(f"{opt} works only with --json", ctx)
     options = {
         "--dry-run": dry_run,
         "--force": force,
@@ -229,13 +454,12 @@ def pull(
     wop = WhatsOpt(**ctx.obj).login()
     if json:
         if project_id:
-            wop.pull_project_json(analysis_id)
+            wop.pull_project_json(analysis_id, output, pretty, gzip)
         else:
-            wop.pull_mda_json(analysis_id)
+            wop.pull_mda_json(analysis_id, output, pretty, gzip)
+    elif project_id:
+        wop.pull_project(analysis_id, options, jobs)
     else:
-        if project_id:
-            error("Bad option --project-id which works only with option --json enabled")
-            exit(-1)
         current_id = get_analysis_id()
         if current_id and analysis_id != str(current_id):
             error(
@@ -408,20 +632,93 @@ def upload(
 @click.option(
     "-d",
     "--depth",
-    default=DEFAULT_PUSH_DEPTH,
-    help="specify the max depth of the sub-analysis nesting (0 meaning no limit, default is 2)",
+    type=int,
+    multiple=True,
+    default=[DEFAULT_PUSH_DEPTH],
+    help="specify the max depth of the sub-analysis nesting (0 meaning no limit, default is 2), "
+    "may be given several times to get one XDSM per depth (only used with pbfile option)",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="discover analysis from problem file even if unchanged since last show",
+)
+@click.option(
+    "-A",
+    "--all-problems",
+    is_flag=True,
+    default=False,
+    help="show every problem set up by the problem file instead of the first one "
+    "(the whole file is executed, problems being set up but not run)",
+)
+@click.option(
+    "-p",
+    "--project-id",
+    help="show all analyses of the design project given its identifier "
+    "(generated as a static site, see --site)",
+)
+@click.option(
+    "-s",
+    "--site",
+    help="generate a static site in given directory: one html page per XDSM "
+    "sharing xdsmjs assets and an index page (default is 'xdsm' with --project-id)",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=4,
+    help="number of XDSM pages generated concurrently with --site (default is 4)",
+)
+@click.option(
+    "-w",
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="keep watching the problem file and the local modules it imports, "
+    "generate XDSM again when analysis changed (only used with pbfile option, Ctrl+C to stop)",
 )
 @click.pass_context
-def show(ctx, analysis_id, pbfile, name, outfile, batch, depth):
+def show(
+    ctx,
+    analysis_id,
+    pbfile,
+    name,
+    outfile,
+    batch,
+    depth,
+    no_cache,
+    all_problems,
+    project_id,
+    site,
+    jobs,
+    watch,
+):
     """Show current analysis from pulled code or given its identifier (-a) on remote server
-    or discovered in OpenMDAO problem file (-f)."""
+    or discovered in OpenMDAO problem file (-f). When several XDSMs are generated from
+    a problem file (-A, several -d), output file is suffixed by analysis name and/or depth."""
 
+    if project_id and not site:
+        site = "xdsm"
     if pbfile is None:
         wop = WhatsOpt(**ctx.obj).login()
-    else:
-        ctx.obj["url"] = EXTRANET_SERVER_URL
+    else:  # XDSM built locally
         wop = WhatsOpt(**ctx.obj)
-    wop.show_mda(analysis_id, pbfile, name, outfile, batch, depth)
+    wop.show_mda(
+        analysis_id,
+        pbfile,
+        name,
+        outfile,
+        batch,
+        depth,
+        no_cache,
+        all_problems,
+        site,
+        project_id,
+        jobs,
+        watch,
+    )
 
 
 @wop.command()
@@ -453,5 +750,88 @@ def convert(
     WhatsOpt().convert(sqlite_filename)
 
 
-if __name__ == "__main__":
+@wop.command()
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    help="max number of jobs run concurrently (default: 'workers' in jobs file or 4)",
+)
+@click.option(
+    "-n",
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="list jobs without running them",
+)
+@click.argument("jobs_file")
+def batch(workers, dry_run, jobs_file):
+    """Run wop commands listed in JOBS_FILE (TOML format) in a single process."""
+    from whatsopt.batch_utils import run_batch
+
+    run_batch(jobs_file, workers, dry_run, remotes=WhatsOpt._read_remotes())
+
+
+@wop.group()
+def daemon():
+    """Manage wop daemon, a warm wop process running wop commands."""
+    pass
+
+
+@daemon.command()
+@click.option(
+    "-f",
+    "--foreground",
+    is_flag=True,
+    default=False,
+    help="run the daemon in the foreground (default: detached, logs in ~/.whatsopt/daemon.log)",
+)
+def start(foreground):
+    """Start wop daemon, wop commands are then forwarded to it."""
+    from whatsopt.daemon_utils import start_daemon
+
+    start_daemon(foreground)
+
+
+@daemon.command()
+def stop():
+    """Stop wop daemon."""
+    from whatsopt.daemon_utils import stop_daemon
+
+    stop_daemon()
+
+
+@daemon.command(name="status")
+def daemon_status():
+    """Show wop daemon status."""
+    from whatsopt.daemon_utils import daemon_status
+
+    daemon_status()
+
+
+def main():
+    """
+    wop entry point: forward the command to wop daemon if running (and not run under MPI),
+    run it in-process otherwise
+    """
+    from whatsopt.command_utils import command_name, is_mpi_run, is_watch_command
+    from whatsopt.daemon_utils import DAEMON_SOCKET, NOT_FORWARDED
+
+    args = sys.argv[1:]
+    if (
+        os.path.exists(DAEMON_SOCKET)
+        and not os.environ.get("WOP_NO_DAEMON")
+        and command_name(args) not in NOT_FORWARDED
+        and not is_watch_command(args)  # watched modules are reloaded in this process
+        and not is_mpi_run()  # each MPI process has to run its part of the command
+    ):
+        from whatsopt.daemon_utils import forward_command
+
+        code = forward_command(args)
+        if code is not None:
+            sys.exit(code)
     wop()
+
+
+if __name__ == "__main__":
+    main()